@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DynamicAIWebsites.settings')
 
 application = get_asgi_application()
+
+# Background workers poll their queues from start-up, not only after the first request that needs them
+from news_app import geocode_queue, jobs  # noqa: E402
+
+jobs.start_in_process_worker()
+geocode_queue.start_in_process_worker()
@@ -85,6 +85,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Background workers write from several threads. Atomic blocks take the write lock
+            # up front and wait up to `timeout` seconds for it, instead of failing with
+            # "database is locked" when a read inside them turns into a write
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than the default in-memory database, whose shared-cache table locks
+        # ignore `timeout` and fail tests that write from worker threads
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -146,6 +156,92 @@ CACHES = {
     }
 }
 
+# Page view counting
+# Hits are buffered in memory by PageViewMiddleware and written in batches
+PAGE_VIEW_FLUSH_INTERVAL = 10  # seconds between background flushes
+PAGE_VIEW_BUFFER_MAX_PATHS = 1000  # flush early once this many distinct paths are pending
+
+# Route resolution cache (area name / article slug -> id), per process
+ROUTE_CACHE_MAX_ENTRIES = 10000
+ROUTE_CACHE_TTL = 300  # seconds, bounds staleness when another worker renames or deletes
+
+# Trending snapshot for the landing page, rebuilt by `manage.py refresh_trending --loop`
+TRENDING_REFRESH_INTERVAL = 300  # seconds between scheduled refreshes
+TRENDING_STALE_AFTER = 600  # serve the old snapshot but rebuild it in the background past this age
+# Trending scores are decayed visit counts with this half-life. Stored scores are
+# relative to an epoch that starts at TRENDING_SCORE_EPOCH and is moved forward
+# automatically (see news_app/trending.py), so neither needs changing over time.
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_SCORE_EPOCH = '2026-01-01T00:00:00+00:00'
+
+# Area autocomplete (in-memory prefix index)
+AUTOCOMPLETE_LIMIT = 10  # max suggestions per term
+AUTOCOMPLETE_INDEX_TTL = 600  # seconds before the index is rebuilt to pick up popularity changes
+AUTOCOMPLETE_CACHE_SECONDS = 300  # Cache-Control max-age on autocomplete responses
+
+# Nearby areas
+AREA_POINT_INDEX_TTL = 600  # seconds before the in-memory coordinate arrays are rebuilt
+NEARBY_BATCH_MAX_POINTS = 500  # query points per /api/nearby-areas/batch/ request
+NEARBY_BATCH_MAX_RADIUS_KM = 200  # larger radius_km values are capped to this
+NEARBY_BATCH_MAX_LIMIT = 50  # areas returned per point at most
+
+# Geocoding: geocode cache, then the offline gazetteer (`manage.py import_gazetteer`), then Nominatim
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+GEOCODE_ALLOW_NETWORK = os.getenv('GEOCODE_ALLOW_NETWORK', 'true').lower() != 'false'
+GEOCODE_TIMEOUT = 5  # seconds per Nominatim request
+GEOCODE_USER_AGENT = 'lokkal.news geocoder'  # Nominatim's usage policy requires an identifying User-Agent
+GEOCODE_NEGATIVE_TTL_DAYS = 7  # how long "not found" answers are cached
+# New areas are geocoded by a background worker, see news_app/geocode_queue.py
+GEOCODE_IN_PROCESS_WORKER = True  # set False and run one `manage.py geocode_worker` to keep geocoding out of web processes
+GEOCODE_RATE_LIMIT = 1  # Nominatim requests per second across all processes, per the usage policy
+GEOCODE_MAX_ATTEMPTS = 6  # errors before an area is marked failed
+GEOCODE_RETRY_BASE_SECONDS = 60  # first retry delay, doubling after each error
+GEOCODE_RETRY_MAX_SECONDS = 6 * 3600
+GEOCODE_POLL_INTERVAL = 30  # seconds between queue checks when idle
+GEOCODE_LEASE_SECONDS = 300  # a claimed area is retried after this if its worker died
+
+# "Refresh News" generation jobs, see news_app/jobs.py
+GENERATION_IN_PROCESS_WORKER = True  # set False and run `manage.py run_generation_worker` to keep LLM calls out of web processes
+GENERATION_POLL_INTERVAL = 5  # seconds between queue checks when idle
+GENERATION_HEARTBEAT_INTERVAL = 30  # seconds between a running job's heartbeats
+GENERATION_HEARTBEAT_TIMEOUT = 120  # a running job without a heartbeat for this long is requeued
+GENERATION_MAX_ATTEMPTS = 2  # runs before a timed-out job is marked failed
+GENERATION_TOKEN_BUDGET = 8000  # estimated comment tokens per prompt; bigger backlogs are summarized in chunks first
+GENERATION_MAP_CONCURRENCY = 4  # chunk summaries generated at once
+GENERATION_MAX_SUMMARY_ROUNDS = 3  # summarize-the-summaries rounds before a generation gives up
+GENERATION_EVENTS_PAGE_SIZE = 100  # progress events returned per job status poll
+GENERATION_EVENTS_RETENTION_DAYS = 7  # generation progress events older than this are pruned by the worker
+REGENERATE_REQUESTS_PER_MINUTE = 60  # LLM requests/min across all areas in `manage.py regenerate_all_articles`
+QUESTIONS_BATCH_SIZE = 5  # articles per engagement-question LLM call
+ARTICLE_DEDUP_THRESHOLD = 0.8  # estimated Jaccard similarity at which a new article counts as a near-duplicate and is dropped
+ARTICLE_DEDUP_WINDOW_DAYS = 30  # how far back in an area new articles are compared
+AREA_DIGEST_TOKEN_BUDGET = 600  # estimated tokens of already published headlines + summaries sent with each article prompt
+
+# Gemini client, see news_app/llm.py
+LLM_RETRY_BASE_SECONDS = 1  # backoff before the first retry, doubling (with jitter) after each failure
+LLM_RETRY_MAX_SECONDS = 16
+LLM_CIRCUIT_FAILURE_THRESHOLD = 5  # failures in a row before calls fail fast
+LLM_CIRCUIT_RESET_SECONDS = 60  # how long to fail fast before trying Gemini again
+
+UNSPLASH_SEARCH_URL = 'https://api.unsplash.com/search/photos'  # cover images; point at fake_services.FakeUnsplashServer to test offline
+UNSPLASH_TIMEOUT = 10  # seconds before a cover image search is given up on
+# Cover image search cache, see news_app/cover_image_cache.py
+COVER_IMAGE_MEMORY_ENTRIES = 2000  # per-process LRU in front of the database table
+COVER_IMAGE_MEMORY_TTL = 600  # seconds an entry stays in the per-process LRU
+COVER_IMAGE_NEGATIVE_TTL_HOURS = 6  # searches that found nothing are repeated after this
+COVER_IMAGE_ERROR_TTL = 300  # seconds a process skips a query whose search failed
+COVER_IMAGE_CACHE_IDLE_DAYS = 90  # entries unused this long are pruned
+COVER_IMAGE_CACHE_MAX_ENTRIES = 20000  # least recently used entries beyond this are pruned
+COVER_IMAGE_CACHE_MAX_BYTES = 10 * 1024 * 1024  # ...and while stored queries and URLs add up to more than this
+COVER_IMAGE_CONCURRENCY = 4  # cover image searches at a time while saving generated articles
+COVER_IMAGE_DEADLINE_SECONDS = 20  # after the articles are in, how long to wait for their covers; the rest are left for `manage.py update_cover_images`
+
+# LLM response cache, see news_app/llm_cache.py
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() != 'false'
+LLM_CACHE_TTL_DAYS = 30  # entries older than this are regenerated
+LLM_CACHE_MAX_ENTRIES = 5000  # least recently used entries beyond this are evicted
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024  # ...and while stored responses add up to more than this
+
 # Google Analytics settings
 # Only enabled when DEBUG = False
 GOOGLE_ANALYTICS_ID = 'G-S7CS0M36G9'
\ No newline at end of file
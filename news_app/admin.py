@@ -1,9 +1,22 @@
 from django.contrib import admin
-from .models import Post,Article,URLModel, Area
+from .models import Post,Article,ArticleLSHBucket,URLModel, Area, AreaDigest, VisitRollup, TrendingSnapshot, GazetteerEntry, GeocodeCacheEntry, CoverImageCacheEntry, GeocodeCheckpoint, GenerationJob, GenerationEvent, LLMResponseCache, RegenerationRun, RegenerationAreaResult
 
 admin.site.register(Post)
 admin.site.register(Article)
+admin.site.register(ArticleLSHBucket)
 admin.site.register(URLModel)
 admin.site.register(Area)
+admin.site.register(AreaDigest)
+admin.site.register(VisitRollup)
+admin.site.register(TrendingSnapshot)
+admin.site.register(GazetteerEntry)
+admin.site.register(GeocodeCacheEntry)
+admin.site.register(CoverImageCacheEntry)
+admin.site.register(GeocodeCheckpoint)
+admin.site.register(GenerationJob)
+admin.site.register(GenerationEvent)
+admin.site.register(LLMResponseCache)
+admin.site.register(RegenerationRun)
+admin.site.register(RegenerationAreaResult)
 
 # Register your models here.
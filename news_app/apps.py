@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_article_search_schema(sender, using, **kwargs):
+    from django.db import connections
+    from .article_search import ensure_search_schema
+    ensure_search_schema(connections[using])
 
 
 class NewsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news_app'
+
+    def ready(self):
+        # Connect the route cache invalidation and area index signals
+        from . import area_search, geo, resolver  # noqa: F401
+        # SQLite drops the article search triggers whenever a migration rebuilds the table
+        post_migrate.connect(_ensure_article_search_schema, sender=self)
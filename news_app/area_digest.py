@@ -0,0 +1,94 @@
+"""
+Rolling per-area digest of what has already been published.
+
+Generation only sends the posts made since the last run, so the model has
+no idea which stories are already out and happily writes them again.
+Resending the old posts would fix that at the price of ever-growing
+prompts. Instead every area keeps an AreaDigest: the headlines of its most
+recent articles with a one or two sentence summary each, newest first,
+trimmed to AREA_DIGEST_TOKEN_BUDGET estimated tokens. It goes into the
+article prompt as "already published", and generation.save_articles adds
+each run's new articles to it, so it never needs rebuilding from scratch.
+
+An area without a digest (one that was generated before digests existed)
+gets one built from its latest articles the first time it's asked for.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import AreaDigest, Article
+
+logger = logging.getLogger(__name__)
+
+# Characters of article content kept as its summary
+SUMMARY_CHARS = 200
+
+
+def summarize(content):
+    """The opening sentences of `content`, cut at SUMMARY_CHARS on a word boundary."""
+    text = re.sub(r'\s+', ' ', content or '').strip()
+    if len(text) <= SUMMARY_CHARS:
+        return text
+    cut = text[:SUMMARY_CHARS]
+    sentence_end = cut.rfind('. ')
+    if sentence_end > SUMMARY_CHARS // 2:
+        return cut[:sentence_end + 1]
+    return cut.rsplit(' ', 1)[0] + '...'
+
+
+def entry(article):
+    return {'article_id': article.pk, 'title': article.title, 'summary': summarize(article.content)}
+
+
+def render(entries):
+    return "\n".join(f"- {item['title']}: {item['summary']}" for item in entries)
+
+
+def _trim(entries):
+    """Drop the oldest entries until the rendered digest fits the token budget."""
+    from .generation import estimate_tokens
+
+    budget = getattr(settings, 'AREA_DIGEST_TOKEN_BUDGET', 600)
+    kept, tokens = [], 0
+    for item in entries:
+        cost = estimate_tokens(render([item]))
+        if tokens + cost > budget:
+            break
+        kept.append(item)
+        tokens += cost
+    return kept, tokens
+
+
+def get_digest(area):
+    """The area's AreaDigest, built from its latest articles if it doesn't have one yet."""
+    digest = AreaDigest.objects.filter(area=area).first()
+    if digest is not None:
+        return digest
+    # Newest first; the budget decides how many make it in
+    recent = Article.objects.filter(area=area).only('id', 'title', 'content').order_by('-created_at')[:50]
+    entries, tokens = _trim([entry(article) for article in recent])
+    digest, _ = AreaDigest.objects.get_or_create(area=area, defaults={'entries': entries, 'tokens': tokens})
+    return digest
+
+
+def prompt_text(area):
+    """The digest as prompt text, or '' for an area with nothing published yet."""
+    return render(get_digest(area).entries)
+
+
+def add_articles(area, articles):
+    """Put newly published articles at the top of the area's digest and trim it to budget."""
+    if not articles:
+        return
+    with transaction.atomic():
+        digest = get_digest(area)
+        digest = AreaDigest.objects.select_for_update().get(pk=digest.pk)
+        new_ids = {article.pk for article in articles}
+        entries = [entry(article) for article in reversed(articles)]
+        entries += [item for item in digest.entries if item['article_id'] not in new_ids]
+        digest.entries, digest.tokens = _trim(entries)
+        digest.save(update_fields=['entries', 'tokens', 'updated_at'])
+    logger.info(f"Digest for {area.name}: {len(digest.entries)} stories, ~{digest.tokens} tokens")
@@ -0,0 +1,225 @@
+"""
+Area name search: fuzzy matching and autocomplete.
+
+find_similar_area used to run difflib.SequenceMatcher against every Area on
+each unmatched search. Area names are now indexed by character trigram
+(AreaTrigram), so only areas that share trigrams with the input are scored,
+best trigram (Jaccard) similarity first. The index is updated whenever an
+area is saved.
+
+autocomplete_area is served from an in-memory sorted array of area names and
+word starts, searched with bisect and ranked by area page visits.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Area, AreaTrigram, URLModel
+from .utils import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# How many of the best trigram candidates get a full SequenceMatcher comparison
+CANDIDATE_LIMIT = 50
+
+
+def trigrams(name):
+    """Character trigrams of a normalized name, padded so word starts/ends count."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_area_trigrams(area):
+    grams = trigrams(area.name)
+    AreaTrigram.objects.filter(area=area).delete()
+    AreaTrigram.objects.bulk_create([AreaTrigram(area=area, trigram=gram) for gram in grams])
+    area.trigram_count = len(grams)
+    Area.objects.filter(pk=area.pk).update(trigram_count=area.trigram_count)
+
+
+def rebuild_area_trigrams(batch_size=1000):
+    """Rebuild the whole trigram index. Returns the number of areas indexed."""
+    AreaTrigram.objects.all().delete()
+    count = 0
+    batch = []
+    counts = []
+    for area_id, name in Area.objects.values_list('id', 'name').iterator():
+        grams = trigrams(name)
+        batch.extend(AreaTrigram(area_id=area_id, trigram=gram) for gram in grams)
+        counts.append(Area(id=area_id, trigram_count=len(grams)))
+        count += 1
+        if len(batch) >= batch_size:
+            AreaTrigram.objects.bulk_create(batch, batch_size=batch_size)
+            batch = []
+    AreaTrigram.objects.bulk_create(batch, batch_size=batch_size)
+    Area.objects.bulk_update(counts, ['trigram_count'], batch_size=batch_size)
+    return count
+
+
+def candidate_areas(normalized_name, limit=CANDIDATE_LIMIT):
+    """
+    Areas most similar to `normalized_name` by trigram Jaccard similarity,
+    shared / (query trigrams + area trigrams - shared), best first.
+
+    Ranking by the raw shared count would favour long names, which share a
+    few trigrams with almost any query, and could push a short exact-ish
+    match past `limit` before it is ever scored.
+    """
+    grams = trigrams(normalized_name)
+    shared = Count('id')
+    # Greatest() keeps the denominator positive if a count is ever behind the index
+    union = len(grams) + Greatest(F('area__trigram_count'), shared) - shared
+    shared = AreaTrigram.objects.filter(
+        trigram__in=grams
+    ).values('area_id').annotate(
+        similarity=Cast(shared, FloatField()) / union
+    ).order_by('-similarity', 'area_id')[:limit]
+    area_ids = [row['area_id'] for row in shared]
+    areas = Area.objects.in_bulk(area_ids)
+    return [areas[area_id] for area_id in area_ids if area_id in areas]
+
+
+@receiver(post_save, sender=Area)
+def _index_saved_area(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        return  # e.g. coordinate updates don't change the trigrams
+    index_area_trigrams(instance)
+
+
+# One built index. Replaced as a whole, never modified, so a search that read
+# it once can't see half of one build and half of the next.
+_AutocompleteSnapshot = namedtuple(
+    '_AutocompleteSnapshot', ['keys', 'ids', 'names', 'rank', 'ordered', 'word_starts', 'top_by_prefix'],
+)
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over normalized area names and their word starts, so that
+    "gar" matches both "garden city" and "rose garden".
+
+    Keys are kept in one sorted list and searched with bisect. Results for
+    prefixes up to SHORT_PREFIX_LEN characters, which match the most areas,
+    are ranked once at build time. The index is rebuilt in the background
+    when an area is saved or deleted, or after AUTOCOMPLETE_INDEX_TTL seconds
+    so popularity and other workers' changes are picked up; the previous
+    index keeps serving meanwhile.
+    """
+    SHORT_PREFIX_LEN = 3
+
+    def __init__(self, limit=10):
+        self.limit = limit
+        self._snapshot = _AutocompleteSnapshot([], [], {}, {}, [], {}, {})
+        self._built_at = None
+        self._dirty = False
+        self._rebuild_lock = threading.Lock()
+
+    def build(self):
+        names = dict(Area.objects.values_list('id', 'name'))
+        popularity = dict(
+            URLModel.objects.filter(area__isnull=False, article__isnull=True).values('area_id').annotate(
+                total=Sum('visits')
+            ).values_list('area_id', 'total')
+        )
+        # Most visited first, then alphabetical
+        ordered = sorted(names, key=lambda area_id: (-(popularity.get(area_id) or 0), names[area_id]))
+        rank = {area_id: position for position, area_id in enumerate(ordered)}
+
+        entries = []
+        word_starts = {}
+        top_by_prefix = {}
+        for area_id, name in names.items():
+            starts = []
+            for i, char in enumerate(name):
+                if i == 0 or (name[i - 1] == ' ' and char != ' '):
+                    entries.append((name[i:], area_id))
+                    starts.append(name[i:])
+                    for n in range(1, self.SHORT_PREFIX_LEN + 1):
+                        if len(name) - i >= n:
+                            top_by_prefix.setdefault(name[i:i + n], set()).add(area_id)
+            word_starts[area_id] = tuple(starts)
+        entries.sort()
+        top_by_prefix = {
+            prefix: sorted(area_ids, key=rank.__getitem__)[:self.limit]
+            for prefix, area_ids in top_by_prefix.items()
+        }
+
+        # A single assignment, so concurrent searches see either the old index or this one
+        self._snapshot = _AutocompleteSnapshot(
+            keys=[key for key, _ in entries],
+            ids=[area_id for _, area_id in entries],
+            names=names,
+            rank=rank,
+            ordered=ordered,
+            word_starts=word_starts,
+            top_by_prefix=top_by_prefix,
+        )
+        self._built_at = time.monotonic()
+        self._dirty = False
+        logger.debug(f"Autocomplete index built: {len(names)} areas, {len(entries)} keys")
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _refresh_if_stale(self):
+        if self._built_at is None:
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        ttl = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 600)
+        if not self._dirty and time.monotonic() - self._built_at < ttl:
+            return
+        run_in_background(self._rebuild_lock, self.build, 'autocomplete-rebuild')
+
+    def search(self, term, limit=None):
+        """Area names starting with `term` (or with a word starting with it), most popular first."""
+        limit = limit or self.limit
+        if not term:
+            return []
+        self._refresh_if_stale()
+        index = self._snapshot
+
+        if len(term) <= self.SHORT_PREFIX_LEN and limit <= self.limit:
+            area_ids = index.top_by_prefix.get(term, [])[:limit]
+        else:
+            lo = bisect_left(index.keys, term)
+            hi = bisect_left(index.keys, term + '\uffff', lo)
+            if (hi - lo) ** 2 > limit * len(index.names):
+                # Common word (e.g. "nagar"): walking areas in popularity order
+                # finds `limit` matches sooner than ranking the whole range
+                area_ids = self._scan_by_rank(index, term, limit)
+            else:
+                area_ids = sorted(set(index.ids[lo:hi]), key=index.rank.__getitem__)[:limit]
+        return [index.names[area_id] for area_id in area_ids]
+
+    @staticmethod
+    def _scan_by_rank(index, term, limit):
+        found = []
+        for area_id in index.ordered:
+            if any(start.startswith(term) for start in index.word_starts[area_id]):
+                found.append(area_id)
+                if len(found) == limit:
+                    break
+        return found
+
+
+area_autocomplete = AutocompleteIndex(limit=getattr(settings, 'AUTOCOMPLETE_LIMIT', 10))
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+def _invalidate_autocomplete(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    area_autocomplete.invalidate()
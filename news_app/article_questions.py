@@ -0,0 +1,63 @@
+"""
+Engagement questions ("Join the conversation") for articles.
+
+The detail view used to ask Gemini for an article's questions the first
+time anyone opened it, so that reader waited on the LLM, and readers who
+arrived together each generated a set. Questions are now generated when
+articles are saved (generation.save_articles), QUESTIONS_BATCH_SIZE
+articles per LLM call, and stored with bulk_create; the detail view only
+reads them. `manage.py generate_article_questions` backfills older articles
+and any whose batch failed.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Article, questions
+
+logger = logging.getLogger(__name__)
+
+
+def without_questions(articles=None):
+    """Articles (from the given queryset, or all) that have no questions yet."""
+    articles = Article.objects.all() if articles is None else articles
+    return articles.filter(~Exists(questions.objects.filter(article=OuterRef('pk'))))
+
+
+def generate_questions(articles, batch_size=None, limiter=None, generate=None):
+    """
+    Generate and store questions for `articles` that don't have any yet.
+    Returns how many articles got questions.
+
+    generate(articles, limiter=...) -> {article id: [question, ...]}
+    defaults to the batched Gemini call in views.
+    """
+    if generate is None:
+        # The LLM helpers live in views, next to the genai setup
+        from .views import generate_article_qs as generate
+    batch_size = batch_size or getattr(settings, 'QUESTIONS_BATCH_SIZE', 5)
+    articles = list(articles)
+    done = 0
+    for start in range(0, len(articles), batch_size):
+        batch = articles[start:start + batch_size]
+        try:
+            generated = generate(batch, limiter=limiter)
+        except Exception as e:
+            logger.exception(f"Question generation failed for articles {[a.pk for a in batch]}: {e}")
+            continue
+        with transaction.atomic():
+            # Skip articles that got questions from someone else in the meantime
+            pending = set(without_questions(Article.objects.filter(pk__in=generated)).values_list('pk', flat=True))
+            rows = [
+                questions(article_id=article_id, question=question[:255])
+                for article_id, article_questions in generated.items() if article_id in pending
+                for question in article_questions
+            ]
+            questions.objects.bulk_create(rows)
+        done += len({row.article_id for row in rows})
+        missed = len(batch) - len(generated)
+        if missed:
+            logger.warning(f"No questions came back for {missed} of {len(batch)} articles")
+    return done
@@ -0,0 +1,203 @@
+"""
+Full-text search over articles.
+
+On SQLite, article titles and content are mirrored into an FTS5 virtual
+table (news_app_article_fts) that triggers keep in sync with
+news_app_article, including bulk inserts and queryset updates. Results are
+ranked with BM25 (title matches weigh more than content matches), come with
+a highlighted snippet, and are paginated with a keyset cursor on
+(rank, id) so deep pages cost the same as the first one.
+
+Other databases fall back to an icontains scan.
+"""
+import base64
+import html
+import json
+import re
+
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Article
+
+FTS_TABLE = 'news_app_article_fts'
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+# Control characters can't appear in article text, so they are safe snippet markers
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+SCHEMA_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, content='news_app_article', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON news_app_article BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON news_app_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON news_app_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def fts_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def ensure_search_schema(using=connection):
+    """
+    Create the FTS table and sync triggers if they are missing. SQLite drops
+    triggers when a migration rebuilds news_app_article, so this also runs
+    after every migrate.
+    """
+    if not fts_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in SCHEMA_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(using=connection):
+    """Repopulate the FTS table from news_app_article and merge its segments."""
+    ensure_search_schema(using)
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def to_fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word is quoted (so user
+    input can't inject FTS syntax) and the last one is a prefix match.
+    """
+    words = re.findall(r'\w+', (text or '').lower())
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def encode_cursor(rank, article_id):
+    raw = json.dumps([rank, article_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (rank, article_id) from a cursor string, or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        return rank, int(article_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _highlight(snippet):
+    return html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_articles(text, area_id=None, limit=20, cursor=None):
+    """
+    Search article titles and content. Returns (results, next_cursor), where
+    results are dicts with the article fields, `rank` and an HTML-safe
+    `snippet` with matches wrapped in <mark>, and next_cursor is None on the
+    last page.
+    """
+    if not fts_available():
+        return _search_articles_fallback(text, area_id, limit, cursor)
+
+    query = to_fts_query(text)
+    if not query:
+        return [], None
+
+    params = [query]
+    area_filter = ''
+    if area_id is not None:
+        area_filter = 'AND a.area_id = %s'
+        params.append(area_id)
+    after = ''
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        after = 'WHERE (rank, id) > (%s, %s)'
+        params.extend(position)
+    params.append(limit + 1)
+
+    sql = f"""
+        SELECT * FROM (
+            SELECT a.id AS id, a.title, a.slug, a.category, a.cover_image, a.created_at, ar.name AS area_name,
+                   bm25({FTS_TABLE}, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) AS rank,
+                   snippet({FTS_TABLE}, 1, '{_MARK_START}', '{_MARK_END}', '…', 24) AS snippet
+            FROM {FTS_TABLE}
+            JOIN news_app_article a ON a.id = {FTS_TABLE}.rowid
+            LEFT JOIN news_app_area ar ON ar.id = a.area_id
+            WHERE {FTS_TABLE} MATCH %s {area_filter}
+        ) {after}
+        ORDER BY rank, id
+        LIMIT %s
+    """
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        columns = [col[0] for col in db_cursor.description]
+        rows = [dict(zip(columns, row)) for row in db_cursor.fetchall()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['rank'], rows[-1]['id'])
+    for row in rows:
+        row['snippet'] = _highlight(row['snippet'] or '')
+        # Raw queries skip Django's converters; SQLite stores datetimes as naive UTC
+        created_at = row['created_at']
+        if isinstance(created_at, str):
+            created_at = parse_datetime(created_at)
+        if created_at is not None and settings.USE_TZ and timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at, dt_timezone.utc)
+        row['created_at'] = created_at
+    return rows, next_cursor
+
+
+def _search_articles_fallback(text, area_id, limit, cursor):
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return [], None
+    articles = Article.objects.select_related('area').order_by('-id')
+    for word in words:
+        articles = articles.filter(Q(title__icontains=word) | Q(content__icontains=word))
+    if area_id is not None:
+        articles = articles.filter(area_id=area_id)
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        articles = articles.filter(id__lt=position[1])
+    articles = list(articles[:limit + 1])
+
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        next_cursor = encode_cursor(0, articles[-1].pk)
+    rows = [{
+        'id': article.pk,
+        'title': article.title,
+        'slug': article.slug,
+        'category': article.category,
+        'cover_image': article.cover_image,
+        'created_at': article.created_at,
+        'area_name': article.area.name if article.area else None,
+        'rank': 0,
+        'snippet': html.escape(article.content[:160]),
+    } for article in articles]
+    return rows, next_cursor
@@ -0,0 +1,173 @@
+"""
+Persistent cache of Unsplash cover image searches.
+
+fetch_cover_image used to remember results in Django's LocMemCache, which
+every gunicorn worker has its own copy of and which is gone after each
+deploy, so the same keywords were searched again and again against
+Unsplash's hourly rate limit. Results now live in CoverImageCacheEntry,
+keyed by the normalized search query and shared by all workers, with an
+in-process LRU (COVER_IMAGE_MEMORY_ENTRIES, COVER_IMAGE_MEMORY_TTL seconds)
+in front of it so repeat lookups in one worker don't hit the database.
+
+Searches that found nothing are stored too, with no image_url, and are
+searched again after COVER_IMAGE_NEGATIVE_TTL_HOURS. Failed requests
+(network errors, rate limiting) aren't stored; they're only remembered in
+this process for COVER_IMAGE_ERROR_TTL seconds.
+
+Every entry counts its hits and when it was last used. Hits served from
+the LRU are added to the database every FLUSH_EVERY hits. prune() evicts
+entries unused for COVER_IMAGE_CACHE_IDLE_DAYS, then the least recently
+used while there are more than COVER_IMAGE_CACHE_MAX_ENTRIES or they take
+more than COVER_IMAGE_CACHE_MAX_BYTES. It runs every PRUNE_EVERY stores and
+from `manage.py cover_image_cache_stats --prune`.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CoverImageCacheEntry
+from .resolver import LRUCache
+from .utils import evict_least_recently_used
+
+logger = logging.getLogger(__name__)
+
+# Write LRU hit counts to the database after this many
+FLUSH_EVERY = 50
+# Prune on every Nth store rather than on each one
+PRUNE_EVERY = 50
+
+_MISSING = object()
+memory = LRUCache(getattr(settings, 'COVER_IMAGE_MEMORY_ENTRIES', 2000),
+                  ttl=getattr(settings, 'COVER_IMAGE_MEMORY_TTL', 600))
+failures = LRUCache(1000, ttl=getattr(settings, 'COVER_IMAGE_ERROR_TTL', 300))
+
+_counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_pending_hits = Counter()
+_lock = threading.Lock()
+_stores_since_prune = 0
+
+
+def stats():
+    """This process's hit/miss/store/eviction counts since start-up."""
+    with _lock:
+        return dict(_counters)
+
+
+def _count(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+
+def normalize_query(query):
+    return ' '.join((query or '').lower().split())[:255]
+
+
+def _negative_cutoff():
+    return timezone.now() - timedelta(hours=getattr(settings, 'COVER_IMAGE_NEGATIVE_TTL_HOURS', 6))
+
+
+def lookup(query):
+    """
+    (True, image_url) if `query` was searched before (image_url is None when
+    nothing was found), or (False, None) if Unsplash has to be asked.
+    """
+    query = normalize_query(query)
+    image_url = memory.get(query, _MISSING)
+    if image_url is not _MISSING:
+        _count('memory_hits')
+        _add_pending_hit(query)
+        return True, image_url
+    if failures.get(query):
+        return True, None
+
+    entry = CoverImageCacheEntry.objects.filter(
+        Q(image_url__isnull=False) | Q(searched_at__gte=_negative_cutoff()), query=query,
+    ).only('pk', 'image_url').first()
+    if entry is None:
+        _count('misses')
+        return False, None
+    CoverImageCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    _count('db_hits')
+    memory.set(query, entry.image_url)
+    return True, entry.image_url
+
+
+def store(query, image_url):
+    """Remember what a search found; image_url=None records that it found nothing."""
+    global _stores_since_prune
+    query = normalize_query(query)
+    now = timezone.now()
+    size_bytes = len(query.encode('utf-8')) + len((image_url or '').encode('utf-8'))
+    try:
+        CoverImageCacheEntry.objects.update_or_create(
+            query=query,
+            defaults={'image_url': image_url, 'size_bytes': size_bytes, 'searched_at': now, 'last_used_at': now},
+        )
+    except IntegrityError:
+        # Another worker stored the same search first
+        pass
+    memory.set(query, image_url)
+    with _lock:
+        _counters['stores'] += 1
+        _stores_since_prune += 1
+        due = _stores_since_prune >= PRUNE_EVERY
+        if due:
+            _stores_since_prune = 0
+    if due:
+        prune()
+
+
+def remember_failure(query):
+    """Skip `query` in this process for a while after the search itself failed."""
+    failures.set(normalize_query(query), True)
+
+
+def _add_pending_hit(query):
+    with _lock:
+        _pending_hits[query] += 1
+        due = sum(_pending_hits.values()) >= FLUSH_EVERY
+    if due:
+        flush_hits()
+
+
+def flush_hits():
+    """Add the hits served from this process's LRU to the database entries."""
+    with _lock:
+        pending = dict(_pending_hits)
+        _pending_hits.clear()
+    now = timezone.now()
+    for query, hits in pending.items():
+        CoverImageCacheEntry.objects.filter(query=query).update(hits=F('hits') + hits, last_used_at=now)
+
+
+def prune(idle_days=None, max_entries=None, max_bytes=None):
+    """
+    Delete expired negative entries and entries unused for idle_days, then
+    the least recently used until at most max_entries remain and they take
+    at most max_bytes. Returns how many went.
+    """
+    if idle_days is None:
+        idle_days = getattr(settings, 'COVER_IMAGE_CACHE_IDLE_DAYS', 90)
+    if max_entries is None:
+        max_entries = getattr(settings, 'COVER_IMAGE_CACHE_MAX_ENTRIES', 20000)
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'COVER_IMAGE_CACHE_MAX_BYTES', 10 * 1024 * 1024)
+    flush_hits()
+    deleted, _ = CoverImageCacheEntry.objects.filter(
+        Q(image_url__isnull=True, searched_at__lt=_negative_cutoff())
+        | Q(last_used_at__lt=timezone.now() - timedelta(days=idle_days))
+    ).delete()
+    deleted += evict_least_recently_used(
+        CoverImageCacheEntry.objects.all(), max_entries=max_entries, max_bytes=max_bytes,
+    )
+    if deleted:
+        memory.clear()
+        _count('evictions', deleted)
+        logger.info(f"Pruned {deleted} cover image cache entries")
+    return deleted
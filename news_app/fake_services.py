@@ -0,0 +1,298 @@
+"""
+Local stand-ins for the external services the app calls, for development,
+load tests and benchmarks. Nothing here is used when serving real traffic.
+
+FakeNominatimServer answers /search?q=...&format=json the way Nominatim
+does, from a fixed place list or from made-up but stable coordinates, and
+can inject latency, errors and rate limiting. Point NOMINATIM_URL (or a
+command's --provider) at server.url to use it.
+
+FakeUnsplashServer answers /search/photos like Unsplash's search API;
+point UNSPLASH_SEARCH_URL at its url.
+
+FakeGemini is an in-process stand-in for Gemini: install it with
+llm.set_model_factory() and every LLM call in the app gets schema-valid
+JSON (articles, notes, questions, ad categories) after a configurable
+latency that grows with the prompt, with a configurable error rate and
+context limit.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from .utils import normalize_area_name
+
+try:
+    from google.api_core.exceptions import InvalidArgument as RejectedError, ServiceUnavailable as UpstreamError
+except ImportError:
+    RejectedError = UpstreamError = RuntimeError
+
+
+def synthetic_coordinates(name):
+    """Stable made-up coordinates for a place name, inside India's bounding box."""
+    digest = hashlib.sha256(name.encode()).digest()
+    lat = 8 + int.from_bytes(digest[:4], 'big') / 2**32 * 24
+    lon = 68 + int.from_bytes(digest[4:8], 'big') / 2**32 * 24
+    return round(lat, 6), round(lon, 6)
+
+
+class FakeHTTPServer:
+    """
+    A JSON endpoint on 127.0.0.1 serving GET `path`; subclasses implement
+    answer(params) and say which parameter is the query.
+
+    latency: seconds to wait before each answer.
+    fail_rate: fraction of requests answered with HTTP 503.
+    max_per_second: answer HTTP 429 above this many requests per second, like the real policy.
+    """
+    path = '/'
+    query_param = 'q'
+    thread_name = 'fake-http'
+
+    def __init__(self, latency=0.0, fail_rate=0.0, max_per_second=None, port=0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.max_per_second = max_per_second
+        self.requests = 0
+        self.rejected = 0
+        self.queries = []
+        self._port = port
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._window_count = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def answer(self, params):
+        raise NotImplementedError
+
+    def _admit(self):
+        """Count a request; return the HTTP status to answer with (200, 429 or 503)."""
+        with self._lock:
+            self.requests += 1
+            if self.max_per_second is not None:
+                now = time.monotonic()
+                if now - self._window_start >= 1:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.max_per_second:
+                    self.rejected += 1
+                    return 429
+            if self.fail_rate and self._random.random() < self.fail_rate:
+                self.rejected += 1
+                return 503
+        return 200
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip('/') != fake.path:
+                    self.send_error(404)
+                    return
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status = fake._admit()
+                with fake._lock:
+                    fake.queries.append(params.get(fake.query_param, ''))
+                if status != 200:
+                    self.send_error(status)
+                    return
+                body = json.dumps(fake.answer(params)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark and command output clean
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self._port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=self.thread_name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeNominatimServer(FakeHTTPServer):
+    """
+    A Nominatim-compatible search endpoint.
+
+    places: {name: (lat, lon)} looked up by normalized name.
+    synthesize: answer unknown names with synthetic_coordinates() instead of [].
+    """
+    path = '/search'
+    thread_name = 'fake-nominatim'
+
+    def __init__(self, places=None, synthesize=False, **kwargs):
+        super().__init__(**kwargs)
+        self.places = {normalize_area_name(name): coords for name, coords in (places or {}).items()}
+        self.synthesize = synthesize
+
+    def lookup(self, query):
+        name = normalize_area_name(query)
+        if name in self.places:
+            return self.places[name]
+        if self.synthesize and name:
+            return synthetic_coordinates(name)
+        return None
+
+    def answer(self, params):
+        query = params.get('q', '')
+        coords = self.lookup(query)
+        if coords is None:
+            return []
+        return [{'lat': str(coords[0]), 'lon': str(coords[1]), 'display_name': query}]
+
+
+class FakeUnsplashServer(FakeHTTPServer):
+    """An Unsplash-style photo search endpoint answering every query with one stable made-up image URL."""
+    path = '/search/photos'
+    query_param = 'query'
+    thread_name = 'fake-unsplash'
+
+    def answer(self, params):
+        digest = hashlib.sha256(params.get('query', '').encode()).hexdigest()[:16]
+        return {'results': [{'urls': {'regular': f"https://images.example.com/{digest}.jpg"}}]}
+
+
+class FakeGemini:
+    """
+    In-process stand-in for Gemini. Call it like llm.gemini_model
+    (model_name, generation_config) to get a model whose generate_content()
+    returns JSON matching the response schema, shaped after the prompt:
+    article ids in question prompts are answered, the area name ends up in
+    article titles.
+
+    latency: seconds per call, plus per_1k_tokens for every 1000 prompt tokens.
+    With generate_content(prompt, stream=True) the prompt part is spent
+    before the first chunk and `latency` is spread over `stream_chunks`
+    chunks, like a model writing its answer.
+    error_rate: fraction of calls that raise a 503-style upstream error.
+    context_limit: prompts over this many (estimated) tokens are rejected
+    with a 400-style error, which the llm layer doesn't retry.
+    Counts calls, errors, rejected prompts and the largest prompt seen.
+    """
+
+    CATEGORIES = ['food', 'education', 'real estate', 'services', 'retail', 'health', 'events', 'general']
+
+    def __init__(self, latency=0.0, per_1k_tokens=0.0, error_rate=0.0, seed=None, stream_chunks=8, context_limit=None):
+        self.latency = latency
+        self.per_1k_tokens = per_1k_tokens
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self.context_limit = context_limit
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.max_prompt_tokens = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, generation_config):
+        return SimpleNamespace(
+            generate_content=lambda prompt, stream=False: self.generate(generation_config, prompt, stream)
+        )
+
+    def generate(self, generation_config, prompt, stream=False):
+        prompt_tokens = len(prompt) // 4 + 1
+        with self._lock:
+            self.calls += 1
+            serial = self.calls
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+            if self.context_limit is not None and prompt_tokens > self.context_limit:
+                self.rejected += 1
+                raise RejectedError(f"The input token count ({prompt_tokens}) exceeds the maximum "
+                                    f"number of tokens allowed ({self.context_limit}).")
+            failed = self.error_rate and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep((0 if stream else self.latency) + self.per_1k_tokens * prompt_tokens / 1000)
+        if failed:
+            raise UpstreamError('The model is overloaded. Please try again later.')
+        area = re.search(r"area of (.+?), please", prompt)
+        context = {
+            'serial': serial,
+            'area': area.group(1) if area else 'the area',
+            'ids': [int(article_id) for article_id in re.findall(r"Article (\d+):", prompt)],
+            'digest': hashlib.sha256(prompt.encode()).hexdigest()[:8],
+            'prompt': prompt,
+        }
+        value = self._fake(generation_config.get('response_schema') or {'type': 'object'}, context, 'response')
+        text = json.dumps(value)
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=len(text) // 4 + 1)
+        if stream:
+            return FakeStream(text, self.stream_chunks, self.latency, usage)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _fake(self, schema, context, name):
+        kind = schema.get('type')
+        if kind == 'object':
+            properties = schema.get('properties', {})
+            if 'id' in properties and context['ids']:
+                # One entry per article in a batched question prompt
+                article_id = context['ids'].pop(0)
+                return {key: article_id if key == 'id' else self._fake(prop, context, key)
+                        for key, prop in properties.items()}
+            return {key: self._fake(prop, context, key) for key, prop in properties.items()}
+        if kind == 'array':
+            items = schema.get('items', {})
+            count = len(context['ids']) if context['ids'] and 'id' in items.get('properties', {}) else 3
+            return [self._fake(items, context, name) for _ in range(count)]
+        if kind == 'integer':
+            return context['serial']
+        if name == 'category':
+            return self.CATEGORIES[int(context['digest'], 16) % len(self.CATEGORIES)]
+        if name == 'title':
+            return f"{context['area'].title()} community update {context['serial']}-{self._random.randrange(10**6)}"
+        if name == 'content':
+            # Words drawn from the prompt, so articles differ the way real ones do
+            words = re.findall(r"[a-z]+", context['prompt'].lower()) or ['news']
+            return f"Residents of {context['area']} report on local happenings. " + ' '.join(self._random.choices(words, k=150))
+        if name == 'questions':
+            return 'What have you noticed about this?'
+        return f"{name} {context['digest']}"
+
+
+class FakeStream:
+    """A streamed FakeGemini response: `text` in `chunks` pieces, `latency` seconds in all."""
+
+    def __init__(self, text, chunks, latency, usage_metadata):
+        self.text = text
+        self.chunks = max(1, chunks)
+        self.latency = latency
+        self.usage_metadata = usage_metadata
+
+    def __iter__(self):
+        size = -(-len(self.text) // self.chunks)
+        for start in range(0, len(self.text), size):
+            time.sleep(self.latency / self.chunks)
+            yield SimpleNamespace(text=self.text[start:start + size])
@@ -0,0 +1,416 @@
+"""
+Article generation for an area: turn the posts made since the last run
+into news articles with the LLM, pick cover images, and save them. Runs in
+a generation worker (see jobs.py), not in the request that asked for it.
+
+Posts that fit in one prompt of GENERATION_TOKEN_BUDGET (estimated) tokens
+go to the LLM in one call, as before. Bigger backlogs are map-reduced: the
+posts are read page by page and cut into budget-sized chunks, each chunk is
+summarized into short notes (GENERATION_MAP_CONCURRENCY calls at a time),
+and the articles are written from the notes, summarizing the notes again
+first if they are still over budget (at most GENERATION_MAX_SUMMARY_ROUNDS
+rounds in all). Only one page of posts and the chunks in flight are held in
+memory, never the whole backlog. If any chunk can't be summarized, or the
+notes still don't fit after the last round, the generation fails rather
+than writing articles from part of the posts.
+
+The article prompt also gets the area's digest of already published
+stories (see area_digest), which is updated with every run's articles.
+"""
+import logging
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from . import area_digest, llm, near_duplicates
+from .article_questions import generate_questions
+from .models import Article
+
+logger = logging.getLogger(__name__)
+
+GenerationResult = namedtuple('GenerationResult', ['articles_created', 'message', 'partial'], defaults=[False])
+SavedArticles = namedtuple('SavedArticles', ['created', 'duplicates', 'partial'], defaults=[False])
+
+
+class GenerationError(Exception):
+    """Generation ran but produced nothing; the area's posts stay unprocessed so it can be retried."""
+
+
+def format_post(post):
+    if post.reporter_name:
+        return f'"{post.content}" - {post.reporter_name}'
+    return f'"{post.content}"'
+
+
+def format_comments(posts):
+    return " ".join(format_post(post) for post in posts)
+
+
+def estimate_tokens(text):
+    # About four characters per token for English text; close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def iter_posts(posts, page_size=500):
+    """Iterate a posts queryset in id order, one page per query, without holding a cursor open."""
+    last_id = 0
+    while True:
+        page = list(posts.filter(id__gt=last_id).order_by('id').only('id', 'area_id', 'content', 'reporter_name')[:page_size])
+        if not page:
+            return
+        yield from page
+        last_id = page[-1].id
+
+
+def iter_chunks(items, token_budget):
+    """Group formatted comments (or notes) into space-joined chunks of at most ~token_budget tokens."""
+    chunk, chunk_tokens = [], 0
+    for item in items:
+        tokens = estimate_tokens(item)
+        if tokens > token_budget:
+            # A single huge post: keep its start rather than blow the budget
+            item = item[:token_budget * 4]
+            tokens = token_budget
+        if chunk and chunk_tokens + tokens > token_budget:
+            yield " ".join(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(item)
+        chunk_tokens += tokens
+    if chunk:
+        yield " ".join(chunk)
+
+
+def _in_thread(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        # Pool threads get their own DB connections (the LLM cache); don't leak them
+        connections.close_all()
+
+
+def summarize_chunks(chunks, area_name, summarize, concurrency):
+    """
+    Summarize each chunk with summarize(text, area_name) -> [note, ...],
+    keeping at most 2 * concurrency chunks in memory. Notes come back in
+    chunk order, so reruns over the same posts hit the LLM cache. Raises
+    GenerationError if a chunk comes back without notes (summarize_comments
+    returns [] when the LLM call failed); the chunks still queued are
+    cancelled.
+    """
+    notes = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = deque()
+
+        def collect():
+            chunk_notes = in_flight.popleft().result()
+            if not chunk_notes:
+                for future in in_flight:
+                    future.cancel()
+                raise GenerationError("Could not summarize the latest comments. Please try again later.")
+            notes.extend(chunk_notes)
+
+        for chunk in chunks:
+            in_flight.append(pool.submit(_in_thread, summarize, chunk, area_name))
+            if len(in_flight) >= 2 * concurrency:
+                collect()
+        while in_flight:
+            collect()
+    return notes
+
+
+def generate_articles(posts, area_name, write_articles=None, summarize=None, token_budget=None, concurrency=None,
+                      limiter=None, digest=''):
+    """
+    Generate article dicts for `area_name` from a posts queryset. Returns an
+    iterable that, with the default Gemini writer, yields each article as
+    soon as the streamed response has it.
+
+    write_articles(text, area_name) -> iterable of articles and
+    summarize(text, area_name) -> [note, ...] default to the Gemini calls in views.
+    Benchmarks keep them and install fake_services.FakeGemini with
+    llm.set_model_factory instead.
+    limiter: a ratelimit.TokenBucket the default Gemini calls take a token
+    from before each request (cache hits are free).
+    digest: the area's already published stories (area_digest.prompt_text),
+    given to the default writer so it doesn't repeat them.
+    Raises GenerationError when the posts can't be summarized (see
+    summarize_chunks) or GENERATION_MAX_SUMMARY_ROUNDS isn't enough.
+    """
+    if write_articles is None or summarize is None:
+        # The LLM helpers live in views, next to the genai setup
+        from .views import stream_articles, summarize_comments
+        write_articles = write_articles or partial(stream_articles, limiter=limiter, digest=digest)
+        summarize = summarize or partial(summarize_comments, limiter=limiter)
+    token_budget = token_budget or getattr(settings, 'GENERATION_TOKEN_BUDGET', 8000)
+    concurrency = concurrency or getattr(settings, 'GENERATION_MAP_CONCURRENCY', 4)
+    max_rounds = getattr(settings, 'GENERATION_MAX_SUMMARY_ROUNDS', 3)
+
+    chunks = iter_chunks((format_post(post) for post in iter_posts(posts)), token_budget)
+    first = next(chunks, None)
+    if first is None:
+        return []
+    second = next(chunks, None)
+    if second is None:
+        # Everything fits in one prompt
+        return write_articles(first, area_name)
+
+    def all_chunks():
+        yield first
+        yield second
+        yield from chunks
+
+    notes = summarize_chunks(all_chunks(), area_name, summarize, concurrency)
+    rounds = 1
+    while estimate_tokens(" ".join(notes)) > token_budget and len(notes) > 1:
+        if rounds >= max_rounds:
+            # Summaries that don't shrink would otherwise go round forever
+            raise GenerationError(f"The comments for '{area_name.title()}' are still too long after "
+                                  f"{rounds} rounds of summarizing. Please try again later.")
+        # Too many notes for one prompt: summarize the summaries
+        notes = summarize_chunks(iter_chunks(notes, token_budget), area_name, summarize, concurrency)
+        rounds += 1
+    logger.info(f"Summarized {area_name} posts into {len(notes)} notes in {rounds} round(s)")
+    return write_articles(" ".join(f'"{note}"' for note in notes), area_name)
+
+
+def generate_news_for_area(area, on_article=None):
+    """
+    Generate articles for `area` from the posts made since it was last
+    generated. Each article is saved as soon as the LLM has written it, and
+    on_article(article) is called right after; cover images are saved at the
+    end of the run. Returns a GenerationResult; raises GenerationError if
+    no article could be made.
+
+    If the LLM's stream broke off partway, the articles that made it are
+    kept but last_generated_at stays put, so the next run goes over the same
+    posts again (the saved articles come back as near-duplicates and are
+    dropped) and the result says partial=True.
+    """
+    from .views import get_posts_content_by_area
+
+    area_name = area.name
+    last_gen_time = area.last_generated_at
+    logger.info(f"Generating news for area: {area_name}, last generation time: {last_gen_time}")
+    # Taken before reading posts, so posts arriving mid-run are picked up next time
+    started_at = timezone.now()
+
+    # Get content of NEW posts since the last generation
+    new_posts = get_posts_content_by_area(area_name, since=last_gen_time)
+    if new_posts is None:
+        logger.info(f"No new comments found for {area_name} since {last_gen_time}. No articles generated.")
+        return GenerationResult(0, f"No new comments found for '{area_name.title()}'. News is up to date.")
+
+    logger.info(f"Found new comments for {area_name}. Sending to LLM...")
+    # What's already published goes in instead of the old posts, so those stories aren't written again
+    digest = area_digest.prompt_text(area)
+    saved = save_articles(area, generate_articles(new_posts, area_name, digest=digest), on_article=on_article)
+    newly_created_count = saved.created
+    logger.info(f"LLM generated {newly_created_count} new articles ({saved.duplicates} near-duplicates dropped)")
+
+    if saved.partial and newly_created_count:
+        # Do NOT update last_generated_at: the posts behind the missing articles haven't been covered yet
+        logger.warning(f"Generation for {area_name} stopped early; last_generated_at left at {last_gen_time}")
+        return GenerationResult(
+            newly_created_count,
+            f"Generated {newly_created_count} new articles for '{area_name.title()}', but generation stopped early. "
+            f"Try again to get the rest.",
+            partial=True,
+        )
+
+    if not newly_created_count and saved.duplicates and not saved.partial:
+        # The new comments only repeat what's already been reported; they're done with
+        area.last_generated_at = started_at
+        area.save(update_fields=['last_generated_at'])
+        return GenerationResult(0, f"The latest comments are already covered by the news for '{area_name.title()}'.")
+
+    if not newly_created_count:
+        # Do NOT update last_generated_at here, so the user can retry
+        raise GenerationError("Could not generate new articles from the latest comments. Please try again later.")
+
+    area.last_generated_at = started_at
+    area.save(update_fields=['last_generated_at'])
+    logger.info(f"Updated last_generated_at for {area_name} to {area.last_generated_at}")
+
+    return GenerationResult(
+        newly_created_count,
+        f"Successfully generated {newly_created_count} new articles for '{area_name.title()}'.",
+    )
+
+
+class CoverImages:
+    """
+    Looks up the cover images of a batch of articles in the background:
+    COVER_IMAGE_CONCURRENCY searches at a time over one HTTP session, and
+    one search per distinct query, however many articles share it.
+    """
+
+    def __init__(self, concurrency=None):
+        concurrency = concurrency or getattr(settings, 'COVER_IMAGE_CONCURRENCY', 4)
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='cover-images')
+        self._session = requests.Session()
+        self._searches = {}  # simplified query -> future of its image URL
+        self._articles = []  # (article, future)
+
+    def add(self, article, query, category):
+        # The image helpers live in views, next to the other upstream calls
+        from .views import cover_image_query, search_cover_image
+
+        simplified_query = cover_image_query(query, category)
+        if not simplified_query:
+            return
+        future = self._searches.get(simplified_query)
+        if future is None:
+            future = self._pool.submit(_in_thread, search_cover_image, simplified_query, self._session)
+            self._searches[simplified_query] = future
+        self._articles.append((article, future))
+
+    def finish(self, timeout=None):
+        """
+        Wait up to `timeout` seconds (COVER_IMAGE_DEADLINE_SECONDS) for the
+        searches, then save the images found in one bulk update. Searches
+        that miss the deadline keep running in the background and save
+        their article's cover when they're done (and land in the cover image
+        cache); articles whose search failed or found nothing keep an empty
+        cover_image, which `manage.py update_cover_images` looks for.
+        Returns how many articles got an image by the deadline.
+        """
+        timeout = timeout if timeout is not None else getattr(settings, 'COVER_IMAGE_DEADLINE_SECONDS', 20)
+        _, pending = wait(self._searches.values(), timeout=timeout)
+        found = []
+        late = 0
+        for article, future in self._articles:
+            if future in pending:
+                future.add_done_callback(partial(_save_late_cover, article.pk))
+                late += 1
+            elif not future.cancelled() and future.exception() is None and future.result():
+                article.cover_image = future.result()
+                found.append(article)
+        if found:
+            Article.objects.bulk_update(found, ['cover_image'])
+        if pending:
+            logger.warning(f"{len(pending)} cover image searches for {late} articles missed the {timeout}s deadline; "
+                           f"their covers are saved when they finish")
+        # Not cancelled: queued searches still run, for the late covers and the cache
+        self._pool.shutdown(wait=False)
+        if pending:
+            self._close_session_when_done(pending)
+        else:
+            self._session.close()
+        logger.info(f"Cover images: {len(found)}/{len(self._articles)} articles from {len(self._searches)} searches")
+        return len(found)
+
+    def _close_session_when_done(self, futures):
+        """Close the HTTP session from the done callback of whichever of `futures` finishes last."""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._session.close()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+
+def _save_late_cover(article_id, future):
+    """Done callback of a search that missed CoverImages.finish's deadline; runs in the pool thread."""
+    try:
+        if future.cancelled() or future.exception() is not None or not future.result():
+            return
+        Article.objects.filter(pk=article_id).filter(
+            Q(cover_image__isnull=True) | Q(cover_image='')
+        ).update(cover_image=future.result())
+    except Exception as e:
+        logger.warning(f"Could not save the late cover image of article {article_id}: {e}")
+    finally:
+        connections.close_all()
+
+
+def save_articles(area, articles_data, limiter=None, on_article=None):
+    """
+    Create Article rows from the LLM's article dicts as they arrive (any
+    iterable, streamed or not), look their cover images up concurrently
+    (see CoverImages), generate engagement questions for them all, then
+    save the covers found. Near-duplicates of recent articles in the area
+    (see near_duplicates) are dropped before they are saved.
+    on_article(article) is called as each article is saved. Returns
+    SavedArticles(created, duplicates, partial) where partial says the
+    articles_data stream raised llm.LLMError partway; what arrived before
+    that is still saved.
+    """
+    created = []
+    duplicates = 0
+    partial = False
+    covers = CoverImages()
+    try:
+        articles_data = iter(articles_data)
+        while True:
+            try:
+                article_data = next(articles_data, None)
+            except llm.LLMError as e:
+                logger.error(f"Article stream for {area.name} broke off: {e}")
+                partial = True
+                break
+            if article_data is None:
+                break
+            title = article_data.get('title')
+            content = article_data.get('content')
+            reporter_name = article_data.get('reporter_name')
+
+            if not title or not content:
+                logger.warning("Skipping article data with missing title or content.")
+                continue
+
+            # Checked against this run's earlier articles too, which are indexed as they're saved
+            minhash = near_duplicates.signature(title, content)
+            duplicate = near_duplicates.find_duplicate(area, minhash)
+            if duplicate:
+                duplicates += 1
+                logger.info(f"Skipping '{title}': {duplicate[1]:.0%} similar to article {duplicate[0]} in {area.name}")
+                continue
+
+            category = article_data.get('category', 'news')
+            try:
+                # Saved right away, so it's in as soon as the LLM has written it; the cover follows
+                article = Article.objects.create(
+                    title=title,
+                    content=content,
+                    category=category,
+                    reporter_name=reporter_name,
+                    area=area,
+                    minhash=minhash,
+                )
+                near_duplicates.index_article(article)
+            except Exception as e:
+                logger.exception(f"Error creating article '{title}': {e}")
+                continue
+            created.append(article)
+            logger.info(f"Created article: {article.title} (PK: {article.pk}) for Area: {area.name}")
+
+            # Use image keywords if available, otherwise fall back to title
+            image_keywords = article_data.get('image_keywords')
+            search_query = image_keywords if image_keywords else title
+            logger.info(f"Using image search query: '{search_query}' (from keywords: {image_keywords is not None}) for article: '{title}'")
+            covers.add(article, search_query, category)
+            if on_article is not None:
+                on_article(article)
+
+        if duplicates:
+            logger.info(f"Dropped {duplicates} near-duplicate articles for {area.name}")
+        area_digest.add_articles(area, created)
+        # Articles whose batch fails are left for `manage.py generate_article_questions`
+        generate_questions(created, limiter=limiter)
+    finally:
+        # The searches have been running since each article came in; save what they found even if the rest failed
+        covers.finish()
+    return SavedArticles(len(created), duplicates, partial)
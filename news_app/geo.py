@@ -0,0 +1,254 @@
+"""
+Spatial lookups for areas.
+
+Every geocoded Area stores a geo_cell: the id of the CELL_DEGREES x
+CELL_DEGREES lat/lon bucket it falls in, numbered row by row so that the
+cells of one latitude row form a contiguous integer range. A radius query
+turns the circle's bounding cells into a handful of such ranges, fetches
+only the areas in them through the geo_cell index, and computes exact
+distances on those candidates alone. Lookups start with a small radius and
+widen it only when too few areas turn up, so dense cities don't pull in
+thousands of candidates.
+
+Single-point lookups (nearest_areas, behind /api/nearby-areas/) always use
+the grid, whose cost follows the local area density rather than the total.
+AreaPointIndex keeps every geocoded area's coordinates in memory (NumPy) and
+answers batches of query points with one vectorized haversine over all
+areas. That pass is O(areas) per point, so it only pays off when many points
+share it: benchmark_nearby_areas puts a single NumPy lookup behind the grid
+from roughly 100k areas (p50 1.9ms vs 1.6ms, and growing linearly).
+"""
+import heapq
+import logging
+import threading
+import time
+from math import asin, atan2, cos, degrees, floor, radians, sin, sqrt
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Area
+from .utils import run_in_background
+
+try:
+    import numpy as np
+except ImportError:  # Optional, see AreaPointIndex
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371
+# Roughly 5.5km at the equator. Changing this means re-running the 0039 backfill.
+CELL_DEGREES = 0.05
+LAT_CELLS = int(180 / CELL_DEGREES)
+LON_CELLS = int(360 / CELL_DEGREES)
+# First radius tried by nearest_areas before widening
+INITIAL_SEARCH_KM = 5
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM  # Radius of Earth in kilometers
+
+    dLat = radians(lat2 - lat1)
+    dLon = radians(lon2 - lon1)
+    lat1 = radians(lat1)
+    lat2 = radians(lat2)
+
+    a = sin(dLat / 2)**2 + cos(lat1) * cos(lat2) * sin(dLon / 2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+
+    distance = R * c
+    return distance
+
+
+def _row(lat):
+    return min(max(floor((lat + 90) / CELL_DEGREES), 0), LAT_CELLS - 1)
+
+
+def _col(lon):
+    return floor(((lon + 180) % 360) / CELL_DEGREES) % LON_CELLS
+
+
+def geo_cell(lat, lon):
+    """Return the grid cell id for a coordinate, or None if it isn't geocoded."""
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * LON_CELLS + _col(lon)
+
+
+def cell_ranges(lat, lon, radius_km):
+    """
+    Return sorted, merged (low, high) geo_cell ranges that together cover
+    every point within radius_km of (lat, lon).
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    lat_min = lat - degrees(angular_radius)
+    lat_max = lat + degrees(angular_radius)
+
+    if lat_min <= -90 or lat_max >= 90 or angular_radius >= 1:
+        # The circle reaches a pole, so it spans every longitude
+        columns = [(0, LON_CELLS - 1)]
+    else:
+        # Widest longitude offset of a spherical circle, reached north/south of the centre
+        lon_delta = degrees(asin(min(1.0, sin(angular_radius) / cos(radians(lat)))))
+        if lon_delta * 2 >= 360 - CELL_DEGREES:
+            columns = [(0, LON_CELLS - 1)]
+        else:
+            first, last = _col(lon - lon_delta), _col(lon + lon_delta)
+            if first <= last:
+                columns = [(first, last)]
+            else:
+                # Wraps around the antimeridian
+                columns = [(0, last), (first, LON_CELLS - 1)]
+
+    ranges = []
+    for row in range(_row(lat_min), _row(lat_max) + 1):
+        for first, last in columns:
+            low, high = row * LON_CELLS + first, row * LON_CELLS + last
+            if ranges and low <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(high, ranges[-1][1]))
+            else:
+                ranges.append((low, high))
+    return sorted(ranges)
+
+
+def _areas_within(lat, lon, radius_km):
+    cells = Q()
+    for low, high in cell_ranges(lat, lon, radius_km):
+        cells |= Q(geo_cell__range=(low, high))
+    candidates = Area.objects.filter(cells).values_list('name', 'latitude', 'longitude')
+    for name, area_lat, area_lon in candidates.iterator():
+        distance = haversine(lat, lon, area_lat, area_lon)
+        if distance < radius_km:
+            yield distance, name
+
+
+def nearest_areas(lat, lon, limit=5, radius_km=50):
+    """
+    Return up to `limit` (distance_km, name) pairs for the areas closest to
+    (lat, lon) and strictly within radius_km, nearest first.
+    """
+    search_radius = min(radius_km, INITIAL_SEARCH_KM)
+    while True:
+        nearest = heapq.nsmallest(limit, _areas_within(lat, lon, search_radius))
+        # Anything closer than what we found would have been inside this radius too
+        if len(nearest) >= limit or search_radius >= radius_km:
+            return nearest
+        search_radius = min(search_radius * 2, radius_km)
+
+
+class AreaPointIndex:
+    """
+    In-memory NumPy arrays of area coordinates (radians, with cos(latitude)
+    precomputed) for vectorized distance queries.
+
+    Like the autocomplete index, it is rebuilt in the background when an
+    area is saved or deleted, or after AREA_POINT_INDEX_TTL seconds so other
+    workers' changes are picked up; the previous arrays keep serving
+    meanwhile.
+    """
+    # Upper bound on query points x areas per distance matrix (8MB of float64), to cap memory
+    MAX_MATRIX_CELLS = 1_000_000
+
+    def __init__(self):
+        # (names, lat, lon, cos_lat), replaced as a whole on rebuild
+        self._points = None
+        self._built_at = None
+        self._dirty = False
+        self._rebuild_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return np is not None
+
+    def build(self):
+        rows = list(
+            Area.objects.filter(latitude__isnull=False, longitude__isnull=False).values_list('name', 'latitude', 'longitude')
+        )
+        coords = np.radians(np.array([(lat, lon) for _, lat, lon in rows], dtype=np.float64).reshape(-1, 2))
+        lat, lon = coords[:, 0].copy(), coords[:, 1].copy()
+        self._points = ([name for name, _, _ in rows], lat, lon, np.cos(lat))
+        self._built_at = time.monotonic()
+        self._dirty = False
+        logger.debug(f"Area point index built: {len(rows)} areas")
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _refresh_if_stale(self):
+        if self._built_at is None:
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        ttl = getattr(settings, 'AREA_POINT_INDEX_TTL', 600)
+        if not self._dirty and time.monotonic() - self._built_at < ttl:
+            return
+        run_in_background(self._rebuild_lock, self.build, 'area-points-rebuild')
+
+    def _haversine_chunks(self, points):
+        """
+        Yield (names, a) pairs where `a` is the haversine term
+        sin²(Δφ/2) + cos φ1·cos φ2·sin²(Δλ/2) from a chunk of the (lat, lon)
+        query points to every area. It grows with distance, so ranking can
+        skip the arcsin/sqrt and only convert the rows we return.
+        """
+        self._refresh_if_stale()
+        names, lat, lon, cos_lat = self._points
+        if not names:
+            yield names, np.empty((len(points), 0))
+            return
+        query = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        chunk = max(1, self.MAX_MATRIX_CELLS // len(names))
+        for start in range(0, len(query), chunk):
+            q_lat, q_lon = query[start:start + chunk, :1], query[start:start + chunk, 1:]
+            a = np.sin((lat - q_lat) * 0.5)
+            a *= a
+            dlon = np.sin((lon - q_lon) * 0.5)
+            dlon *= dlon
+            dlon *= cos_lat
+            dlon *= np.cos(q_lat)
+            a += dlon
+            yield names, a
+
+    @staticmethod
+    def _to_km(a):
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def nearest_many(self, points, limit=5, radius_km=None):
+        """
+        For each (lat, lon) query point, return up to `limit` (distance_km,
+        name) pairs for the closest areas, nearest first, optionally only
+        those strictly within radius_km.
+        """
+        results = []
+        for names, a in self._haversine_chunks(points):
+            k = min(limit, a.shape[1])
+            if k == 0:
+                results.extend([] for _ in a)
+                continue
+            # Partial selection of the k smallest per row, then sort just those
+            nearest = np.argpartition(a, k - 1, axis=1)[:, :k]
+            distances = self._to_km(np.take_along_axis(a, nearest, axis=1))
+            for row_distances, candidates in zip(distances.tolist(), nearest.tolist()):
+                found = sorted(zip(row_distances, (names[i] for i in candidates)))
+                if radius_km is not None:
+                    found = [item for item in found if item[0] < radius_km]
+                results.append(found)
+        return results
+
+    def nearest(self, lat, lon, limit=5, radius_km=None):
+        return self.nearest_many([(lat, lon)], limit=limit, radius_km=radius_km)[0]
+
+
+area_points = AreaPointIndex()
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+def _invalidate_area_points(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'name', 'latitude', 'longitude'} & set(update_fields):
+        return
+    area_points.invalidate()
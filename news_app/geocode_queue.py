@@ -0,0 +1,157 @@
+"""
+Background geocoding of new areas.
+
+init_view and post_create used to call Nominatim while the user waited.
+New areas are now created with geocode_status=pending and the pending rows
+are the queue: a worker claims due rows, geocodes them (cache, gazetteer,
+then Nominatim at GEOCODE_RATE_LIMIT requests per second), and either
+stores the coordinates, records that the place wasn't found, or schedules
+a retry with exponential backoff. Pending areas have no coordinates, so
+nearby lookups skip them until they are done.
+
+The worker runs as a thread in every web process (GEOCODE_IN_PROCESS_WORKER),
+started with the WSGI/ASGI application, or as `manage.py geocode_worker`.
+The rate limit is kept in the database (geocoding.nominatim_limiter), so it
+holds however many of them run; a single `manage.py geocode_worker` with
+GEOCODE_IN_PROCESS_WORKER = False is still the simplest setup for several
+web processes.
+"""
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .geocoding import GeocodingError, geocode, nominatim_limiter
+from .models import Area
+from .utils import normalize_area_name
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'GEOCODE_RETRY_BASE_SECONDS', 60)
+    cap = getattr(settings, 'GEOCODE_RETRY_MAX_SECONDS', 6 * 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    # Jitter so areas that failed together don't all retry together
+    return delay * random.uniform(0.8, 1.2)
+
+
+def due_areas(now=None):
+    now = now or timezone.now()
+    return Area.objects.filter(geocode_status=Area.GEOCODE_PENDING).filter(
+        Q(geocode_next_attempt_at__isnull=True) | Q(geocode_next_attempt_at__lte=now)
+    )
+
+
+def process_pending_geocodes(limit=50, limiter=None, allow_network=None):
+    """
+    Geocode up to `limit` due pending areas. Returns the number of areas
+    processed (geocoded, not found, or rescheduled).
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'GEOCODE_LEASE_SECONDS', 300))
+    areas = list(due_areas(now).order_by('geocode_next_attempt_at', 'id')[:limit])
+    # Names that normalize to the same query share one lookup, errors included
+    results = {}
+    processed = 0
+    for area in areas:
+        # Claim the row so another worker doesn't geocode it too; the lease
+        # expires on its own if this process dies mid-way
+        claimed = due_areas(now).filter(pk=area.pk).update(geocode_next_attempt_at=now + lease)
+        if not claimed:
+            continue
+
+        query = normalize_area_name(area.name)
+        if query not in results:
+            try:
+                results[query] = geocode(query, allow_network=allow_network, limiter=limiter, raise_errors=True)
+            except GeocodingError as e:
+                results[query] = e
+
+        result = results[query]
+        if isinstance(result, GeocodingError):
+            area.geocode_attempts += 1
+            if area.geocode_attempts >= getattr(settings, 'GEOCODE_MAX_ATTEMPTS', 6):
+                area.geocode_status = Area.GEOCODE_FAILED
+                area.geocode_next_attempt_at = None
+                logger.error(f"Giving up geocoding {area.name} after {area.geocode_attempts} attempts: {result}")
+            else:
+                area.geocode_next_attempt_at = timezone.now() + timedelta(seconds=_retry_delay(area.geocode_attempts))
+                logger.warning(f"Geocoding {area.name} failed, retrying at {area.geocode_next_attempt_at:%H:%M:%S}: {result}")
+            area.save(update_fields=['geocode_status', 'geocode_attempts', 'geocode_next_attempt_at'])
+        elif result[0] is None:
+            area.geocode_status = Area.GEOCODE_NOT_FOUND
+            area.geocode_next_attempt_at = None
+            area.save(update_fields=['geocode_status', 'geocode_next_attempt_at'])
+        else:
+            area.latitude, area.longitude = result
+            area.geocode_next_attempt_at = None
+            area.save(update_fields=['latitude', 'longitude', 'geocode_next_attempt_at'])
+        processed += 1
+    return processed
+
+
+class GeocodeWorker:
+    """
+    Drains the pending geocode queue in a background thread. Woken up when
+    an area is queued; otherwise polls every GEOCODE_POLL_INTERVAL seconds
+    so retries come due and areas queued by other processes get picked up.
+    """
+
+    def __init__(self, rate=None):
+        self.limiter = nominatim_limiter(rate)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='geocode-worker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        poll_interval = getattr(settings, 'GEOCODE_POLL_INTERVAL', 30)
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = process_pending_geocodes(limiter=self.limiter)
+            except Exception as e:
+                logger.exception(f"Error processing geocode queue: {e}")
+                processed = 0
+            finally:
+                close_old_connections()
+            if not processed:
+                self._wakeup.wait(poll_interval)
+
+
+geocode_worker = GeocodeWorker()
+
+
+def start_in_process_worker():
+    """Start this process's geocode worker if GEOCODE_IN_PROCESS_WORKER is on. Called from wsgi.py/asgi.py."""
+    if getattr(settings, 'GEOCODE_IN_PROCESS_WORKER', True):
+        geocode_worker.start()
+
+
+def enqueue_geocode(area):
+    """
+    Queue a pending area for background geocoding. The worker is woken once
+    the current transaction commits so it can see the new row.
+    """
+    if area.geocode_status != Area.GEOCODE_PENDING:
+        return
+    if getattr(settings, 'GEOCODE_IN_PROCESS_WORKER', True):
+        transaction.on_commit(geocode_worker.wake)
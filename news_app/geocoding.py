@@ -0,0 +1,150 @@
+"""
+Area geocoding.
+
+geocode() looks a normalized area name up in three places, in order:
+
+1. GeocodeCacheEntry, the persistent cache of earlier answers (misses included,
+   until GEOCODE_NEGATIVE_TTL_DAYS have passed);
+2. GazetteerEntry, an offline GeoNames-style place list loaded with
+   `manage.py import_gazetteer`, preferring the most populous match;
+3. Nominatim at NOMINATIM_URL, only when GEOCODE_ALLOW_NETWORK is on, with a
+   timeout so a slow upstream can't hold a worker. Callers pace themselves
+   with nominatim_limiter(), which enforces GEOCODE_RATE_LIMIT across all
+   processes.
+
+Whatever the gazetteer or network says is written back to the cache.
+"""
+import logging
+import math
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GazetteerEntry, GeocodeCacheEntry
+from .ratelimit import SharedRateLimiter
+from .utils import normalize_area_name
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND = (None, None)
+
+
+class GeocodingError(Exception):
+    """The geocoding provider could not be reached or returned an error."""
+
+
+def nominatim_limiter(rate=None):
+    """The database-backed limiter every Nominatim caller shares, at GEOCODE_RATE_LIMIT requests per second."""
+    return SharedRateLimiter('nominatim', rate or getattr(settings, 'GEOCODE_RATE_LIMIT', 1))
+
+
+def cached_geocode(query):
+    """Return the cached (lat, lon) for a normalized query, NOT_FOUND for a cached miss, or None."""
+    entry = GeocodeCacheEntry.objects.filter(query=query).first()
+    if entry is None:
+        return None
+    if entry.latitude is None:
+        negative_ttl = timedelta(days=getattr(settings, 'GEOCODE_NEGATIVE_TTL_DAYS', 7))
+        if entry.updated_at < timezone.now() - negative_ttl:
+            return None  # Old miss, worth asking again
+        return NOT_FOUND
+    return entry.latitude, entry.longitude
+
+
+def remember_geocode(query, lat, lon, source):
+    GeocodeCacheEntry.objects.update_or_create(
+        query=query,
+        defaults={'latitude': lat, 'longitude': lon, 'source': source},
+    )
+
+
+def gazetteer_geocode(query):
+    """Return (lat, lon) of the most populous gazetteer place called `query`, or None."""
+    entry = GazetteerEntry.objects.filter(name=query).order_by('-population', 'id').first()
+    if entry is None:
+        return None
+    return entry.latitude, entry.longitude
+
+
+def nominatim_geocode(query, base_url=None, timeout=None, session=None):
+    """
+    Ask a Nominatim-compatible server for `query`. Returns (lat, lon), or
+    NOT_FOUND if the server has no match; raises GeocodingError on network
+    or HTTP errors, and on a 200 answer that isn't a list of places with
+    valid coordinates, so callers can tell "no such place" from "try again".
+    """
+    base_url = base_url or getattr(settings, 'NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+    timeout = timeout or getattr(settings, 'GEOCODE_TIMEOUT', 5)
+    headers = {'User-Agent': getattr(settings, 'GEOCODE_USER_AGENT', 'lokkal.news geocoder')}
+    try:
+        response = (session or requests).get(
+            base_url,
+            params={'q': query, 'format': 'json', 'limit': 1},
+            headers=headers,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise GeocodingError(f"Nominatim lookup for '{query}' failed: {e}") from e
+    if not isinstance(data, list):
+        # E.g. an error object from a proxy or a misconfigured endpoint; not a "no such place"
+        raise GeocodingError(f"Nominatim lookup for '{query}' returned an unexpected payload: {str(data)[:200]}")
+    if not data:
+        return NOT_FOUND
+    try:
+        lat, lon = float(data[0]['lat']), float(data[0]['lon'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise GeocodingError(f"Nominatim lookup for '{query}' returned a malformed place: {e!r}") from e
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        raise GeocodingError(f"Nominatim lookup for '{query}' returned invalid coordinates: {lat}, {lon}")
+    return lat, lon
+
+
+def geocode(area_name, allow_network=None, limiter=None, raise_errors=False):
+    """
+    Geocode an area name via the cache, the offline gazetteer and then
+    (optionally) Nominatim. Returns (lat, lon), or (None, None) when the
+    place is unknown or the network lookup failed.
+
+    limiter: a rate limiter (usually nominatim_limiter()) to acquire from
+    before each network request (cache and gazetteer hits are free).
+    raise_errors: raise GeocodingError on network failures instead of
+    returning (None, None), so a caller can retry later.
+    """
+    query = normalize_area_name(area_name)
+    if not query:
+        return NOT_FOUND
+
+    cached = cached_geocode(query)
+    if cached is not None:
+        return cached
+
+    coords = gazetteer_geocode(query)
+    if coords is not None:
+        remember_geocode(query, *coords, source=GeocodeCacheEntry.GAZETTEER)
+        return coords
+
+    if allow_network is None:
+        allow_network = getattr(settings, 'GEOCODE_ALLOW_NETWORK', True)
+    if not allow_network:
+        return NOT_FOUND
+
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        coords = nominatim_geocode(query)
+    except GeocodingError as e:
+        # Not cached, so the next lookup tries again
+        if raise_errors:
+            raise
+        logger.error(f"Error geocoding {query}: {e}")
+        return NOT_FOUND
+    remember_geocode(query, *coords, source=GeocodeCacheEntry.NOMINATIM)
+    if coords == NOT_FOUND:
+        logger.warning(f"Could not find coordinates for {query}")
+    else:
+        logger.info(f"Successfully geocoded {query}: {coords}")
+    return coords
@@ -0,0 +1,294 @@
+"""
+DB-backed queue for "Refresh News" generation jobs.
+
+generate_news used to call the LLM and fetch cover images inside the POST,
+holding a web worker for tens of seconds. It now enqueues a GenerationJob
+and returns; a worker claims queued jobs one at a time and runs
+generation.generate_news_for_area. A partial unique constraint allows one
+queued/running job per area, so repeated clicks coalesce into one job.
+
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED where the
+database supports it, and always through a conditional UPDATE on the
+status, so two workers never run the same job. While a job runs its
+worker bumps heartbeat_at every GENERATION_HEARTBEAT_INTERVAL seconds; a
+running job whose heartbeat is older than GENERATION_HEARTBEAT_TIMEOUT
+belonged to a worker that died and is requeued, however long the job itself
+has been going.
+
+The worker runs as a thread in the web process (GENERATION_IN_PROCESS_WORKER),
+started with the WSGI/ASGI application and polling every
+GENERATION_POLL_INTERVAL seconds, or as `manage.py run_generation_worker`.
+
+Progress is recorded as GenerationEvent rows (started, one per article as
+it is saved, then done/failed). The area page polls
+views.generation_job_status with the last event id it has seen and gets
+the newer ones, so readers see the first article long before the run ends
+without a request held open per reader. Events older than
+GENERATION_EVENTS_RETENTION_DAYS are pruned by the worker.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .generation import GenerationError, generate_news_for_area
+from .models import GenerationEvent, GenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds between event prunes in a worker
+PRUNE_EVERY = 3600
+_last_prune = None
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def active_job(area):
+    return GenerationJob.objects.filter(area=area, status__in=GenerationJob.ACTIVE_STATUSES).first()
+
+
+def enqueue_generation(area):
+    """
+    Queue a generation job for `area`, or join the one already queued or
+    running. Returns (job, created).
+    """
+    job = active_job(area)
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = GenerationJob.objects.create(area=area)
+    except IntegrityError:
+        # Lost the race with a concurrent request for the same area
+        job = active_job(area)
+        if job is None:
+            raise
+        return job, False
+    if getattr(settings, 'GENERATION_IN_PROCESS_WORKER', True):
+        transaction.on_commit(generation_worker.wake)
+    return job, True
+
+
+def requeue_stale_jobs():
+    """Requeue (or fail, past GENERATION_MAX_ATTEMPTS) running jobs whose worker stopped sending heartbeats."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'GENERATION_HEARTBEAT_TIMEOUT', 120))
+    stale = GenerationJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=GenerationJob.RUNNING,
+    )
+    max_attempts = getattr(settings, 'GENERATION_MAX_ATTEMPTS', 2)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=GenerationJob.FAILED, finished_at=timezone.now(), message='Generation timed out.',
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=GenerationJob.QUEUED)
+    if failed or requeued:
+        logger.warning(f"Stale generation jobs: {requeued} requeued, {failed} failed")
+
+
+def claim_next_job(worker_name=None):
+    """Mark the oldest queued job as running for this worker and return it, or None."""
+    worker_name = worker_name or default_worker_name()
+    with transaction.atomic():
+        candidates = GenerationJob.objects.select_for_update(skip_locked=True).filter(
+            status=GenerationJob.QUEUED
+        ).order_by('created_at')[:5]
+        for job in candidates:
+            now = timezone.now()
+            claimed = GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.QUEUED).update(
+                status=GenerationJob.RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                worker=worker_name,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+    return None
+
+
+def publish_event(job, kind, **data):
+    return GenerationEvent.objects.create(job=job, kind=kind, data=data)
+
+
+class Heartbeat:
+    """Bumps a running job's heartbeat_at every GENERATION_HEARTBEAT_INTERVAL seconds from a side thread."""
+
+    def __init__(self, job, interval=None):
+        self.job_id = job.pk
+        self.interval = interval or getattr(settings, 'GENERATION_HEARTBEAT_INTERVAL', 30)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'generation-heartbeat-{job.pk}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    GenerationJob.objects.filter(pk=self.job_id, status=GenerationJob.RUNNING).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception as e:
+                    # A missed beat or two is fine; the timeout is several intervals
+                    logger.warning(f"Generation job {self.job_id}: heartbeat failed: {e}")
+        finally:
+            connections.close_all()
+
+
+def _still_claimed(job):
+    """
+    The job's row, as long as it is still this run's claim. Once a missed
+    heartbeat has requeued it, or another worker has claimed it, updates
+    through this match nothing, so a stale run can't overwrite newer state.
+    """
+    return GenerationJob.objects.filter(
+        pk=job.pk, status=GenerationJob.RUNNING, worker=job.worker, attempts=job.attempts,
+    )
+
+
+def run_job(job):
+    """
+    Run a claimed job to completion and record the outcome, unless the claim
+    was lost meanwhile (see _still_claimed).
+    """
+    logger.info(f"Running generation job {job.pk} for {job.area.name} (attempt {job.attempts})")
+    publish_event(job, GenerationEvent.STARTED, attempt=job.attempts)
+
+    def on_article(article):
+        if job.first_article_at is None:
+            job.first_article_at = timezone.now()
+            _still_claimed(job).update(first_article_at=job.first_article_at)
+            logger.info(f"Generation job {job.pk}: first article after "
+                        f"{(job.first_article_at - job.started_at).total_seconds():.1f}s")
+        publish_event(
+            job, GenerationEvent.ARTICLE,
+            id=article.pk, title=article.title, cover_image=article.cover_image,
+            url=reverse('article_detail_by_slug', args=[job.area.name, article.slug]),
+        )
+
+    try:
+        with Heartbeat(job):
+            result = generate_news_for_area(job.area, on_article=on_article)
+    except GenerationError as e:
+        job.status, job.message = GenerationJob.FAILED, str(e)
+    except Exception as e:
+        logger.exception(f"Generation job {job.pk} crashed: {e}")
+        job.status, job.message = GenerationJob.FAILED, 'Something went wrong while generating news. Please try again later.'
+    else:
+        job.status, job.message = GenerationJob.DONE, result.message
+        job.articles_created = result.articles_created
+        if result.partial:
+            logger.warning(f"Generation job {job.pk} only got part of the articles: {result.message}")
+    job.finished_at = timezone.now()
+    recorded = _still_claimed(job).update(
+        status=job.status, message=job.message, articles_created=job.articles_created, finished_at=job.finished_at,
+    )
+    if not recorded:
+        logger.warning(f"Generation job {job.pk} finished as {job.status} on {job.worker} (attempt {job.attempts}), "
+                       f"but it had been requeued or claimed again meanwhile; not recording the outcome")
+        job.refresh_from_db()
+        return job
+    publish_event(job, job.status, message=job.message, articles_created=job.articles_created)
+    return job
+
+
+def prune_events(retention_days=None):
+    """Delete progress events older than GENERATION_EVENTS_RETENTION_DAYS. Returns how many went."""
+    if retention_days is None:
+        retention_days = getattr(settings, 'GENERATION_EVENTS_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = GenerationEvent.objects.filter(created_at__lt=cutoff).delete()
+    if deleted:
+        logger.info(f"Pruned {deleted} generation events older than {retention_days} days")
+    return deleted
+
+
+def _prune_events_if_due():
+    global _last_prune
+    now = time.monotonic()
+    if _last_prune is not None and now - _last_prune < PRUNE_EVERY:
+        return
+    _last_prune = now
+    prune_events()
+
+
+def run_pending_jobs(worker_name=None, limit=None):
+    """Claim and run queued jobs until none are left (or `limit` ran). Returns how many ran."""
+    requeue_stale_jobs()
+    _prune_events_if_due()
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next_job(worker_name)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+class GenerationWorker:
+    """
+    Runs queued generation jobs in a background thread. Woken up when a job
+    is queued; otherwise polls every GENERATION_POLL_INTERVAL seconds so
+    jobs queued by other processes and requeued stale jobs get picked up.
+    """
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='generation-worker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        poll_interval = getattr(settings, 'GENERATION_POLL_INTERVAL', 5)
+        while True:
+            self._wakeup.clear()
+            try:
+                run_pending_jobs()
+            except Exception as e:
+                logger.exception(f"Error running generation jobs: {e}")
+            finally:
+                close_old_connections()
+            self._wakeup.wait(poll_interval)
+
+
+generation_worker = GenerationWorker()
+
+
+def start_in_process_worker():
+    """
+    Start this process's generation worker if GENERATION_IN_PROCESS_WORKER
+    is on. Called from wsgi.py/asgi.py, so a web process polls the queue
+    from the start instead of only after its first enqueue.
+    """
+    if getattr(settings, 'GENERATION_IN_PROCESS_WORKER', True):
+        generation_worker.start()
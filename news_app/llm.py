@@ -0,0 +1,366 @@
+"""
+Shared Gemini client for every LLM call in the app.
+
+- Model handles are built once per (model name, response schema) and
+  reused, instead of a new genai.GenerativeModel on every call.
+- Failed calls are retried with jittered exponential backoff (full jitter,
+  LLM_RETRY_BASE_SECONDS doubling up to LLM_RETRY_MAX_SECONDS), not a fixed
+  sleep. Requests Gemini rejects outright (bad arguments, auth) aren't retried.
+- A circuit breaker opens after LLM_CIRCUIT_FAILURE_THRESHOLD upstream
+  failures in a row. While it's open, calls fail at once with
+  CircuitOpenError instead of sleeping through retries. After
+  LLM_CIRCUIT_RESET_SECONDS, a single trial call decides whether it closes.
+- Every call records latency and token counts per call name; see metrics().
+- stream_json_items() streams the response and hands out the elements of
+  its top-level array as soon as each one is complete.
+
+The API key is configured in views, which every caller imports first.
+set_model_factory() swaps Gemini for a stand-in such as
+fake_services.FakeGemini, for benchmarks and load tests.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import google.generativeai as genai
+from django.conf import settings
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    # The request itself is wrong; asking again won't help
+    NON_RETRYABLE = (
+        google_exceptions.InvalidArgument,
+        google_exceptions.PermissionDenied,
+        google_exceptions.Unauthenticated,
+        google_exceptions.NotFound,
+    )
+except ImportError:
+    NON_RETRYABLE = ()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemini-2.5-flash'
+
+
+class LLMError(Exception):
+    """The LLM call failed after all attempts."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open: Gemini has been failing, so the call wasn't made."""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or getattr(settings, 'LLM_CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = reset_timeout or getattr(settings, 'LLM_CIRCUIT_RESET_SECONDS', 60)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead now. In half-open state only one trial call is let through."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info('LLM circuit closed, Gemini is answering again')
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.error(f"LLM circuit opened after {self.failures} failures; failing fast for {self.reset_timeout}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class CallMetrics:
+    """Counters and recent latencies for one kind of call."""
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0
+
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'retries': self.retries,
+            'rejected_by_circuit': self.rejected,
+            'prompt_tokens': self.prompt_tokens,
+            'output_tokens': self.output_tokens,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+        }
+
+
+def gemini_model(model_name, generation_config):
+    return genai.GenerativeModel(model_name, generation_config=generation_config) # type: ignore
+
+
+breaker = CircuitBreaker()
+_model_factory = gemini_model
+_models = {}
+_models_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_model(model_name, schema=None):
+    """A GenerativeModel answering JSON in `schema`, built once per (model, schema) and shared."""
+    key = (model_name, json.dumps(schema, sort_keys=True))
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                generation_config = {"response_mime_type": "application/json"}
+                if schema is not None:
+                    generation_config["response_schema"] = schema
+                model = _models[key] = _model_factory(model_name, generation_config)
+    return model
+
+
+def set_model_factory(factory):
+    """
+    Build model handles with factory(model_name, generation_config) from now
+    on, and drop the ones built so far. Returns the previous factory.
+    """
+    global _model_factory
+    with _models_lock:
+        previous, _model_factory = _model_factory, factory
+        _models.clear()
+    return previous
+
+
+def _record(name, **changes):
+    with _metrics_lock:
+        entry = _metrics.setdefault(name, CallMetrics())
+        latency = changes.pop('latency', None)
+        if latency is not None:
+            entry.latencies.append(latency)
+        for field, value in changes.items():
+            setattr(entry, field, getattr(entry, field) + value)
+
+
+def metrics():
+    """{call name: {calls, failures, retries, rejected_by_circuit, tokens, latency p50/p95}} for this process."""
+    with _metrics_lock:
+        return {name: entry.snapshot() for name, entry in _metrics.items()}
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    base = getattr(settings, 'LLM_RETRY_BASE_SECONDS', 1)
+    cap = getattr(settings, 'LLM_RETRY_MAX_SECONDS', 16)
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def generate_json(prompt, schema, model_name=DEFAULT_MODEL, max_attempts=3, limiter=None, name='llm'):
+    """
+    Send `prompt` and return the parsed JSON response.
+
+    limiter: a ratelimit.TokenBucket to take a token from before each request.
+    name: what the call is for, used to group metrics and log lines.
+    Raises CircuitOpenError while the breaker is open, LLMError once all
+    attempts failed.
+    """
+    model = get_model(model_name, schema)
+    last_error = None
+    for attempt in range(1, max_attempts + 1):
+        if not breaker.allow():
+            _record(name, rejected=1)
+            raise CircuitOpenError(f"{name}: Gemini is failing, not calling it for now")
+        if limiter is not None:
+            limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = model.generate_content(prompt)
+        except Exception as e:
+            latency = time.monotonic() - started
+            last_error = e
+            if isinstance(e, NON_RETRYABLE):
+                breaker.record_success()  # Gemini answered; the request was the problem
+                _record(name, calls=1, failures=1, latency=latency)
+                raise LLMError(f"{name}: Gemini rejected the request: {e}") from e
+            breaker.record_failure()
+            _record(name, calls=1, failures=1, latency=latency)
+        else:
+            latency = time.monotonic() - started
+            breaker.record_success()
+            usage = getattr(response, 'usage_metadata', None)
+            prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+            output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+            _record(name, calls=1, latency=latency, prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+            logger.info(f"{name}: {model_name} answered in {latency:.2f}s ({prompt_tokens} prompt / {output_tokens} output tokens)")
+            try:
+                return json.loads(response.text)
+            except (ValueError, AttributeError) as e:
+                # Gemini is up, the answer was just unusable; retry without blaming upstream
+                last_error = e
+                _record(name, failures=1)
+
+        logger.warning(f"{name}: attempt {attempt}/{max_attempts} failed: {last_error}")
+        if breaker.state == CircuitBreaker.OPEN:
+            break  # No point sleeping before a retry the breaker won't allow
+        if attempt < max_attempts:
+            _record(name, retries=1)
+            time.sleep(backoff_delay(attempt))
+    raise LLMError(f"{name}: failed after {max_attempts} attempts: {last_error}") from last_error
+
+
+class JSONArrayItemParser:
+    """
+    Incremental parser for streamed responses shaped like {"key": [{...}, {...}]}:
+    feed() it text as it arrives and get back each array element as soon as
+    its closing brace has arrived. Only the element being read is buffered.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.buffer = []
+        self.complete = False
+
+    def feed(self, text):
+        items = []
+        for char in text:
+            if self.in_string:
+                if self.stack and len(self.stack) > 2:
+                    self.buffer.append(char)
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            reading_item = len(self.stack) > 2 or (len(self.stack) == 2 and self.stack[-1] == '[' and char in '{[')
+            if reading_item:
+                self.buffer.append(char)
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.stack.append(char)
+            elif char in '}]':
+                if self.stack:
+                    self.stack.pop()
+                if reading_item and len(self.stack) == 2:
+                    items.append(json.loads(''.join(self.buffer)))
+                    self.buffer = []
+                elif not self.stack:
+                    self.complete = True
+        return items
+
+
+def _chunk_text(chunk):
+    try:
+        return chunk.text
+    except (ValueError, AttributeError):
+        return ''  # A chunk without text, e.g. only safety ratings
+
+
+def stream_json_items(prompt, schema, model_name=DEFAULT_MODEL, max_attempts=3, limiter=None, name='llm'):
+    """
+    Like generate_json, but streams the response and yields the elements of
+    its top-level array (e.g. each article of {"articles": [...]}) as they
+    complete. A failure before the first element is retried like
+    generate_json. A failure after it raises LLMError without retrying, so
+    nothing is yielded twice; the elements already yielded stand.
+    """
+    model = get_model(model_name, schema)
+    last_error = None
+    for attempt in range(1, max_attempts + 1):
+        if not breaker.allow():
+            _record(name, rejected=1)
+            raise CircuitOpenError(f"{name}: Gemini is failing, not calling it for now")
+        if limiter is not None:
+            limiter.acquire()
+        started = time.monotonic()
+        parser = JSONArrayItemParser()
+        yielded = 0
+        try:
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                for item in parser.feed(_chunk_text(chunk)):
+                    if not yielded:
+                        logger.info(f"{name}: first item after {time.monotonic() - started:.2f}s")
+                    yielded += 1
+                    yield item
+        except Exception as e:
+            latency = time.monotonic() - started
+            last_error = e
+            if isinstance(e, NON_RETRYABLE):
+                breaker.record_success()
+                _record(name, calls=1, failures=1, latency=latency)
+                raise LLMError(f"{name}: Gemini rejected the request: {e}") from e
+            if isinstance(e, ValueError):
+                # Malformed JSON in the stream: Gemini is up, the answer was unusable
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            _record(name, calls=1, failures=1, latency=latency)
+            if yielded:
+                raise LLMError(f"{name}: stream broke off after {yielded} items: {e}") from e
+        else:
+            latency = time.monotonic() - started
+            breaker.record_success()
+            usage = getattr(response, 'usage_metadata', None)
+            prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+            output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+            _record(name, calls=1, latency=latency, prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+            logger.info(f"{name}: {model_name} streamed {yielded} items in {latency:.2f}s "
+                        f"({prompt_tokens} prompt / {output_tokens} output tokens)")
+            if parser.complete or yielded:
+                return
+            last_error = ValueError('the response ended before its JSON was complete')
+            _record(name, failures=1)
+
+        logger.warning(f"{name}: attempt {attempt}/{max_attempts} failed: {last_error}")
+        if breaker.state == CircuitBreaker.OPEN:
+            break
+        if attempt < max_attempts:
+            _record(name, retries=1)
+            time.sleep(backoff_delay(attempt))
+    raise LLMError(f"{name}: failed after {max_attempts} attempts: {last_error}") from last_error
@@ -0,0 +1,134 @@
+"""
+Persistent cache of LLM responses.
+
+A generation that is retried, or rerun by regenerate_all_articles, sends
+the exact same comments to Gemini again. Responses are stored in
+LLMResponseCache under a sha256 of the model name, the prompt template
+version, the area and the whitespace-normalized input text, so a repeat is
+answered from the database instead. Bump the prompt version whenever the
+prompt or response schema changes, or old answers keep being served.
+
+Entries expire LLM_CACHE_TTL_DAYS after they were created. The least
+recently used are evicted while there are more than LLM_CACHE_MAX_ENTRIES
+or their responses add up to more than LLM_CACHE_MAX_BYTES; both limits are
+enforced every PRUNE_EVERY writes, and by `llm_cache_stats --prune`.
+Hit/miss counters are kept per process (stats()); every entry also counts
+its own hits and how long the original call took, so `manage.py
+llm_cache_stats` can report calls and seconds saved across processes.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMResponseCache
+from .utils import evict_least_recently_used
+
+logger = logging.getLogger(__name__)
+
+# Prune on every Nth write rather than on each one
+PRUNE_EVERY = 50
+
+_counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_counters_lock = threading.Lock()
+_writes_since_prune = 0
+
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+def stats():
+    """This process's hit/miss/store/eviction counts since start-up."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def cache_enabled():
+    return getattr(settings, 'LLM_CACHE_ENABLED', True)
+
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def cache_key(model_name, prompt_version, area_name, text):
+    payload = json.dumps(
+        [model_name, str(prompt_version), normalize_text(area_name).lower(), normalize_text(text)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'LLM_CACHE_TTL_DAYS', 30))
+
+
+def get_cached_response(key):
+    """Return the cached response for `key`, or None on a miss (expired entries count as misses)."""
+    if not cache_enabled():
+        return None
+    entry = LLMResponseCache.objects.filter(key=key, created_at__gte=_expiry_cutoff()).only('pk', 'response').first()
+    if entry is None:
+        _count('misses')
+        return None
+    LLMResponseCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    _count('hits')
+    return entry.response
+
+
+def store_response(key, response, model_name, prompt_version, area_name='', generation_seconds=0):
+    if not cache_enabled():
+        return
+    now = timezone.now()
+    defaults = {
+        'model_name': model_name,
+        'prompt_version': str(prompt_version),
+        'area_name': area_name or '',
+        'response': response,
+        'size_bytes': len(json.dumps(response, ensure_ascii=False).encode('utf-8')),
+        'generation_seconds': generation_seconds,
+        'hits': 0,
+        'created_at': now,
+        'last_used_at': now,
+    }
+    try:
+        LLMResponseCache.objects.update_or_create(key=key, defaults=defaults)
+    except IntegrityError:
+        # Another worker stored the same response first
+        return
+    _count('stores')
+
+    global _writes_since_prune
+    with _counters_lock:
+        _writes_since_prune += 1
+        due = _writes_since_prune >= PRUNE_EVERY
+        if due:
+            _writes_since_prune = 0
+    if due:
+        prune()
+
+
+def prune(max_entries=None, max_bytes=None):
+    """
+    Delete expired entries, then the least recently used until at most
+    max_entries remain and they take at most max_bytes. Returns how many went.
+    """
+    if max_entries is None:
+        max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 5000)
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024)
+    deleted, _ = LLMResponseCache.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+    deleted += evict_least_recently_used(LLMResponseCache.objects.all(), max_entries=max_entries, max_bytes=max_bytes)
+    if deleted:
+        _count('evictions', deleted)
+        logger.info(f"Pruned {deleted} LLM cache entries")
+    return deleted
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from news_app.models import Article
+from news_app.near_duplicates import index_article
+
+
+class Command(BaseCommand):
+    help = (
+        'Computes MinHash signatures and LSH buckets for articles that have none, so new articles '
+        'are checked against them for near-duplicates. With --all, rebuilds them for every article.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every signature, e.g. after changing the MinHash parameters')
+        parser.add_argument('--batch-size', type=int, default=500, help='Articles read per query (default: 500)')
+
+    def handle(self, *args, **options):
+        articles = Article.objects.only('id', 'title', 'content', 'area_id', 'created_at', 'minhash', 'slug')
+        if not options['all']:
+            articles = articles.filter(minhash__isnull=True)
+        done = 0
+        for article in articles.iterator(chunk_size=options['batch_size']):
+            if options['all']:
+                article.minhash = None
+            index_article(article)
+            done += 1
+            if done % 1000 == 0:
+                self.stdout.write(f'{done} articles indexed...')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {done} articles for near-duplicate detection.'))
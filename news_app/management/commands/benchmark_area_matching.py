@@ -0,0 +1,108 @@
+import random
+import statistics
+import time
+from difflib import SequenceMatcher
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news_app.area_search import rebuild_area_trigrams
+from news_app.models import Area
+from news_app.views import find_similar_area
+
+SYLLABLES = [
+    'ba', 'bel', 'cha', 'dar', 'den', 'ga', 'gar', 'hal', 'ka', 'kon', 'la', 'lin', 'ma', 'mer',
+    'na', 'nor', 'pa', 'pur', 'ra', 'ram', 'sa', 'san', 'ta', 'ton', 'va', 'vil', 'wa', 'wood',
+]
+SUFFIXES = ['', '', '', ' nagar', ' park', ' town', ' city', ' colony', ' east', ' west']
+
+
+def full_scan_match(normalized_input):
+    """The previous find_similar_area: SequenceMatcher against every area."""
+    best_match = None
+    highest_ratio = 0.0
+    for area in Area.objects.all():
+        similarity_ratio = SequenceMatcher(None, normalized_input, area.name).ratio()
+        if similarity_ratio > highest_ratio and similarity_ratio >= 0.4:
+            highest_ratio = similarity_ratio
+            best_match = area
+    return best_match
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks fuzzy area matching (trigram candidates vs. full SequenceMatcher scan) '
+        'on synthetic areas. All data is created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                            help='Area counts to benchmark (default: 1000 10000 100000)')
+        parser.add_argument('--queries', type=int, default=20,
+                            help='Misspelled lookups per size (default: 20)')
+        parser.add_argument('--full-scan-queries', type=int, default=5,
+                            help='Lookups timed with the old full scan, which is slow at large sizes (default: 5)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        existing = set(Area.objects.values_list('name', flat=True))
+
+        self.stdout.write(f"{'areas':>8} {'trigram p50':>12} {'trigram p95':>12} {'full scan p50':>14} {'speedup':>8} {'agree':>6}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                names = self._seed_areas(rng, size, existing)
+                rebuild_area_trigrams()
+                queries = [self._misspell(rng, rng.choice(names)) for _ in range(options['queries'])]
+
+                trigram_ms = []
+                trigram_results = []
+                for query in queries:
+                    started = time.perf_counter()
+                    result = find_similar_area(query)
+                    trigram_ms.append((time.perf_counter() - started) * 1000)
+                    trigram_results.append(result['area'].name if result else None)
+
+                scan_ms = []
+                agree = 0
+                scan_queries = queries[:options['full_scan_queries']]
+                for query, trigram_result in zip(scan_queries, trigram_results):
+                    started = time.perf_counter()
+                    match = full_scan_match(query)
+                    scan_ms.append((time.perf_counter() - started) * 1000)
+                    agree += (match.name if match else None) == trigram_result
+
+                transaction.set_rollback(True)
+
+            trigram_p50 = statistics.median(trigram_ms)
+            scan_p50 = statistics.median(scan_ms) if scan_ms else float('nan')
+            self.stdout.write(
+                f"{size:>8} {trigram_p50:>10.2f}ms {self._p95(trigram_ms):>10.2f}ms "
+                f"{scan_p50:>12.2f}ms {scan_p50 / trigram_p50:>7.1f}x {agree:>3}/{len(scan_ms)}"
+            )
+
+    def _seed_areas(self, rng, size, existing):
+        names = set()
+        while len(names) < size:
+            name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + rng.choice(SUFFIXES)
+            if name not in existing:
+                names.add(name)
+        names = sorted(names)
+        Area.objects.bulk_create([Area(name=name) for name in names], batch_size=1000)
+        return names
+
+    def _misspell(self, rng, name):
+        chars = list(name)
+        i = rng.randrange(len(chars))
+        edit = rng.choice(['drop', 'swap', 'replace'])
+        if edit == 'drop' and len(chars) > 3:
+            del chars[i]
+        elif edit == 'swap' and i < len(chars) - 1:
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        else:
+            chars[i] = rng.choice('aeiourstn')
+        return ''.join(chars)
+
+    def _p95(self, values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
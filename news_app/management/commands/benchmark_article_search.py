@@ -0,0 +1,121 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from news_app.article_search import fts_available, search_articles
+from news_app.models import Area, Article
+
+SYLLABLES = [
+    'ba', 'bel', 'cha', 'dar', 'den', 'ga', 'gar', 'hal', 'ka', 'kon', 'la', 'lin', 'ma', 'mer',
+    'na', 'nor', 'pa', 'pur', 'ra', 'ram', 'sa', 'san', 'ta', 'ton', 'va', 'vil', 'wa', 'wood',
+]
+
+
+def icontains_search(text, limit):
+    """What a search built on the ORM would do: a LIKE scan over every article."""
+    articles = Article.objects.order_by('-id')
+    for word in text.split():
+        articles = articles.filter(Q(title__icontains=word) | Q(content__icontains=word))
+    return list(articles.values_list('id', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks FTS5 article search against an icontains scan on synthetic articles. '
+        'All data is created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100000, help='Synthetic articles to seed (default: 100000)')
+        parser.add_argument('--queries', type=int, default=30, help='Searches to time per engine (default: 30)')
+        parser.add_argument('--limit', type=int, default=20, help='Results per search (default: 20)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Full-text search needs SQLite FTS5.')
+
+        rng = random.Random(options['seed'])
+        limit = options['limit']
+        vocabulary = self._vocabulary(rng, 20000)
+        # Word frequencies in real text are roughly Zipfian: a few words are everywhere, most are rare
+        cum_weights = []
+        total = 0.0
+        for rank in range(1, len(vocabulary) + 1):
+            total += 1 / rank
+            cum_weights.append(total)
+
+        # Mix of single words, pairs and prefixes, like people type into a search box,
+        # skipping the stop-word-like head of the distribution
+        queries = []
+        for _ in range(options['queries']):
+            words = rng.sample(vocabulary[200:], rng.choice([1, 1, 2]))
+            if rng.random() < 0.3:
+                words[-1] = words[-1][:4]
+            queries.append(' '.join(words))
+
+        with transaction.atomic():
+            started = time.monotonic()
+            self._seed_articles(rng, options['articles'], vocabulary, cum_weights)
+            self.stdout.write(f"Seeded {options['articles']} articles in {time.monotonic() - started:.1f}s (FTS triggers included)")
+
+            fts_ms = self._time(lambda query: search_articles(query, limit=limit), queries)
+            like_ms = self._time(lambda query: icontains_search(query, limit), queries)
+
+            # Walking five pages deep should cost about the same as the first page
+            cursor = None
+            page_ms = []
+            for _ in range(5):
+                started = time.perf_counter()
+                _, cursor = search_articles(queries[0], limit=limit, cursor=cursor)
+                page_ms.append((time.perf_counter() - started) * 1000)
+                if cursor is None:
+                    break
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'engine':>10} {'p50':>10} {'p95':>10}")
+        self.stdout.write(f"{'fts5':>10} {statistics.median(fts_ms):>8.2f}ms {self._p95(fts_ms):>8.2f}ms")
+        self.stdout.write(f"{'icontains':>10} {statistics.median(like_ms):>8.2f}ms {self._p95(like_ms):>8.2f}ms")
+        self.stdout.write(
+            f"Speedup: {statistics.median(like_ms) / statistics.median(fts_ms):.1f}x at p50, "
+            f"{self._p95(like_ms) / self._p95(fts_ms):.1f}x at p95"
+        )
+        self.stdout.write('FTS page latencies: ' + ', '.join(f'{ms:.2f}ms' for ms in page_ms))
+
+    def _vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+        words = sorted(words)
+        rng.shuffle(words)
+        return words
+
+    def _seed_articles(self, rng, count, vocabulary, cum_weights):
+        area, _ = Area.objects.get_or_create(name='benchmark area')
+        batch = []
+        for i in range(count):
+            title = ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=8)).capitalize()
+            content = ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=150))
+            # Slugs are unique, and bulk_create skips Article.save() where they're normally generated
+            batch.append(Article(title=title, content=content, area=area, slug=f'benchmark-{i}'))
+            if len(batch) == 1000:
+                Article.objects.bulk_create(batch)
+                batch = []
+        Article.objects.bulk_create(batch)
+
+    def _time(self, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _p95(self, values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,187 @@
+import io
+import random
+import statistics
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from news_app import cover_image_cache, llm
+from news_app.fake_services import FakeGemini, FakeUnsplashServer
+from news_app.jobs import run_pending_jobs
+from news_app.models import (Advertisement, Area, CoverImageCacheEntry, GenerationJob, Post, RegenerationAreaResult,
+                             RegenerationRun)
+
+PREFIX = 'benchmark generation'
+SCENARIOS = ['generate', 'regenerate', 'reclassify']
+WORDS = (
+    'road water power school market bus traffic rain park garbage festival temple police hospital '
+    'shop price queue street light drain noise metro bridge flood tree dog library tax vote'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives Refresh News jobs, regenerate_all_articles and reclassify_advertisements end to end '
+        'against an in-process stand-in Gemini and a local stand-in Unsplash, and reports p50/p95 '
+        'latency and throughput. Creates "benchmark generation" areas and ads, and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--areas', type=int, default=20, help='Areas to generate (default: 20)')
+        parser.add_argument('--posts-per-area', type=int, default=30, help='Posts per area (default: 30)')
+        parser.add_argument('--ads', type=int, default=50, help='Advertisements to reclassify (default: 50)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Generation workers / regenerate --max-concurrency (default: 4)')
+        parser.add_argument('--latency', type=float, default=0.5, help='Stand-in Gemini seconds per call (default: 0.5)')
+        parser.add_argument('--per-1k-tokens', type=float, default=0.05,
+                            help='Stand-in Gemini seconds per 1000 prompt tokens (default: 0.05)')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of stand-in Gemini calls that fail (default: 0)')
+        parser.add_argument('--image-latency', type=float, default=0.1,
+                            help='Stand-in Unsplash seconds per search (default: 0.1)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if Area.objects.filter(name__startswith=PREFIX).exists():
+            raise CommandError(f'Areas named "{PREFIX} ..." already exist; delete them or let the last run finish.')
+
+        self.rng = random.Random(options['seed'])
+        fake = FakeGemini(latency=options['latency'], per_1k_tokens=options['per_1k_tokens'],
+                          error_rate=options['error_rate'], seed=options['seed'])
+        previous_factory = llm.set_model_factory(fake)
+        previous_breaker, llm.breaker = llm.breaker, llm.CircuitBreaker()
+        images = FakeUnsplashServer(latency=options['image_latency']).start()
+        # Stand-in image searches are cached like real ones; they're removed again afterwards
+        last_cover_entry = CoverImageCacheEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        cover_image_cache.memory.clear()
+        try:
+            # Every call should reach the stand-in, so nothing is served from the response cache
+            with override_settings(LLM_CACHE_ENABLED=False, UNSPLASH_SEARCH_URL=images.url,
+                                   GENERATION_IN_PROCESS_WORKER=False):
+                areas = self._seed_areas(options['areas'], options['posts_per_area'])
+                self.stdout.write(
+                    f"Stand-in Gemini: {options['latency']}s + {options['per_1k_tokens']}s/1k tokens, "
+                    f"{options['error_rate']:.0%} errors. {len(areas)} areas x {options['posts_per_area']} posts, "
+                    f"{options['workers']} workers."
+                )
+                self.stdout.write(f"{'scenario':<26} {'p50':>9} {'p95':>9} {'throughput':>22}")
+                if 'generate' in options['scenarios']:
+                    self._bench_generate(areas, options['workers'])
+                if 'regenerate' in options['scenarios']:
+                    self._bench_regenerate(areas, options['workers'])
+                if 'reclassify' in options['scenarios']:
+                    self._bench_reclassify(areas[0], options['ads'])
+                self._report_llm(fake, images)
+        finally:
+            images.stop()
+            llm.set_model_factory(previous_factory)
+            llm.breaker = previous_breaker
+            Area.objects.filter(name__startswith=PREFIX).delete()
+            RegenerationRun.objects.filter(options__benchmark=True).delete()
+            CoverImageCacheEntry.objects.filter(id__gt=last_cover_entry).delete()
+            cover_image_cache.memory.clear()
+
+    def _seed_areas(self, count, posts_per_area):
+        areas = Area.objects.bulk_create([
+            Area(name=f'{PREFIX} {i}', geocode_status=Area.GEOCODE_NOT_FOUND) for i in range(count)
+        ])
+        areas = list(Area.objects.filter(name__startswith=PREFIX).order_by('id'))
+        Post.objects.bulk_create([
+            Post(area=area, content=' '.join(self.rng.choices(WORDS, k=self.rng.randint(15, 60))).capitalize() + '.',
+                 reporter_name=self.rng.choice([None, 'Asha', 'Ravi']))
+            for area in areas for _ in range(posts_per_area)
+        ])
+        return areas
+
+    def _row(self, label, values, unit, throughput):
+        if values:
+            p50, p95 = statistics.median(values), self._p95(values)
+            self.stdout.write(f"{label:<26} {p50:>8.3f}{unit} {p95:>8.3f}{unit} {throughput:>22}")
+        else:
+            self.stdout.write(f"{label:<26} {'-':>9} {'-':>9} {throughput:>22}")
+
+    def _bench_generate(self, areas, workers):
+        """POST /generate-news/ for every area, then drain the job queue with `workers` worker threads."""
+        client = Client()
+        enqueue = []
+        for area in areas:
+            started = time.perf_counter()
+            response = client.post('/generate-news/', {'area': area.name}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            enqueue.append(time.perf_counter() - started)
+            if response.status_code != 202:
+                raise CommandError(f'generate_news answered {response.status_code} for {area.name}')
+        self._row('generate_news POST', [s * 1000 for s in enqueue], 'ms', f"{len(areas) / sum(enqueue):.0f} req/s")
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=run_pending_jobs, kwargs={'worker_name': f'benchmark-{i}'})
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        jobs = GenerationJob.objects.filter(area__in=areas)
+        durations = [(job.finished_at - job.started_at).total_seconds() for job in jobs if job.finished_at]
+        articles = sum(job.articles_created for job in jobs)
+        failed = jobs.filter(status=GenerationJob.FAILED).count()
+        self._row('generation job (run)', durations, 's ',
+                  f"{len(durations) / elapsed * 60:.1f} jobs/min")
+        # Articles are saved as they stream in, well before the job finishes
+        first_article = [(job.first_article_at - job.started_at).total_seconds() for job in jobs if job.first_article_at]
+        self._row('time to first article', first_article, 's ', f"{len(first_article)} jobs")
+        self.stdout.write(f"{'':<26} {articles} articles ({articles / elapsed * 60:.1f}/min), {failed} jobs failed")
+
+    def _bench_regenerate(self, areas, workers):
+        started = time.monotonic()
+        call_command('regenerate_all_articles', '--area-names', *[area.name for area in areas],
+                     '--skip-existing-check', '--max-concurrency', str(workers), '--rpm', '100000',
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        elapsed = time.monotonic() - started
+        run = RegenerationRun.objects.order_by('-id').first()
+        # Tag it so cleanup finds it; the areas' cascade takes the results with them
+        run.options['benchmark'] = True
+        run.save(update_fields=['options'])
+        results = list(run.results.all())
+        articles = sum(result.articles_created for result in results)
+        failed = sum(result.status == RegenerationAreaResult.FAILED for result in results)
+        self._row('regenerate area', [result.duration_seconds for result in results], 's ',
+                  f"{len(results) / elapsed * 60:.1f} areas/min")
+        self.stdout.write(f"{'':<26} {articles} articles ({articles / elapsed * 60:.1f}/min), {failed} areas failed")
+
+    def _bench_reclassify(self, area, count):
+        Advertisement.objects.bulk_create([
+            Advertisement(area=area, content=' '.join(self.rng.choices(WORDS, k=20)), slug=f'benchmark-ad-{i}')
+            for i in range(count)
+        ])
+        before = llm.metrics().get('categorize_advertisement', {}).get('calls', 0)
+        llm_latencies = []
+        started = time.monotonic()
+        call_command('reclassify_advertisements', '--area', area.name, '--delay', '0', stdout=io.StringIO())
+        elapsed = time.monotonic() - started
+        stats = llm.metrics().get('categorize_advertisement', {})
+        calls = stats.get('calls', 0) - before
+        self.stdout.write(
+            f"{'reclassify advertisement':<26} {stats.get('latency_p50', 0):>8.3f}s {stats.get('latency_p95', 0):>8.3f}s "
+            f"{count / elapsed:>16.1f} ads/s"
+        )
+        self.stdout.write(f"{'':<26} {calls} LLM calls")
+
+    def _report_llm(self, fake, images):
+        self.stdout.write(f"\nStand-in Gemini: {fake.calls} calls, {fake.errors} injected errors; "
+                          f"stand-in Unsplash: {images.requests} searches")
+        self.stdout.write(f"{'LLM call':<26} {'calls':>6} {'fail':>5} {'retry':>6} {'p50':>8} {'p95':>8} {'tokens in/out':>16}")
+        for name, stats in sorted(llm.metrics().items()):
+            self.stdout.write(
+                f"{name:<26} {stats['calls']:>6} {stats['failures']:>5} {stats['retries']:>6} "
+                f"{stats['latency_p50']:>7.3f}s {stats['latency_p95']:>7.3f}s "
+                f"{stats['prompt_tokens']:>8}/{stats['output_tokens']}"
+            )
+
+    def _p95(self, values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,109 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from news_app import llm
+from news_app.fake_services import FakeGemini
+from news_app.generation import GenerationError, format_comments, generate_articles
+from news_app.models import Area, Post
+from news_app.views import run_gemini
+
+WORDS = (
+    'road water power school market bus traffic rain park garbage festival temple police hospital '
+    'shop price queue street light drain noise metro bridge flood tree dog library tax vote'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks single-prompt generation against the map-reduce pipeline on synthetic posts, '
+        'with FakeGemini standing in for Gemini and the LLM cache off. All data is created inside a '
+        'transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Backlog sizes to benchmark (default: 100 1000 10000)')
+        parser.add_argument('--latency', type=float, default=0.3, help='Stand-in LLM seconds per call (default: 0.3)')
+        parser.add_argument('--per-1k-tokens', type=float, default=0.02,
+                            help='Stand-in LLM seconds per 1000 prompt tokens (default: 0.02)')
+        parser.add_argument('--context-limit', type=int, default=128000,
+                            help='Stand-in LLM context limit in tokens (default: 128000)')
+        parser.add_argument('--token-budget', type=int, help='Tokens per chunk (default: GENERATION_TOKEN_BUDGET)')
+        parser.add_argument('--concurrency', type=int, help='Concurrent chunk summaries (default: GENERATION_MAP_CONCURRENCY)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        previous_factory = llm.set_model_factory(FakeGemini())
+        try:
+            # Every call has to reach the stand-in, or the second pipeline run would be all cache hits
+            with override_settings(LLM_CACHE_ENABLED=False):
+                self._benchmark(options)
+        finally:
+            llm.set_model_factory(previous_factory)
+
+    def _benchmark(self, options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'posts':>7} {'pipeline':>10} {'time':>8} {'calls':>6} {'max prompt':>11} {'peak mem':>9} {'articles':>9}"
+        )
+        for count in options['posts']:
+            with transaction.atomic():
+                area = Area.objects.create(name=f'benchmark map reduce {count}')
+                self._seed_posts(rng, area, count)
+                posts = area.area_posts.all()
+
+                def single():
+                    # What generation used to do: every post in one string, one prompt
+                    return run_gemini(format_comments(list(posts)), area.name)
+
+                def map_reduce():
+                    try:
+                        return list(generate_articles(posts, area.name, token_budget=options['token_budget'],
+                                                      concurrency=options['concurrency']))
+                    except GenerationError:
+                        return []
+
+                for label, pipeline in (('single', single), ('map-reduce', map_reduce)):
+                    fake = self._fake_gemini(options)
+                    llm.set_model_factory(fake)
+                    started = time.monotonic()
+                    articles = pipeline()
+                    elapsed = time.monotonic() - started
+                    peak = self._peak_memory(pipeline)
+                    status = f"{len(articles):>9}" if not fake.rejected else f"{'failed':>9}"
+                    self.stdout.write(
+                        f"{count:>7} {label:>10} {elapsed:>7.2f}s {fake.calls:>6} {fake.max_prompt_tokens:>11} "
+                        f"{peak / 2**20:>7.1f}MB {status}"
+                    )
+                transaction.set_rollback(True)
+        self.stdout.write("'failed': the prompt went over --context-limit.")
+
+    def _fake_gemini(self, options):
+        return FakeGemini(latency=options['latency'], per_1k_tokens=options['per_1k_tokens'],
+                          context_limit=options['context_limit'], seed=options['seed'])
+
+    def _peak_memory(self, pipeline):
+        # Separate run without latency: tracemalloc slows allocation-heavy code down
+        llm.set_model_factory(FakeGemini())
+        tracemalloc.start()
+        try:
+            pipeline()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def _seed_posts(self, rng, area, count):
+        batch = []
+        for i in range(count):
+            content = ' '.join(rng.choices(WORDS, k=rng.randint(15, 60))).capitalize() + '.'
+            reporter_name = rng.choice([None, None, 'Asha', 'Ravi', 'Meera', 'John'])
+            batch.append(Post(area=area, content=content, reporter_name=reporter_name))
+            if len(batch) == 1000:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
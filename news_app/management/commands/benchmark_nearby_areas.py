@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news_app.geo import AreaPointIndex, geo_cell, haversine, nearest_areas, np
+from news_app.models import Area
+
+
+def full_scan_nearby(lat, lon, limit=5, radius_km=50):
+    """The previous nearby_areas: haversine against every geocoded area, then a full sort."""
+    nearby = []
+    for area in Area.objects.filter(latitude__isnull=False, longitude__isnull=False):
+        distance = haversine(lat, lon, area.latitude, area.longitude)
+        if distance < radius_km:
+            nearby.append((distance, area.name))
+    nearby.sort()
+    return nearby[:limit]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks nearby area lookups (geo_cell grid index, NumPy index single and batched, and '
+        'the old full haversine scan) on synthetic areas clustered around cities. All data is '
+        'created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                            help='Area counts to benchmark (default: 1000 10000 100000)')
+        parser.add_argument('--queries', type=int, default=50, help='Lookups per size (default: 50)')
+        parser.add_argument('--full-scan-queries', type=int, default=5,
+                            help='Lookups timed with the old full scan, which is slow at large sizes (default: 5)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Roughly India-sized: most areas cluster around a few dozen cities
+        cities = [(rng.uniform(8, 32), rng.uniform(68, 92)) for _ in range(40)]
+
+        self.stdout.write(
+            f"{'areas':>8} {'grid p50':>10} {'grid p95':>10} {'numpy p50':>10} {'batch/pt':>10} "
+            f"{'full scan p50':>14} {'agree':>6}"
+        )
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._seed_areas(rng, size, cities)
+                queries = [self._near(rng, rng.choice(cities)) for _ in range(options['queries'])]
+
+                grid_ms, grid_results = self._time(lambda lat, lon: nearest_areas(lat, lon), queries)
+
+                numpy_ms, numpy_results, batch_ms = [], grid_results, float('nan')
+                if np is not None:
+                    index = AreaPointIndex()
+                    index.build()
+                    numpy_ms, numpy_results = self._time(lambda lat, lon: index.nearest(lat, lon, radius_km=50), queries)
+                    started = time.perf_counter()
+                    index.nearest_many(queries, radius_km=50)
+                    batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+                scan_ms = []
+                agree = 0
+                checked = zip(queries[:options['full_scan_queries']], grid_results, numpy_results)
+                for (lat, lon), grid_result, numpy_result in checked:
+                    started = time.perf_counter()
+                    result = [name for _, name in full_scan_nearby(lat, lon)]
+                    scan_ms.append((time.perf_counter() - started) * 1000)
+                    agree += result == [name for _, name in grid_result] == [name for _, name in numpy_result]
+
+                transaction.set_rollback(True)
+
+            numpy_p50 = statistics.median(numpy_ms) if numpy_ms else float('nan')
+            scan_p50 = statistics.median(scan_ms) if scan_ms else float('nan')
+            self.stdout.write(
+                f"{size:>8} {statistics.median(grid_ms):>8.2f}ms {self._p95(grid_ms):>8.2f}ms "
+                f"{numpy_p50:>8.2f}ms {batch_ms:>8.3f}ms {scan_p50:>12.2f}ms {agree:>3}/{len(scan_ms)}"
+            )
+        if np is None:
+            self.stdout.write(self.style.WARNING('NumPy is not installed, so the NumPy index was skipped.'))
+
+    def _time(self, lookup, queries):
+        timings, results = [], []
+        for lat, lon in queries:
+            started = time.perf_counter()
+            results.append(lookup(lat, lon))
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, results
+
+    def _near(self, rng, city):
+        # Areas spread up to ~40km around their city
+        return city[0] + rng.gauss(0, 0.15), city[1] + rng.gauss(0, 0.15)
+
+    def _seed_areas(self, rng, size, cities):
+        areas = []
+        for i in range(size):
+            lat, lon = self._near(rng, rng.choice(cities))
+            # bulk_create skips Area.save(), so the grid cell is set here
+            areas.append(Area(name=f'benchmark area {i}', latitude=lat, longitude=lon, geo_cell=geo_cell(lat, lon)))
+        Area.objects.bulk_create(areas, batch_size=1000)
+
+    def _p95(self, values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
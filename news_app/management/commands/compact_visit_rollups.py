@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from news_app.models import VisitRollup
+from news_app.visits import add_rollup_visits
+
+
+class Command(BaseCommand):
+    help = 'Compacts old hourly visit rollups into daily buckets so the rollup table stays small.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=8,
+            help='Compact hourly buckets older than this many days (default: 8, so 7-day windows stay exact)',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            help='Also delete daily buckets older than this many days',
+        )
+
+    def handle(self, *args, **options):
+        older_than_days = options['older_than_days']
+        retention_days = options['retention_days']
+        if older_than_days < 1:
+            raise CommandError('--older-than-days must be at least 1.')
+
+        # Align the cutoff to midnight so a day is never split between hourly and daily rows
+        cutoff = (timezone.now() - timedelta(days=older_than_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        hourly = VisitRollup.objects.filter(granularity=VisitRollup.HOUR, bucket__lt=cutoff)
+
+        daily_totals = hourly.annotate(
+            day=TruncDay('bucket')
+        ).values('area_id', 'article_id', 'day').annotate(
+            total=Sum('visits')
+        ).order_by()
+
+        with transaction.atomic():
+            compacted_days = 0
+            for row in daily_totals:
+                add_rollup_visits(row['area_id'], row['article_id'], row['day'], row['total'], granularity=VisitRollup.DAY)
+                compacted_days += 1
+            deleted_hourly, _ = hourly.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {deleted_hourly} hourly buckets older than {cutoff:%Y-%m-%d} into {compacted_days} daily buckets.'
+        ))
+
+        if retention_days is not None:
+            expiry = timezone.now() - timedelta(days=retention_days)
+            deleted_daily, _ = VisitRollup.objects.filter(granularity=VisitRollup.DAY, bucket__lt=expiry).delete()
+            self.stdout.write(f'Deleted {deleted_daily} daily buckets older than {retention_days} days.')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+
+from news_app import cover_image_cache
+from news_app.models import CoverImageCacheEntry
+
+
+class Command(BaseCommand):
+    help = 'Shows how many Unsplash searches the cover image cache has saved, optionally pruning cold entries first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete expired "no image" entries, entries unused for COVER_IMAGE_CACHE_IDLE_DAYS '
+                                 'and the least recently used beyond COVER_IMAGE_CACHE_MAX_ENTRIES and '
+                                 'COVER_IMAGE_CACHE_MAX_BYTES first')
+        parser.add_argument('--idle-days', type=int, help='With --prune: override COVER_IMAGE_CACHE_IDLE_DAYS')
+        parser.add_argument('--max-entries', type=int, help='With --prune: override COVER_IMAGE_CACHE_MAX_ENTRIES')
+        parser.add_argument('--max-bytes', type=int, help='With --prune: override COVER_IMAGE_CACHE_MAX_BYTES')
+        parser.add_argument('--clear', action='store_true', help='Delete every cached search')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = CoverImageCacheEntry.objects.all().delete()
+            self.stdout.write(f"Cleared {deleted} entries.")
+        elif options['prune']:
+            pruned = cover_image_cache.prune(
+                idle_days=options['idle_days'], max_entries=options['max_entries'], max_bytes=options['max_bytes'],
+            )
+            self.stdout.write(f"Pruned {pruned} entries.")
+
+        totals = CoverImageCacheEntry.objects.aggregate(
+            entries=Count('id'),
+            not_found=Count('id', filter=Q(image_url__isnull=True)),
+            total_hits=Sum('hits'),
+            size=Sum('size_bytes'),
+        )
+        entries = totals['entries']
+        hits = totals['total_hits'] or 0
+        self.stdout.write(f"Entries: {entries} ({(totals['size'] or 0) / 1024:.1f} KiB, "
+                          f"{totals['not_found']} searches that found no image)")
+        # Each entry was one search that went to Unsplash; each hit is one that didn't
+        self.stdout.write(self.style.SUCCESS(
+            f"Hits: {hits}, searches stored: {entries}, hit rate: {hits / (hits + entries) if hits + entries else 0:.0%}"
+        ))
+        self.stdout.write("Most used:")
+        for entry in CoverImageCacheEntry.objects.order_by('-hits')[:10]:
+            self.stdout.write(f"  {entry.hits:>6}  {entry.query}")
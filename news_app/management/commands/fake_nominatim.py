@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news_app.fake_services import FakeNominatimServer
+from news_app.models import GazetteerEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a local stand-in for the Nominatim search API, for development and load tests. '
+        'Set NOMINATIM_URL (or pass --provider to geocode_areas) to the printed URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--from-gazetteer', action='store_true',
+                            help='Answer with the coordinates of imported gazetteer entries')
+        parser.add_argument('--synthesize', action='store_true',
+                            help='Answer unknown names with made-up but stable coordinates instead of no match')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each answer')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 503')
+        parser.add_argument('--max-per-second', type=int, help='Answer HTTP 429 above this request rate')
+
+    def handle(self, *args, **options):
+        places = {}
+        if options['from_gazetteer']:
+            # Most populous place wins, like the real gazetteer lookup
+            for name, lat, lon in GazetteerEntry.objects.order_by('population').values_list('name', 'latitude', 'longitude'):
+                places[name] = (lat, lon)
+
+        server = FakeNominatimServer(
+            places=places,
+            synthesize=options['synthesize'],
+            latency=options['latency'],
+            fail_rate=options['fail_rate'],
+            max_per_second=options['max_per_second'],
+            port=options['port'],
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f'Stand-in Nominatim listening on {server.url} ({len(places)} places)'))
+        try:
+            while True:
+                time.sleep(60)
+                self.stdout.write(f'{server.requests} requests, {server.rejected} rejected')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
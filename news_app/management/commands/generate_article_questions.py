@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app.article_questions import generate_questions, without_questions
+from news_app.ratelimit import TokenBucket
+
+
+class Command(BaseCommand):
+    help = 'Generates engagement questions, several articles per LLM call, for articles that have none yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Articles per LLM call (default: QUESTIONS_BATCH_SIZE)')
+        parser.add_argument('--limit', type=int, help='Stop after this many articles')
+        parser.add_argument('--rpm', type=float, help='Max LLM requests per minute (default: unlimited)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or getattr(settings, 'QUESTIONS_BATCH_SIZE', 5)
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        limiter = TokenBucket(options['rpm'] / 60) if options['rpm'] else None
+        remaining = without_questions().count()
+        if options['limit'] is not None:
+            remaining = min(remaining, options['limit'])
+        self.stdout.write(f"Generating questions for {remaining} articles, {batch_size} per call.")
+
+        started = time.monotonic()
+        last_id = seen = answered = 0
+        # Ten calls' worth of articles per query; articles that fail are skipped, not retried in a loop
+        while seen < remaining:
+            page = list(without_questions().filter(id__gt=last_id).order_by('id')[:min(batch_size * 10, remaining - seen)])
+            if not page:
+                break
+            answered += generate_questions(page, batch_size=batch_size, limiter=limiter)
+            seen += len(page)
+            last_id = page[-1].pk
+            self.stdout.write(f"  {seen}/{remaining} articles, {answered} with questions ({time.monotonic() - started:.1f}s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {answered} of {seen} articles got questions."))
+        if answered < seen:
+            self.stdout.write(self.style.WARNING('Run the command again to retry the rest.'))
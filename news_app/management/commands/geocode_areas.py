@@ -1,45 +1,228 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
-from django.core.management.base import BaseCommand
-from news_app.models import Area
-import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from news_app.geo import geo_cell
+from news_app.geocoding import (
+    GeocodingError, cached_geocode, gazetteer_geocode, nominatim_geocode, nominatim_limiter,
+)
+from news_app.models import Area, GeocodeCacheEntry, GeocodeCheckpoint
+from news_app.ratelimit import TokenBucket
+from news_app.utils import normalize_area_name
+
 
 class Command(BaseCommand):
-    help = 'Geocodes existing Area objects that do not have latitude and longitude.'
+    help = (
+        'Geocodes existing Area objects in chunks with a rate-limited worker pool. Progress is '
+        'checkpointed after every chunk, so rerunning an interrupted run resumes where it stopped.'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('--context', type=str, help='A string to add to the geocoding query for context (e.g., ", Hyderabad, India").')
         parser.add_argument('--re-geocode-unmapped', action='store_true', help='Only geocode areas that are currently unmapped.')
+        parser.add_argument('--provider', default='nominatim',
+                            help='"nominatim" (NOMINATIM_URL), "gazetteer" (offline gazetteer only), or the '
+                                 'search URL of another Nominatim-compatible server, e.g. `manage.py fake_nominatim`')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent network lookups (default: 4)')
+        parser.add_argument('--rate', type=float,
+                            help='Max network requests per second (default: GEOCODE_RATE_LIMIT for Nominatim, '
+                                 'unlimited for other servers)')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Areas per chunk and checkpoint (default: 100)')
+        parser.add_argument('--refresh', action='store_true', help='Ignore the geocode cache and look everything up again')
+        parser.add_argument('--checkpoint', help='Checkpoint name (default: derived from the options)')
+        parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and start from the first area')
 
     def handle(self, *args, **options):
         context = options['context'] or ''
-        re_geocode_unmapped = options['re_geocode_unmapped']
+        provider = options['provider']
+        if provider == 'nominatim':
+            base_url = getattr(settings, 'NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+            rate = options['rate'] or getattr(settings, 'GEOCODE_RATE_LIMIT', 1)
+        elif provider == 'gazetteer':
+            base_url, rate = None, None
+        elif provider.startswith(('http://', 'https://')):
+            base_url, rate = provider, options['rate']
+        else:
+            raise CommandError('--provider must be "nominatim", "gazetteer" or a URL.')
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be at least 1.')
 
-        if re_geocode_unmapped:
-            areas_to_geocode = Area.objects.filter(latitude__isnull=True, longitude__isnull=True)
-            self.stdout.write(f"Found {areas_to_geocode.count()} unmapped areas to re-geocode.")
+        self.context = context
+        self.base_url = base_url
+        self.refresh = options['refresh']
+        if provider == 'nominatim':
+            # Shared with the geocode workers, so together they stay under the usage policy
+            self.limiter = nominatim_limiter(rate)
         else:
-            areas_to_geocode = Area.objects.all()
-            self.stdout.write(f"Geocoding all {areas_to_geocode.count()} areas.")
+            self.limiter = TokenBucket(rate, capacity=max(1, int(rate))) if rate else None
+        self._local = threading.local()
+
+        if options['re_geocode_unmapped']:
+            areas = Area.objects.filter(latitude__isnull=True, longitude__isnull=True)
+            mode = 'unmapped'
+        else:
+            areas = Area.objects.all()
+            mode = 'all'
+
+        name = options['checkpoint'] or f"{mode}|{provider}|{context}"
+        checkpoint, created = GeocodeCheckpoint.objects.get_or_create(name=name)
+        if options['restart'] or checkpoint.finished_at is not None:
+            GeocodeCheckpoint.objects.filter(pk=checkpoint.pk).delete()
+            checkpoint = GeocodeCheckpoint.objects.create(name=name)
+        elif not created:
+            self.stdout.write(f"Resuming '{name}' after area {checkpoint.last_area_id} ({checkpoint.processed} already processed).")
+
+        remaining = areas.filter(id__gt=checkpoint.last_area_id).count()
+        self.stdout.write(f"Geocoding {remaining} areas ({mode}) via {provider} with {options['workers']} workers.")
 
-        for area in areas_to_geocode:
-            self.stdout.write(f"Geocoding area: {area.name}")
-            query = f"{area.name}{context}"
-            url = f"https://nominatim.openstreetmap.org/search?q={query}&format=json&limit=1"
+        started = time.monotonic()
+        done = 0
+        self.requests = 0
+        self.errored_ids = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                chunk = list(areas.filter(id__gt=checkpoint.last_area_id).order_by('id')[:options['chunk_size']])
+                if not chunk:
+                    break
+                results, errors, fresh = self._geocode_chunk(chunk, pool)
+                self._save_chunk(chunk, results, errors, fresh, checkpoint)
+
+                done += len(chunk)
+                elapsed = time.monotonic() - started
+                per_second = done / elapsed if elapsed else 0
+                eta = (remaining - done) / per_second if per_second else 0
+                self.stdout.write(
+                    f"  {done}/{remaining} areas, {per_second:.1f} areas/s, "
+                    f"{self.requests / elapsed if elapsed else 0:.1f} requests/s, ETA {eta:.0f}s"
+                )
+
+        checkpoint.finished_at = timezone.now()
+        checkpoint.save(update_fields=['finished_at', 'updated_at'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s: {checkpoint.geocoded} geocoded, {checkpoint.not_found} not found, "
+            f"{checkpoint.errors} errors ({checkpoint.processed} processed in total)."
+        ))
+        if self.errored_ids:
+            self.stdout.write(self.style.WARNING(self._error_summary()))
+
+    def _error_summary(self):
+        # Errors leave an area's status as it was, and the geocode worker only retries pending ones
+        statuses = Counter(Area.objects.filter(pk__in=self.errored_ids).values_list('geocode_status', flat=True))
+        parts = []
+        if statuses[Area.GEOCODE_PENDING]:
+            parts.append(f"{statuses[Area.GEOCODE_PENDING]} left pending for the geocode worker to retry")
+        if statuses[Area.GEOCODE_FAILED]:
+            parts.append(f"{statuses[Area.GEOCODE_FAILED]} already failed and won't be retried by the worker")
+        if statuses[Area.GEOCODE_NOT_FOUND]:
+            parts.append(f"{statuses[Area.GEOCODE_NOT_FOUND]} kept their earlier not-found result")
+        if statuses[Area.GEOCODE_DONE]:
+            parts.append(f"{statuses[Area.GEOCODE_DONE]} kept their earlier coordinates")
+        return f"{len(self.errored_ids)} areas hit errors in this run: {', '.join(parts)}."
+
+    def _fetch(self, query):
+        # One HTTP session per pool thread, so connections are reused
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return nominatim_geocode(query, base_url=self.base_url, session=session)
+
+    def _geocode_chunk(self, chunk, pool):
+        """
+        Return ({query: (lat, lon)}, {query: error}, {query: source}) for the
+        chunk, the last holding fresh answers to write back to the cache. The
+        cache and gazetteer are checked here; only what's left goes to the pool.
+        With the gazetteer provider, names it doesn't know are left out.
+        """
+        results = {}
+        fresh = {}
+        to_fetch = set()
+        for area in chunk:
+            query = normalize_area_name(f"{area.name}{self.context}")
+            if query in results or query in to_fetch:
+                continue  # Same query as an earlier area
+            cached = None if self.refresh else cached_geocode(query)
+            if cached is not None:
+                results[query] = cached
+                continue
+            coords = gazetteer_geocode(area.name)
+            if coords is not None:
+                results[query] = coords
+                fresh[query] = GeocodeCacheEntry.GAZETTEER
+            elif self.base_url is not None:
+                to_fetch.add(query)
+
+        errors = {}
+        self.requests += len(to_fetch)
+        futures = {pool.submit(self._fetch, query): query for query in to_fetch}
+        for future in as_completed(futures):
+            query = futures[future]
             try:
-                response = requests.get(url, headers={'User-Agent': 'Gemini-CLI-Agent/1.0'})
-                response.raise_for_status()
-                data = response.json()
-                if data:
-                    lat = float(data[0]['lat'])
-                    lon = float(data[0]['lon'])
-                    area.latitude = lat
-                    area.longitude = lon
-                    area.save()
-                    self.stdout.write(self.style.SUCCESS(f"Successfully geocoded {area.name}: ({lat}, {lon})"))
-                else:
-                    self.stdout.write(self.style.WARNING(f"Could not find coordinates for {area.name}"))
-            except requests.exceptions.RequestException as e:
-                self.stdout.write(self.style.ERROR(f"Error geocoding {area.name}: {e}"))
-            
-            time.sleep(1)
+                results[query] = future.result()
+                fresh[query] = GeocodeCacheEntry.NOMINATIM
+            except GeocodingError as e:
+                errors[query] = e
+                self.stderr.write(self.style.ERROR(f"Error geocoding {query}: {e}"))
+        return results, errors, fresh
+
+    def _save_chunk(self, chunk, results, errors, fresh, checkpoint):
+        now = timezone.now()
+        updated = []
+        geocoded = not_found = error_count = 0
+        for area in chunk:
+            query = normalize_area_name(f"{area.name}{self.context}")
+            if query in errors:
+                error_count += 1
+                self.errored_ids.append(area.pk)
+                continue
+            if query not in results:
+                not_found += 1  # Not in the offline gazetteer, but the network may still know it
+                continue
+            lat, lon = results[query]
+            if lat is None:
+                not_found += 1
+                if area.latitude is not None:
+                    continue  # Keep the coordinates we already have
+                area.geocode_status = Area.GEOCODE_NOT_FOUND
+            else:
+                geocoded += 1
+                area.latitude, area.longitude = lat, lon
+                area.geocode_status = Area.GEOCODE_DONE
+            # bulk_update skips Area.save(), so keep the derived fields in step here
+            area.geo_cell = geo_cell(area.latitude, area.longitude)
+            area.geocode_attempts = 0
+            area.geocode_next_attempt_at = None
+            updated.append(area)
+
+        cache_entries = [
+            GeocodeCacheEntry(query=query, latitude=results[query][0], longitude=results[query][1],
+                              source=source, updated_at=now)
+            for query, source in fresh.items()
+        ]
+
+        with transaction.atomic():
+            GeocodeCacheEntry.objects.bulk_create(
+                cache_entries,
+                update_conflicts=True,
+                unique_fields=['query'],
+                update_fields=['latitude', 'longitude', 'source', 'updated_at'],
+            )
+            Area.objects.bulk_update(
+                updated,
+                ['latitude', 'longitude', 'geo_cell', 'geocode_status', 'geocode_attempts', 'geocode_next_attempt_at'],
+            )
+            checkpoint.last_area_id = chunk[-1].pk
+            checkpoint.processed += len(chunk)
+            checkpoint.geocoded += geocoded
+            checkpoint.not_found += not_found
+            checkpoint.errors += error_count
+            checkpoint.save()
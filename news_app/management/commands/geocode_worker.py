@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from news_app.geocode_queue import due_areas, process_pending_geocodes
+from news_app.geocoding import nominatim_limiter
+
+
+class Command(BaseCommand):
+    help = (
+        'Geocodes areas waiting in the pending geocode queue, at most GEOCODE_RATE_LIMIT Nominatim '
+        'requests per second across all processes. Use this instead of the in-process workers '
+        '(GEOCODE_IN_PROCESS_WORKER = False) when running several web processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due areas once and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--rate', type=float, default=getattr(settings, 'GEOCODE_RATE_LIMIT', 1),
+                            help='Nominatim requests per second (default: GEOCODE_RATE_LIMIT)')
+        parser.add_argument('--no-network', action='store_true',
+                            help='Only use the geocode cache and offline gazetteer')
+        parser.add_argument('--interval', type=int, default=getattr(settings, 'GEOCODE_POLL_INTERVAL', 30),
+                            help='Seconds to wait when the queue is empty (default: GEOCODE_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        limiter = nominatim_limiter(options['rate'])
+        allow_network = False if options['no_network'] else None
+        self.stdout.write(f'{due_areas().count()} areas waiting to be geocoded.')
+
+        while True:
+            started = time.monotonic()
+            try:
+                processed = process_pending_geocodes(
+                    limit=options['batch_size'], limiter=limiter, allow_network=allow_network,
+                )
+            finally:
+                close_old_connections()
+            if processed:
+                self.stdout.write(f'Processed {processed} areas ({processed / (time.monotonic() - started):.1f}/s)')
+                continue
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS('Geocode queue drained.'))
+                return
+            time.sleep(options['interval'])
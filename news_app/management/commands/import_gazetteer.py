@@ -0,0 +1,101 @@
+import csv
+import io
+import sys
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news_app.models import GazetteerEntry
+from news_app.utils import normalize_area_name
+
+# Columns of a GeoNames dump (allCountries.txt, IN.txt, cities15000.txt, ...)
+NAME, ASCII_NAME, ALTERNATE_NAMES, LATITUDE, LONGITUDE = 1, 2, 3, 4, 5
+FEATURE_CLASS, FEATURE_CODE, COUNTRY_CODE, POPULATION = 6, 7, 8, 14
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports a GeoNames-style TSV (or the .zip GeoNames distributes it in) into the offline '
+        'gazetteer used to geocode new areas without calling Nominatim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the GeoNames .txt or .zip file')
+        parser.add_argument('--countries', nargs='+', help='Only import these ISO country codes (e.g. IN)')
+        parser.add_argument('--feature-classes', nargs='+', default=['P', 'A', 'L'],
+                            help='GeoNames feature classes to keep (default: P A L, i.e. places, regions, areas)')
+        parser.add_argument('--min-population', type=int, default=0)
+        parser.add_argument('--no-alternate-names', action='store_true',
+                            help='Only index the main and ASCII names, not the alternate names')
+        parser.add_argument('--replace', action='store_true', help='Delete existing gazetteer entries first')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        countries = {code.upper() for code in options['countries'] or []}
+        feature_classes = set(options['feature_classes'])
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        places = entries = 0
+        batch = []
+        with transaction.atomic():
+            if options['replace']:
+                deleted, _ = GazetteerEntry.objects.all().delete()
+                self.stdout.write(f'Deleted {deleted} existing gazetteer entries.')
+
+            for row in self._rows(options['path']):
+                if len(row) <= POPULATION:
+                    continue
+                if countries and row[COUNTRY_CODE] not in countries:
+                    continue
+                if row[FEATURE_CLASS] not in feature_classes:
+                    continue
+                population = int(row[POPULATION] or 0)
+                if population < options['min_population']:
+                    continue
+
+                names = {row[NAME], row[ASCII_NAME]}
+                if not options['no_alternate_names'] and row[ALTERNATE_NAMES]:
+                    names.update(row[ALTERNATE_NAMES].split(','))
+                names = {normalize_area_name(name) for name in names} - {''}
+                places += 1
+                for name in names:
+                    batch.append(GazetteerEntry(
+                        name=name[:255],
+                        latitude=float(row[LATITUDE]),
+                        longitude=float(row[LONGITUDE]),
+                        country_code=row[COUNTRY_CODE],
+                        feature_code=row[FEATURE_CODE],
+                        population=population,
+                        geonames_id=int(row[0]) if row[0].isdigit() else None,
+                    ))
+                if len(batch) >= batch_size:
+                    GazetteerEntry.objects.bulk_create(batch)
+                    entries += len(batch)
+                    batch = []
+                    self.stdout.write(f'  {places} places, {entries} names...')
+            GazetteerEntry.objects.bulk_create(batch)
+            entries += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {places} places as {entries} gazetteer names in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def _rows(self, path):
+        # GeoNames rows can have very long alternate name lists
+        csv.field_size_limit(sys.maxsize)
+        try:
+            if path.endswith('.zip'):
+                with zipfile.ZipFile(path) as archive:
+                    txt_files = [name for name in archive.namelist() if name.endswith('.txt') and 'readme' not in name.lower()]
+                    if not txt_files:
+                        raise CommandError(f'No .txt file found in {path}')
+                    with archive.open(txt_files[0]) as raw:
+                        yield from csv.reader(io.TextIOWrapper(raw, encoding='utf-8'), delimiter='\t', quoting=csv.QUOTE_NONE)
+            else:
+                with open(path, encoding='utf-8', newline='') as f:
+                    yield from csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        except OSError as e:
+            raise CommandError(f'Could not read {path}: {e}')
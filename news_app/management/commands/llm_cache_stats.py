@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+
+from news_app import llm_cache
+from news_app.models import LLMResponseCache
+
+
+class Command(BaseCommand):
+    help = 'Shows how much the LLM response cache has saved (calls and seconds), optionally pruning it first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete expired entries and evict beyond LLM_CACHE_MAX_ENTRIES '
+                                 'and LLM_CACHE_MAX_BYTES first')
+        parser.add_argument('--clear', action='store_true', help='Delete every cached response')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = LLMResponseCache.objects.all().delete()
+            self.stdout.write(f"Cleared {deleted} entries.")
+        elif options['prune']:
+            self.stdout.write(f"Pruned {llm_cache.prune()} entries.")
+
+        totals = LLMResponseCache.objects.aggregate(
+            entries=Count('id'),
+            total_hits=Sum('hits'),
+            size=Sum('size_bytes'),
+            spent_seconds=Sum('generation_seconds'),
+            saved_seconds=Sum(F('hits') * F('generation_seconds')),
+        )
+        entries = totals['entries']
+        hits = totals['total_hits'] or 0
+        self.stdout.write(f"Entries: {entries} ({(totals['size'] or 0) / 1024:.1f} KiB)")
+        # Each entry was one miss that went to the LLM; each hit is a call that didn't
+        self.stdout.write(f"Hits: {hits}, misses stored: {entries}, "
+                          f"hit rate: {hits / (hits + entries) if hits + entries else 0:.0%}")
+        self.stdout.write(f"Time spent generating cached entries: {totals['spent_seconds'] or 0:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f"Time saved by hits: {totals['saved_seconds'] or 0:.1f}s"))
+
+        by_version = (LLMResponseCache.objects.values('model_name', 'prompt_version')
+                      .annotate(entries=Count('id'), total_hits=Sum('hits')).order_by('model_name', 'prompt_version'))
+        for row in by_version:
+            self.stdout.write(f"  {row['model_name']} v{row['prompt_version']}: {row['entries']} entries, {row['total_hits']} hits")
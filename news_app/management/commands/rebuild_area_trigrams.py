@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news_app.area_search import rebuild_area_trigrams
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trigram index used for fuzzy area matching.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_area_trigrams()
+        self.stdout.write(self.style.SUCCESS(f'Indexed trigrams for {count} areas.'))
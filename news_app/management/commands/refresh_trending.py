@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from news_app.trending import refresh_trending_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trending areas/articles snapshot served on the landing page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and refresh the snapshot on a fixed cadence',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'TRENDING_REFRESH_INTERVAL', 300),
+            help='Seconds between refreshes when running with --loop (default: TRENDING_REFRESH_INTERVAL)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            started = time.monotonic()
+            try:
+                payload = refresh_trending_snapshot()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Trending snapshot refreshed: {len(payload['areas'])} areas, "
+                    f"{len(payload['articles'])} articles ({time.monotonic() - started:.2f}s)"
+                ))
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stderr.write(self.style.ERROR(f'Error refreshing trending snapshot: {e}'))
+            finally:
+                close_old_connections()
+
+            if not options['loop']:
+                return
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -1,14 +1,26 @@
 # news_app/management/commands/regenerate_all_articles.py
 
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
 from django.utils import timezone
-from news_app.models import Area, Article, Post
-# Import necessary functions from views.py
-from news_app.views import get_posts_content_by_area, run_gemini, fetch_cover_image
+
+from news_app.generation import generate_articles, save_articles
+from news_app.models import Area, RegenerationAreaResult, RegenerationRun
+from news_app.ratelimit import TokenBucket
+from news_app.views import get_posts_content_by_area
+
 
 class Command(BaseCommand):
-    help = 'Regenerates news articles for ALL areas, ignoring the last_generated_at timestamp.'
+    help = (
+        'Regenerates news articles for ALL areas, ignoring the last_generated_at timestamp. Areas are '
+        'generated concurrently under a global LLM requests-per-minute limit, and every area\'s outcome '
+        'is recorded in a run log so an interrupted run can be resumed.'
+    )
 
     def add_arguments(self, parser):
         # Optional: Add an argument to run for specific areas only
@@ -23,15 +35,22 @@ class Command(BaseCommand):
             action='store_true',
             help='Generate new articles even if articles already exist for the area.',
         )
+        parser.add_argument('--max-concurrency', type=int, default=4, help='Areas generated at once (default: 4)')
+        parser.add_argument('--rpm', type=float,
+                            help='Max LLM requests per minute across all areas (default: REGENERATE_REQUESTS_PER_MINUTE)')
+        parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                            help='Continue an earlier run (by default the latest one that was interrupted or had failures) '
+                                 'over the same areas, skipping those it already finished; failed areas are tried again')
 
     def handle(self, *args, **options):
-        start_time = time.time()
-        total_areas_processed = 0
-        total_articles_created = 0
-
-        area_names_filter = options['area_names']
-        skip_existing = options['skip_existing_check']
-
+        if options['max_concurrency'] < 1:
+            raise CommandError('--max-concurrency must be at least 1.')
+        rpm = options['rpm'] or getattr(settings, 'REGENERATE_REQUESTS_PER_MINUTE', 60)
+        self.limiter = TokenBucket(rpm / 60, capacity=max(1, min(options['max_concurrency'], int(rpm / 60) or 1)))
+        run = self._get_run(options)
+        # A resumed run covers the same areas as the original
+        self.skip_existing = run.options.get('skip_existing_check', False)
+        area_names_filter = run.options.get('area_names')
         if area_names_filter:
             areas_to_process = Area.objects.filter(name__in=[name.lower() for name in area_names_filter])
             self.stdout.write(f"Regenerating articles for specified areas: {', '.join(area_names_filter)}")
@@ -39,71 +58,138 @@ class Command(BaseCommand):
             areas_to_process = Area.objects.all()
             self.stdout.write("Regenerating articles for ALL areas...")
 
-        if not areas_to_process.exists():
+        if run.results.exists():
+            finished = run.results.exclude(status=RegenerationAreaResult.FAILED).values_list('area_id', flat=True)
+            areas_to_process = areas_to_process.exclude(id__in=finished)
+            self.stdout.write(f"Resuming run {run.pk}: {len(finished)} areas already finished.")
+
+        area_ids = list(areas_to_process.order_by('id').values_list('id', flat=True))
+        if not area_ids:
             self.stdout.write(self.style.WARNING("No areas found matching the criteria."))
+            run.finished_at = timezone.now()
+            run.save(update_fields=['finished_at'])
             return
+        if not run.areas_total:
+            run.areas_total = len(area_ids)
+            run.save(update_fields=['areas_total'])
 
-        for area in areas_to_process:
-            total_areas_processed += 1
-            self.stdout.write(f"\nProcessing Area: {area.name} (PK: {area.pk})")
-
-            # Check if articles already exist and skip if needed
-            if not skip_existing and area.articles.exists(): # type: ignore
-                 self.stdout.write(self.style.NOTICE(f"  Skipping area '{area.name}' as articles already exist. Use --skip-existing-check to override."))
-                 continue
-
-            # Fetch ALL posts for this area, ignoring 'since'
-            all_comments = get_posts_content_by_area(area.name) # Pass area name directly
-
-            if not all_comments:
-                self.stdout.write(f"  No posts found for area '{area.name}'. Skipping article generation.")
-                continue
-
-            self.stdout.write(f"  Found {len(all_comments.split('\" \"'))} posts. Sending content to LLM...") # Approximate post count
-
-            # Generate articles using the existing function
-            articles_data = run_gemini(all_comments)
-
-            if not articles_data:
-                self.stdout.write(self.style.WARNING(f"  LLM did not return any articles for '{area.name}'."))
-                continue
-
-            self.stdout.write(f"  LLM generated {len(articles_data)} articles.")
-            area_articles_created = 0
-            for article_data in articles_data:
-                title = article_data.get('title')
-                content = article_data.get('content')
-
-                if not title or not content:
-                    self.stdout.write(self.style.WARNING("  Skipping article data with missing title or content."))
-                    continue
-
-                category = article_data.get('category', 'news')
-                # Fetch cover image using the existing function
-                cover_image_url = fetch_cover_image(title, category)
-
-                try:
-                    article = Article.objects.create(
-                        title=title,
-                        content=content,
-                        category=category,
-                        cover_image=cover_image_url,
-                        area=area # Directly associate with the current Area object
-                    )
-                    area_articles_created += 1
-                    total_articles_created += 1
-                    # Use article.pk for clarity
-                    self.stdout.write(f"    Created article: '{article.title}' (PK: {article.pk})")
-                except Exception as e:
-                    self.stderr.write(self.style.ERROR(f"    Error creating article '{title}': {e}"))
-
-            self.stdout.write(self.style.SUCCESS(f"  Finished processing '{area.name}'. Created {area_articles_created} new articles."))
-            # We are NOT updating area.last_generated_at here to allow normal generation later
+        self.stdout.write(
+            f"Run {run.pk}: {len(area_ids)} areas, {options['max_concurrency']} at a time, at most {rpm:g} LLM requests/min."
+        )
+        start_time = time.time()
+        counts = {status: 0 for status, _ in RegenerationAreaResult.STATUS_CHOICES}
+        total_articles_created = 0
 
-        end_time = time.time()
-        duration = end_time - start_time
+        with ThreadPoolExecutor(max_workers=options['max_concurrency']) as pool:
+            futures = [pool.submit(self._regenerate_area, run, area_id) for area_id in area_ids]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                counts[result.status] += 1
+                total_articles_created += result.articles_created
+                minutes = max(time.time() - start_time, 1e-6) / 60
+                line = (f"[{done}/{len(area_ids)}] {result.area_name}: {result.get_status_display().lower()}, "
+                        f"{result.articles_created} articles in {result.duration_seconds:.1f}s "
+                        f"({done / minutes:.1f} areas/min, {total_articles_created / minutes:.1f} articles/min)")
+                if result.status == RegenerationAreaResult.FAILED:
+                    self.stderr.write(self.style.ERROR(f"{line}: {result.message}"))
+                else:
+                    self.stdout.write(line)
+
+        run.finished_at = timezone.now()
+        run.save(update_fields=['finished_at'])
+        # We are NOT updating area.last_generated_at here to allow normal generation later
+
+        duration = time.time() - start_time
+        minutes = max(duration, 1e-6) / 60
         self.stdout.write(f"\n--------------------")
         self.stdout.write(self.style.SUCCESS(f"Regeneration Complete!"))
-        self.stdout.write(f"Processed {total_areas_processed} areas.")
+        self.stdout.write(f"Processed {len(area_ids)} areas: {counts['done']} generated, {counts['skipped']} skipped, "
+                          f"{counts['no_posts']} without posts, {counts['failed']} failed.")
         self.stdout.write(f"Created a total of {total_articles_created} articles.")
-        self.stdout.write(f"Duration: {duration:.2f} seconds.")
+        self.stdout.write(f"Duration: {duration:.2f} seconds "
+                          f"({len(area_ids) / minutes:.1f} areas/min, {total_articles_created / minutes:.1f} articles/min).")
+        if counts['failed']:
+            self.stdout.write(self.style.WARNING(f"Rerun with --resume {run.pk} to retry the failed areas."))
+
+    def _get_run(self, options):
+        resume = options['resume']
+        if resume is None:
+            return RegenerationRun.objects.create(options={
+                key: options[key] for key in ('area_names', 'skip_existing_check', 'max_concurrency', 'rpm')
+            })
+        if resume == 'latest':
+            run = RegenerationRun.objects.filter(
+                Q(finished_at__isnull=True) | Q(results__status=RegenerationAreaResult.FAILED)
+            ).distinct().first()
+            if run is None:
+                raise CommandError('There is no interrupted or failed run to resume.')
+        else:
+            try:
+                run = RegenerationRun.objects.get(pk=int(resume))
+            except (ValueError, RegenerationRun.DoesNotExist):
+                raise CommandError(f"No regeneration run with id {resume}.")
+        run.finished_at = None
+        run.save(update_fields=['finished_at'])
+        return run
+
+    def _regenerate_area(self, run, area_id):
+        """
+        Generate one area and record the outcome. Errors stay with the area, they don't stop the run.
+        An area deleted since the run started is reported as skipped but not recorded, as there's
+        nothing left to record it against. result.area_name is set either way, for the progress line.
+        """
+        started = time.monotonic()
+        result = RegenerationAreaResult(run=run, area_id=area_id, status=RegenerationAreaResult.FAILED)
+        result.area_name = f"area {area_id}"
+        area = None
+        try:
+            area = Area.objects.get(pk=area_id)
+            result.area_name = area.name
+            if not self.skip_existing and area.articles.exists(): # type: ignore
+                result.status = RegenerationAreaResult.SKIPPED
+                result.message = 'Articles already exist; use --skip-existing-check to override.'
+            else:
+                # Fetch ALL posts for this area, ignoring 'since'
+                all_posts = get_posts_content_by_area(area.name)
+                if all_posts is None:
+                    result.status = RegenerationAreaResult.NO_POSTS
+                else:
+                    # Big backlogs are summarized in chunks first; a rerun over unchanged posts is served from the LLM cache
+                    # Articles are saved one by one as the LLM streams them
+                    articles_data = generate_articles(all_posts, area.name, limiter=self.limiter)
+                    saved = save_articles(area, articles_data, limiter=self.limiter)
+                    result.articles_created = saved.created
+                    if saved.partial:
+                        # Left FAILED so it's reported; rerun with --skip-existing-check to top it up (saved ones come back as duplicates)
+                        result.message = f'Generation stopped early after {saved.created} articles.'
+                    elif result.articles_created:
+                        result.status = RegenerationAreaResult.DONE
+                    elif saved.duplicates:
+                        result.status = RegenerationAreaResult.SKIPPED
+                        result.message = f'All {saved.duplicates} articles were near-duplicates of existing ones.'
+                    else:
+                        result.message = 'The LLM did not return any articles.'
+        except Area.DoesNotExist:
+            result.status = RegenerationAreaResult.SKIPPED
+            result.message = 'The area was deleted.'
+        except Exception as e:
+            result.message = str(e)
+        finally:
+            result.duration_seconds = time.monotonic() - started
+            result.finished_at = timezone.now()
+            try:
+                if area is not None:
+                    # One upsert statement rather than update_or_create's read-then-write, which
+                    # SQLite turns into "database is locked" when several threads do it at once
+                    RegenerationAreaResult.objects.bulk_create(
+                        [result],
+                        update_conflicts=True,
+                        unique_fields=['run', 'area'],
+                        update_fields=['status', 'articles_created', 'message', 'duration_seconds', 'finished_at'],
+                    )
+            except Exception as e:
+                # E.g. the area was deleted mid-run; report it rather than abort the whole run
+                result.message = f"{result.message} (outcome not recorded: {e})".lstrip()
+            finally:
+                connections.close_all()
+        return result
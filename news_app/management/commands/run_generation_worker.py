@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from news_app.jobs import default_worker_name, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued "Refresh News" generation jobs. Use this instead of the in-process worker '
+        '(GENERATION_IN_PROCESS_WORKER = False) to keep LLM calls out of the web processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the queued jobs once and exit instead of polling')
+        parser.add_argument('--interval', type=int, default=getattr(settings, 'GENERATION_POLL_INTERVAL', 5),
+                            help='Seconds to wait when the queue is empty (default: GENERATION_POLL_INTERVAL)')
+        parser.add_argument('--name', default=default_worker_name(), help='Worker name recorded on claimed jobs')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Generation worker {options['name']} started.")
+        while True:
+            started = time.monotonic()
+            try:
+                ran = run_pending_jobs(worker_name=options['name'])
+            finally:
+                close_old_connections()
+            if ran:
+                self.stdout.write(f'Ran {ran} generation jobs in {time.monotonic() - started:.1f}s')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
-from news_app.models import Area
+from news_app.geocoding import remember_geocode
+from news_app.models import Area, GeocodeCacheEntry
 
 class Command(BaseCommand):
     help = 'Manually sets the latitude and longitude for a specific area.'
@@ -22,5 +23,7 @@ class Command(BaseCommand):
         area.latitude = latitude
         area.longitude = longitude
         area.save()
+        # So the area gets the same coordinates if it is ever deleted and searched for again
+        remember_geocode(area.name, latitude, longitude, source=GeocodeCacheEntry.MANUAL)
 
         self.stdout.write(self.style.SUCCESS(f'Successfully updated location for "{area_name}" to ({latitude}, {longitude}).'))
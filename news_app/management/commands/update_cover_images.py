@@ -1,20 +1,26 @@
 # news_app/management/commands/update_cover_images.py
-import time
 from django.core.management.base import BaseCommand
 from django.db.models import Q
+from news_app.generation import CoverImages
 from news_app.models import Article
-# Import the function directly from views.py
-# Consider moving fetch_cover_image to a utils.py file for better organization later
-from news_app.views import fetch_cover_image
 
 class Command(BaseCommand):
-    help = 'Fetches and updates cover images for articles where the cover_image field is null or empty.'
+    help = (
+        'Fetches and updates cover images for articles where the cover_image field is null or empty, '
+        'e.g. those whose search missed the deadline during generation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Articles looked up per batch (default: 50)')
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Unsplash searches at a time; keep it low for the hourly rate limit (default: 2)')
+        parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for each batch (default: 120)')
 
     def handle(self, *args, **options):
         # Find articles with null or empty cover_image field
         articles_to_update = Article.objects.filter(
             Q(cover_image__isnull=True) | Q(cover_image='')
-        )
+        ).only('id', 'title', 'category', 'cover_image').order_by('id')
 
         total_articles = articles_to_update.count()
         if total_articles == 0:
@@ -24,38 +30,24 @@ class Command(BaseCommand):
         self.stdout.write(f'Found {total_articles} articles needing cover images. Attempting to fetch...')
 
         updated_count = 0
-        failed_count = 0
-        api_delay = 1 # Seconds delay between Unsplash API calls to avoid rate limiting
-
-        for article in articles_to_update:
-            self.stdout.write(f"\nProcessing Article (PK: {article.pk}): '{article.title}'")
-            try:
-                # Call the existing function from views.py
-                image_url = fetch_cover_image(article.title, article.category)
-
-                if image_url:
-                    article.cover_image = image_url
-                    article.save(update_fields=['cover_image'])
-                    updated_count += 1
-                    self.stdout.write(self.style.SUCCESS(f"  Successfully updated cover image."))
-                else:
-                    # fetch_cover_image function already prints details on failure
-                    self.stdout.write(self.style.WARNING(f"  Could not find a suitable cover image."))
-                    failed_count +=1
-
-                # Add a delay to prevent hitting API rate limits
-                time.sleep(api_delay)
-
-            except Exception as e:
-                failed_count += 1
-                self.stdout.write(self.style.ERROR(f"  An error occurred while processing article {article.pk}: {e}"))
-                # Optional: Add a longer sleep after an error
-                # time.sleep(api_delay * 5)
-
+        last_id = 0
+        while True:
+            batch = list(articles_to_update.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            # Articles sharing a query share one search, and earlier searches come from the cover image cache
+            covers = CoverImages(concurrency=options['concurrency'])
+            for article in batch:
+                covers.add(article, article.title, article.category)
+            found = covers.finish(timeout=options['timeout'])
+            updated_count += found
+            self.stdout.write(f"  {last_id}: {found}/{len(batch)} articles got a cover image")
 
         self.stdout.write("\n" + "="*30)
         self.stdout.write(self.style.SUCCESS(f'Finished processing.'))
         self.stdout.write(self.style.SUCCESS(f'Successfully updated {updated_count} cover images.'))
+        failed_count = total_articles - updated_count
         if failed_count > 0:
             self.stdout.write(self.style.WARNING(f'{failed_count} articles could not be updated (no image found or error occurred).'))
         self.stdout.write("="*30)
@@ -1,49 +1,21 @@
-import re
-from .models import URLModel, Area, Article
+from .visits import visit_buffer
+
+
 class PageViewMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         response = self.get_response(request)
-        
-        # Only track GET requests
-        if request.method == 'GET':
+
+        # Only track successful GET requests
+        if request.method == 'GET' and response.status_code == 200:
             path = request.path.strip('/')
-            
-            if path:
-                parts = path.split('/')
-                
-                # Handle area visits (like /sanfrancisco/)
-                if len(parts) == 1:
-                    area_name = parts[0].lower()
-                    try:
-                        area = Area.objects.get(name=area_name)
-                        # Check if at least one article exists in the area
-                        if area.articles.exists():
-                            # Only create URLModel if area exists
-                            url_obj, created = URLModel.objects.get_or_create(path=path)
-                            url_obj.area = area
-                            url_obj.article = None  # Ensure it's not an article
-                            url_obj.visits += 1
-                            url_obj.save()
-                    except Area.DoesNotExist:
-                        pass
-                # Handle area/article-slug visits (like /sanfrancisco/local-news-title)
-                elif len(parts) == 2:
-                    area_name = parts[0].lower()
-                    article_slug = parts[1]
-                    
-                    try:
-                        area = Area.objects.get(name=area_name)
-                        article = Article.objects.get(slug=article_slug, area=area)
-                        
-                        url_obj, created = URLModel.objects.get_or_create(path=path)
-                        url_obj.article = article
-                        url_obj.area = area
-                        url_obj.visits += 1
-                        url_obj.save()
-                    except (Area.DoesNotExist, Article.DoesNotExist):
-                        pass
-                        
-        return response
\ No newline at end of file
+
+            # Area visits (like /sanfrancisco/) and area/article-slug visits
+            # (like /sanfrancisco/local-news-title). The hit is buffered and
+            # resolved to its Area/Article when the buffer is flushed.
+            if path and len(path.split('/')) <= 2:
+                visit_buffer.record(path)
+
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0033_notificationsubscription_delete_pushsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='visit_rollups', to='news_app.area')),
+                ('article', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='visit_rollups', to='news_app.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='news_app_vi_granula_8d4a7c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_areas(apps, schema_editor):
+    Area = apps.get_model('news_app', 'Area')
+    AreaTrigram = apps.get_model('news_app', 'AreaTrigram')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for area_id, name in Area.objects.using(db_alias).values_list('id', 'name'):
+        padded = f"  {name} "
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        batch.extend(AreaTrigram(area_id=area_id, trigram=gram) for gram in grams)
+    AreaTrigram.objects.using(db_alias).bulk_create(batch, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0036_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='news_app.area')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'area'], name='news_app_ar_trigram_ecd008_idx')],
+                'unique_together': {('area', 'trigram')},
+            },
+        ),
+        migrations.RunPython(index_existing_areas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_article_fts(apps, schema_editor):
+    from news_app.article_search import rebuild_search_index, fts_available
+    if fts_available(schema_editor.connection):
+        rebuild_search_index(schema_editor.connection)
+
+
+def drop_article_fts(apps, schema_editor):
+    from news_app.article_search import DROP_SQL, fts_available
+    if fts_available(schema_editor.connection):
+        for statement in DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0037_areatrigram'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_article_fts, drop_article_fts),
+    ]
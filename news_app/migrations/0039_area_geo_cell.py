@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:58
+
+from django.db import migrations, models
+
+
+def assign_geo_cells(apps, schema_editor):
+    from news_app.geo import geo_cell
+    Area = apps.get_model('news_app', 'Area')
+    db_alias = schema_editor.connection.alias
+    areas = list(Area.objects.using(db_alias).filter(latitude__isnull=False, longitude__isnull=False))
+    for area in areas:
+        area.geo_cell = geo_cell(area.latitude, area.longitude)
+    Area.objects.using(db_alias).bulk_update(areas, ['geo_cell'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0038_article_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(assign_geo_cells, migrations.RunPython.noop),
+    ]
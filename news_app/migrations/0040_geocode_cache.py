@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0039_area_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GazetteerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('country_code', models.CharField(blank=True, max_length=2)),
+                ('feature_code', models.CharField(blank=True, max_length=10)),
+                ('population', models.BigIntegerField(default=0)),
+                ('geonames_id', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'gazetteer entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('gazetteer', 'Gazetteer'), ('nominatim', 'Nominatim'), ('manual', 'Manual')], max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'geocode cache entries',
+            },
+        ),
+    ]
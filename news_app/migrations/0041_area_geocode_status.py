@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:04
+
+from django.db import migrations, models
+
+
+def mark_geocoded_areas(apps, schema_editor):
+    # Areas that already have coordinates are done; the rest get queued for the geocode worker
+    Area = apps.get_model('news_app', 'Area')
+    db_alias = schema_editor.connection.alias
+    Area.objects.using(db_alias).filter(latitude__isnull=False, longitude__isnull=False).update(geocode_status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0040_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='geocode_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='area',
+            name='geocode_next_attempt_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='area',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('not_found', 'Not found'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='area',
+            index=models.Index(fields=['geocode_status', 'geocode_next_attempt_at'], name='news_app_ar_geocode_3d4030_idx'),
+        ),
+        migrations.RunPython(mark_geocoded_areas, migrations.RunPython.noop),
+    ]
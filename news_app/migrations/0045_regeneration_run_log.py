@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0044_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegenerationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('areas_total', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegenerationAreaResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('done', 'Done'), ('skipped', 'Skipped'), ('no_posts', 'No posts'), ('failed', 'Failed')], max_length=10)),
+                ('articles_created', models.PositiveIntegerField(default=0)),
+                ('duration_seconds', models.FloatField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('finished_at', models.DateTimeField(auto_now=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regeneration_results', to='news_app.area')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='news_app.regenerationrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'area'), name='unique_regeneration_result_per_area')],
+            },
+        ),
+    ]
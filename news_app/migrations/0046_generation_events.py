@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0045_regeneration_run_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='first_article_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GenerationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('started', 'Started'), ('article', 'Article'), ('done', 'Done'), ('failed', 'Failed')], max_length=10)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='news_app.generationjob')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
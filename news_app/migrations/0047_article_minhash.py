@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0046_generation_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='minhash',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArticleLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=24)),
+                ('created_at', models.DateTimeField()),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='news_app.area')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='news_app.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['area', 'key', 'created_at'], name='news_app_ar_area_id_7601c1_idx')],
+            },
+        ),
+    ]
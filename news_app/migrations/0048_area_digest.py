@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0047_article_minhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.JSONField(blank=True, default=list)),
+                ('tokens', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('area', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='digest', to='news_app.area')),
+            ],
+        ),
+    ]
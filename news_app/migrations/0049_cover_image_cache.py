@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0048_area_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoverImageCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('image_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('searched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'cover image cache entries',
+            },
+        ),
+    ]
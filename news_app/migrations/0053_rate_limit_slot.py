@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0052_generation_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_trigrams(apps, schema_editor):
+    Area = apps.get_model('news_app', 'Area')
+    AreaTrigram = apps.get_model('news_app', 'AreaTrigram')
+    db_alias = schema_editor.connection.alias
+    counts = AreaTrigram.objects.using(db_alias).values('area_id').annotate(total=Count('id'))
+    areas = [Area(id=row['area_id'], trigram_count=row['total']) for row in counts]
+    Area.objects.using(db_alias).bulk_update(areas, ['trigram_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0053_rate_limit_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='trigram_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_trigrams, migrations.RunPython.noop),
+    ]
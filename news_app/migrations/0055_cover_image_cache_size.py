@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:08
+
+from django.db import migrations, models
+
+
+def measure_entries(apps, schema_editor):
+    CoverImageCacheEntry = apps.get_model('news_app', 'CoverImageCacheEntry')
+    db_alias = schema_editor.connection.alias
+    entries = list(CoverImageCacheEntry.objects.using(db_alias).only('pk', 'query', 'image_url'))
+    for entry in entries:
+        entry.size_bytes = len(entry.query.encode('utf-8')) + len((entry.image_url or '').encode('utf-8'))
+    CoverImageCacheEntry.objects.using(db_alias).bulk_update(entries, ['size_bytes'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_app', '0054_area_trigram_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coverimagecacheentry',
+            name='size_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(measure_entries, migrations.RunPython.noop),
+    ]
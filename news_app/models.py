@@ -4,10 +4,36 @@ from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
 import hashlib
+import time
 
 
 
-class Article(models.Model):
+class TrendingScoreMixin:
+    """
+    trending_score only changes through F() increments (trending.add_trending_hits).
+    A save() of a row loaded earlier would write its stale score back over
+    them, so the UPDATE a plain save() runs leaves the field out. It is still
+    written when named in update_fields, and by INSERTs, including save()
+    re-inserting a row that was deleted meanwhile.
+    """
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            if deferred and 'trending_score' not in deferred:
+                # Django would update just the loaded fields, this one included
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred and field.name != 'trending_score'
+                ]
+        super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if update_fields is None:
+            values = [value for value in values if value[0].name != 'trending_score']
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+class Article(TrendingScoreMixin, models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
     category = models.CharField(max_length=100, default="news")
@@ -17,12 +43,20 @@ class Article(models.Model):
     likes = models.PositiveIntegerField(default=0)
     area = models.ForeignKey('Area', on_delete=models.CASCADE, related_name='articles', null=True, blank=True)
     reporter_name = models.CharField(max_length=100, blank=True, null=True, help_text="Displayed under the article title. Can be a name or a generic credit like 'Community Reports'.")
+    # Exponentially decayed visit count, see news_app.trending.decay_weight
+    trending_score = models.FloatField(default=0, db_index=True, editable=False)
+    # MinHash signature of title + content, see news_app.near_duplicates
+    minhash = models.JSONField(null=True, blank=True, editable=False)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         if not self.slug:       
             unique_hash = hashlib.sha256(self.title.encode()).hexdigest()  # Generate a unique hash
             self.slug = f"{slugify(self.title)}-{unique_hash}"  # Append the hash to the slug
+            if Article.objects.filter(slug=self.slug).exists():
+                # Same title as an earlier article; the slug field is unique
+                unique_hash = hashlib.sha256(f"{self.title}{time.time_ns()}".encode()).hexdigest()
+                self.slug = f"{slugify(self.title)}-{unique_hash}"
         super().save(*args, **kwargs)
         
         # Send push notifications for new articles
@@ -36,6 +70,22 @@ class Article(models.Model):
     class Meta:
         ordering = ['-created_at']  # Add default ordering
 
+class ArticleLSHBucket(models.Model):
+    """One LSH band of an article's MinHash signature; articles sharing a key are near-duplicate candidates."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='lsh_buckets')
+    area = models.ForeignKey('Area', on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=24)
+    # The article's created_at, so the lookup window needs no join
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['area', 'key', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.article_id})"
+
 class questions(models.Model):
     question = models.CharField(max_length=255)
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
@@ -63,7 +113,51 @@ class URLModel(models.Model):
     def __str__(self):
         return self.path
 
+class VisitRollup(models.Model):
+    """Visits per area page or article, bucketed by hour (or by day once compacted)."""
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    area = models.ForeignKey('Area', on_delete=models.CASCADE, null=True, blank=True, related_name='visit_rollups')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, null=True, blank=True, related_name='visit_rollups')
+    bucket = models.DateTimeField(db_index=True)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES, default=HOUR)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['granularity', 'bucket']),
+        ]
+
+    def __str__(self):
+        target = self.article or self.area
+        return f"{target} @ {self.bucket:%Y-%m-%d %H:00} ({self.granularity}): {self.visits}"
+
+
+
+class TrendingSnapshot(models.Model):
+    """Precomputed landing page leaderboards (top areas and top articles)."""
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    payload = models.JSONField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Trending snapshot @ {self.created_at:%Y-%m-%d %H:%M}"
 
+class TrendingEpoch(models.Model):
+    """
+    The time stored trending scores are relative to (a single row). Moved
+    forward, with every score rescaled, before scores can overflow; see
+    news_app.trending.current_epoch.
+    """
+    epoch = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Trending scores relative to {self.epoch:%Y-%m-%d %H:%M}"
 
 class Advertisement(models.Model):
     content = models.TextField()
@@ -87,19 +181,269 @@ class Advertisement(models.Model):
     class Meta:
         ordering = ['-created_at']
 
-class Area(models.Model):
+class Area(TrendingScoreMixin, models.Model):
+    # New areas are geocoded in the background, see news_app.geocode_queue
+    GEOCODE_PENDING = 'pending'
+    GEOCODE_DONE = 'done'
+    GEOCODE_NOT_FOUND = 'not_found'
+    GEOCODE_FAILED = 'failed'  # gave up after GEOCODE_MAX_ATTEMPTS errors
+    GEOCODE_STATUS_CHOICES = [
+        (GEOCODE_PENDING, 'Pending'),
+        (GEOCODE_DONE, 'Done'),
+        (GEOCODE_NOT_FOUND, 'Not found'),
+        (GEOCODE_FAILED, 'Failed'),
+    ]
+
     name = models.CharField(max_length=255, unique=True)
     last_generated_at = models.DateTimeField(null=True, blank=True, editable=False)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    geocode_status = models.CharField(max_length=10, choices=GEOCODE_STATUS_CHOICES, default=GEOCODE_PENDING)
+    geocode_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    geocode_next_attempt_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Lat/lon grid bucket for nearby lookups, see news_app.geo.geo_cell
+    geo_cell = models.IntegerField(null=True, blank=True, db_index=True, editable=False)
+    # Number of AreaTrigram rows, to rank fuzzy match candidates by similarity, see news_app.area_search
+    trigram_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Exponentially decayed area page visit count, see news_app.trending.decay_weight
+    trending_score = models.FloatField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['geocode_status', 'geocode_next_attempt_at']),
+        ]
 
     def save(self, *args, **kwargs):
+        from .geo import geo_cell
         self.name = self.name.lower()
+        self.geo_cell = geo_cell(self.latitude, self.longitude)
+        if self.geo_cell is not None:
+            # Coordinates set by hand count as geocoded
+            self.geocode_status = self.GEOCODE_DONE
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell', 'geocode_status'}
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+class AreaTrigram(models.Model):
+    """Character trigrams of Area.name, used to find candidates for fuzzy area matching."""
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        unique_together = ['area', 'trigram']
+        indexes = [
+            models.Index(fields=['trigram', 'area']),
+        ]
+
+    def __str__(self):
+        return f"{self.area.name}: '{self.trigram}'"
+
+class GazetteerEntry(models.Model):
+    """A place name from an offline gazetteer (GeoNames dump), see `manage.py import_gazetteer`."""
+    name = models.CharField(max_length=255, db_index=True)  # normalized, like Area.name
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    country_code = models.CharField(max_length=2, blank=True)
+    feature_code = models.CharField(max_length=10, blank=True)
+    population = models.BigIntegerField(default=0)
+    geonames_id = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'gazetteer entries'
+
+    def __str__(self):
+        return f"{self.name} ({self.country_code})"
+
+class GeocodeCacheEntry(models.Model):
+    """Remembered geocoding result for a normalized query; a miss is stored with no coordinates."""
+    GAZETTEER = 'gazetteer'
+    NOMINATIM = 'nominatim'
+    MANUAL = 'manual'
+    SOURCE_CHOICES = [(GAZETTEER, 'Gazetteer'), (NOMINATIM, 'Nominatim'), (MANUAL, 'Manual')]
+
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'geocode cache entries'
+
+    def __str__(self):
+        if self.latitude is None:
+            return f"{self.query}: not found ({self.source})"
+        return f"{self.query}: ({self.latitude}, {self.longitude}) ({self.source})"
+
+class CoverImageCacheEntry(models.Model):
+    """Remembered Unsplash search for a cover image query; a search that found nothing has no image_url."""
+    query = models.CharField(max_length=255, unique=True)
+    image_url = models.URLField(max_length=500, null=True, blank=True)
+    # Bytes of query + image_url, for COVER_IMAGE_CACHE_MAX_BYTES
+    size_bytes = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    searched_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'cover image cache entries'
+
+    def __str__(self):
+        return f"{self.query}: {self.image_url or 'no image'} ({self.hits} hits)"
+
+class AreaDigest(models.Model):
+    """What has already been published for an area, fed to the article prompt; see news_app.area_digest."""
+    area = models.OneToOneField(Area, on_delete=models.CASCADE, related_name='digest')
+    # Newest first: [{"article_id": ..., "title": ..., "summary": ...}, ...]
+    entries = models.JSONField(default=list, blank=True)
+    tokens = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Digest for {self.area.name} ({len(self.entries)} stories, ~{self.tokens} tokens)"
+
+class RateLimitSlot(models.Model):
+    """When the next request to a rate-limited upstream may go out, shared by all processes (see ratelimit.SharedRateLimiter)."""
+    name = models.CharField(max_length=50, unique=True)
+    next_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name}: next at {self.next_at}"
+
+class GeocodeCheckpoint(models.Model):
+    """Progress of a `manage.py geocode_areas` run, so an interrupted run resumes where it stopped."""
+    name = models.CharField(max_length=255, unique=True)
+    last_area_id = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    geocoded = models.PositiveIntegerField(default=0)
+    not_found = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        state = 'finished' if self.finished_at else f'at area {self.last_area_id}'
+        return f"{self.name}: {self.processed} processed, {state}"
+
+class GenerationJob(models.Model):
+    """A queued "Refresh News" run for an area, processed by `manage.py run_generation_worker`."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+    ACTIVE_STATUSES = [QUEUED, RUNNING]
+
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='generation_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    articles_created = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    # When the first streamed article was saved; minus started_at that's the time to first article
+    first_article_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by the worker while the job runs; a running job without a recent one is requeued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # Concurrent refreshes of one area coalesce into a single job
+            models.UniqueConstraint(
+                fields=['area'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_generation_job_per_area',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Generation for {self.area.name} ({self.status})"
+
+class GenerationEvent(models.Model):
+    """Progress of a GenerationJob, handed to the polling browser by views.generation_job_status."""
+    STARTED = 'started'
+    ARTICLE = 'article'
+    DONE = 'done'
+    FAILED = 'failed'
+    KIND_CHOICES = [(STARTED, 'Started'), (ARTICLE, 'Article'), (DONE, 'Done'), (FAILED, 'Failed')]
+    TERMINAL_KINDS = [DONE, FAILED]
+
+    job = models.ForeignKey(GenerationJob, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} event for job {self.job_id}"
+
+class RegenerationRun(models.Model):
+    """One `manage.py regenerate_all_articles` run; its per-area outcomes are RegenerationAreaResult rows."""
+    options = models.JSONField(default=dict, blank=True)
+    areas_total = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        state = 'finished' if self.finished_at else 'unfinished'
+        return f"Regeneration run {self.pk} ({self.areas_total} areas, {state})"
+
+class RegenerationAreaResult(models.Model):
+    DONE = 'done'
+    SKIPPED = 'skipped'
+    NO_POSTS = 'no_posts'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(DONE, 'Done'), (SKIPPED, 'Skipped'), (NO_POSTS, 'No posts'), (FAILED, 'Failed')]
+
+    run = models.ForeignKey(RegenerationRun, on_delete=models.CASCADE, related_name='results')
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='regeneration_results')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    articles_created = models.PositiveIntegerField(default=0)
+    duration_seconds = models.FloatField(default=0)
+    message = models.TextField(blank=True)
+    finished_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'area'], name='unique_regeneration_result_per_area'),
+        ]
+
+    def __str__(self):
+        return f"Run {self.run_id}: {self.area.name} {self.status} ({self.articles_created} articles)"
+
+class LLMResponseCache(models.Model):
+    """A stored LLM response, keyed by a hash of everything that went into the prompt. See news_app.llm_cache."""
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    area_name = models.CharField(max_length=255, blank=True)
+    response = models.JSONField()
+    size_bytes = models.PositiveIntegerField(default=0)
+    # How long the original call took, so hits can be turned into time saved
+    generation_seconds = models.FloatField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model_name} v{self.prompt_version} for {self.area_name or '-'} ({self.hits} hits)"
+
 class NotificationSubscription(models.Model):
     area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='subscriptions')
     endpoint = models.URLField(max_length=500)
@@ -0,0 +1,112 @@
+"""
+Near-duplicate detection for generated articles, with MinHash and LSH.
+
+Regenerating an area often makes articles that say the same thing as ones
+from the last run. Each article gets a MinHash signature of the word
+3-shingles of its title and content (Article.minhash): NUM_PERM minimums
+of hashed shingles under fixed random permutations. The fraction of
+positions where two signatures agree estimates the Jaccard similarity of
+the two texts.
+
+To find candidates without comparing against every article, a signature is
+cut into BANDS bands of ROWS values and each band is hashed into an
+ArticleLSHBucket row, indexed by (area, key). Two articles share at least
+one bucket with probability 1 - (1 - s**ROWS)**BANDS for similarity s:
+about 0.9998 at 0.8 and 0.64 at 0.5, so only candidates are fetched and
+scored. generation.save_articles drops articles that come out at or above
+ARTICLE_DEDUP_THRESHOLD against one from the same area in the last
+ARTICLE_DEDUP_WINDOW_DAYS, before a cover image is looked up or anyone is
+notified.
+
+The permutations are seeded with a constant, so stored signatures stay
+comparable across processes and deploys; changing NUM_PERM, BANDS or the
+shingling means running `manage.py backfill_article_minhash --all`.
+"""
+import hashlib
+import random
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Article, ArticleLSHBucket
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1  # Mersenne prime, larger than any 60-bit shingle hash
+_random = random.Random(1299709)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text):
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, content):
+    """MinHash signature (a list of NUM_PERM ints) of an article, or None if it has no words."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big') >> 4
+        for shingle in shingles(f"{title} {content}")
+    ]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+def band_keys(sig):
+    return [
+        f"{band}:{hashlib.blake2b(repr(sig[band * ROWS:(band + 1) * ROWS]).encode(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+def find_duplicate(area, sig, threshold=None, window_days=None):
+    """
+    The most similar recent article of `area` whose estimated similarity to
+    `sig` is at least `threshold`, as (article_id, similarity), or None.
+    """
+    if sig is None:
+        return None
+    threshold = threshold if threshold is not None else getattr(settings, 'ARTICLE_DEDUP_THRESHOLD', 0.8)
+    window_days = window_days if window_days is not None else getattr(settings, 'ARTICLE_DEDUP_WINDOW_DAYS', 30)
+    since = timezone.now() - timedelta(days=window_days)
+    candidate_ids = set(
+        ArticleLSHBucket.objects.filter(area=area, key__in=band_keys(sig), created_at__gte=since)
+        .values_list('article_id', flat=True)
+    )
+    best = None
+    for article_id, other in Article.objects.filter(id__in=candidate_ids).values_list('id', 'minhash'):
+        if not other:
+            continue
+        score = similarity(sig, other)
+        if score >= threshold and (best is None or score > best[1]):
+            best = (article_id, score)
+    return best
+
+
+def index_article(article):
+    """Give `article` a signature if it has none, and (re)build its LSH buckets."""
+    if article.minhash is None:
+        article.minhash = signature(article.title, article.content)
+        if article.minhash is None:
+            return
+        article.save(update_fields=['minhash'])
+    ArticleLSHBucket.objects.filter(article=article).delete()
+    if article.area_id is None:
+        return
+    ArticleLSHBucket.objects.bulk_create([
+        ArticleLSHBucket(article=article, area_id=article.area_id, key=key, created_at=article.created_at)
+        for key in band_keys(article.minhash)
+    ])
@@ -0,0 +1,111 @@
+"""
+Pacing for calls to rate-limited upstreams (Nominatim allows 1 request per
+second). TokenBucket is a thread-safe per-process limiter; SharedRateLimiter
+keeps its schedule in the database, so the limit holds across every web
+process and worker.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `capacity`. Limits are per process; use SharedRateLimiter where the
+    upstream's policy is global.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available right now; return whether it was taken."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Block until a token is available and take it. Returns False if
+        `timeout` seconds pass first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """
+    Allows `rate` acquisitions per second across all processes sharing the
+    database. Each acquire() reserves the next free slot in the
+    RateLimitSlot row called `name` (one short write transaction, so
+    concurrent callers queue up behind each other) and then sleeps until
+    that slot. Same interface as TokenBucket.
+    """
+
+    def __init__(self, name, rate):
+        self.name = name
+        self.rate = float(rate)
+
+    def _row(self):
+        from .models import RateLimitSlot
+
+        try:
+            RateLimitSlot.objects.get_or_create(name=self.name)
+        except IntegrityError:
+            pass  # Created by another process just now
+        return RateLimitSlot.objects.select_for_update().filter(name=self.name)
+
+    def _reserve(self, timeout):
+        """Reserve the next slot and return the seconds until it, or None if that's beyond `timeout`."""
+        with transaction.atomic():
+            slot = self._row().get()
+            now = timezone.now()
+            start = max(now, slot.next_at)
+            wait = (start - now).total_seconds()
+            if timeout is not None and wait > timeout:
+                return None
+            slot.next_at = start + timedelta(seconds=1 / self.rate)
+            slot.save(update_fields=['next_at'])
+        return wait
+
+    def try_acquire(self):
+        """Take the slot if it is free right now; return whether it was taken."""
+        return self._reserve(timeout=0) is not None
+
+    def acquire(self, timeout=None):
+        """
+        Block until this caller's slot comes up. Returns False without
+        reserving anything if it's more than `timeout` seconds away.
+        """
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
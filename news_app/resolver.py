@@ -0,0 +1,147 @@
+"""
+Shared route resolution cache.
+
+Maps normalized area names to Area ids and (area, slug) pairs to Article ids
+so that the area/article views and the page view counter don't each look
+the same rows up again. Entries live in a bounded LRU, are evicted when an
+Area or Article is saved or deleted in this process, and expire after
+ROUTE_CACHE_TTL seconds so renames and deletes made by other workers are
+picked up too.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Area, Article
+from .utils import normalize_area_name
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping with an optional per-entry TTL."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        """Drop every entry for which predicate(key, value) is true."""
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_max_entries = getattr(settings, 'ROUTE_CACHE_MAX_ENTRIES', 10000)
+_ttl = getattr(settings, 'ROUTE_CACHE_TTL', 300)
+area_ids = LRUCache(_max_entries, ttl=_ttl)  # normalized name -> area id
+article_ids = LRUCache(_max_entries, ttl=_ttl)  # (area id, slug) -> article id
+
+
+def resolve_area_ids(names):
+    """Resolve many area names at once; unknown names are left out of the result."""
+    resolved = {}
+    missing = set()
+    for name in names:
+        key = normalize_area_name(name)
+        area_id = area_ids.get(key)
+        if area_id is None:
+            missing.add(key)
+        else:
+            resolved[key] = area_id
+    if missing:
+        for name, area_id in Area.objects.filter(name__in=missing).values_list('name', 'id'):
+            area_ids.set(name, area_id)
+            resolved[name] = area_id
+    return resolved
+
+
+def resolve_area_id(name):
+    """Return the id of the area called `name`, or None if there is no such area."""
+    return resolve_area_ids([name]).get(normalize_area_name(name))
+
+
+def resolve_article_ids(pairs):
+    """
+    Resolve many (area_id, slug) pairs at once; pairs that don't match an
+    article in that area are left out of the result.
+    """
+    resolved = {}
+    missing = set()
+    for pair in pairs:
+        article_id = article_ids.get(pair)
+        if article_id is None:
+            missing.add(pair)
+        else:
+            resolved[pair] = article_id
+    if missing:
+        found = Article.objects.filter(
+            area_id__in={area_id for area_id, _ in missing},
+            slug__in={slug for _, slug in missing},
+        ).values_list('id', 'area_id', 'slug')
+        for article_id, area_id, slug in found:
+            if (area_id, slug) in missing:
+                article_ids.set((area_id, slug), article_id)
+                resolved[(area_id, slug)] = article_id
+    return resolved
+
+
+def resolve_article_id(area_name, slug):
+    """Return the id of the article `slug` in area `area_name`, or None."""
+    area_id = resolve_area_id(area_name)
+    if area_id is None:
+        return None
+    return resolve_article_ids([(area_id, slug)]).get((area_id, slug))
+
+
+def clear_route_cache():
+    area_ids.clear()
+    article_ids.clear()
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+def _evict_area(sender, instance, **kwargs):
+    # The name may have changed, so evict by id as well as by the current name
+    area_ids.discard_where(lambda name, area_id: area_id == instance.pk or name == instance.name)
+    if kwargs.get('signal') is post_delete:
+        article_ids.discard_where(lambda key, article_id: key[0] == instance.pk)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def _evict_article(sender, instance, **kwargs):
+    article_ids.discard_where(
+        lambda key, article_id: article_id == instance.pk or key == (instance.area_id, instance.slug)
+    )
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from news_app import area_digest, llm
+from news_app.fake_services import FakeGemini
+from news_app.generation import generate_news_for_area
+from news_app.models import Area, AreaDigest, Article, Post
+
+
+class RecordingGemini(FakeGemini):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def generate(self, generation_config, prompt, stream=False):
+        self.prompts.append(prompt)
+        return super().generate(generation_config, prompt, stream)
+
+
+class AreaDigestTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='basavanagudi')
+
+    def _article(self, title, content='Something happened.'):
+        return Article.objects.create(title=title, content=content, area=self.area)
+
+    def test_summary_is_cut_on_a_sentence_or_word(self):
+        self.assertEqual(area_digest.summarize('  Short   and sweet. '), 'Short and sweet.')
+        sentences = 'The bus depot reopened today after repairs. ' * 10
+        self.assertEqual(area_digest.summarize(sentences), sentences[:area_digest.SUMMARY_CHARS].rsplit('. ', 1)[0] + '.')
+        words = 'word ' * 100
+        summary = area_digest.summarize(words)
+        self.assertTrue(summary.endswith('word...'))
+        self.assertLessEqual(len(summary), area_digest.SUMMARY_CHARS + 3)
+
+    def test_area_without_articles_has_an_empty_digest(self):
+        self.assertEqual(area_digest.prompt_text(self.area), '')
+
+    def test_digest_is_built_from_the_latest_articles(self):
+        self._article('Old story')
+        self._article('New story')
+        self.assertEqual([item['title'] for item in area_digest.get_digest(self.area).entries],
+                         ['New story', 'Old story'])
+
+    @override_settings(AREA_DIGEST_TOKEN_BUDGET=20)
+    def test_new_articles_go_on_top_and_the_oldest_drop_off(self):
+        area_digest.get_digest(self.area)
+        area_digest.add_articles(self.area, [self._article('First story')])
+        area_digest.add_articles(self.area, [self._article('Second story'), self._article('Third story')])
+        digest = AreaDigest.objects.get(area=self.area)
+        titles = [item['title'] for item in digest.entries]
+        self.assertEqual(titles[0], 'Third story')
+        self.assertNotIn('First story', titles)
+        self.assertLessEqual(digest.tokens, 20)
+
+    @override_settings(LLM_CACHE_ENABLED=False)
+    @mock.patch('news_app.generation.generate_questions')
+    @mock.patch('news_app.generation.CoverImages')
+    def test_generation_sends_the_digest_and_updates_it(self, cover_images, generate_questions):
+        self._article('Temple festival draws crowds', 'Thousands turned up for the car festival.')
+        Post.objects.create(area=self.area, content='The streetlights on Bull Temple Road are out again.')
+        fake = RecordingGemini(seed=3)
+        previous = llm.set_model_factory(fake)
+        self.addCleanup(llm.set_model_factory, previous)
+
+        result = generate_news_for_area(self.area)
+
+        self.assertGreater(result.articles_created, 0)
+        self.assertIn('already been published', fake.prompts[0])
+        self.assertIn('- Temple festival draws crowds: Thousands turned up', fake.prompts[0])
+        titles = [item['title'] for item in AreaDigest.objects.get(area=self.area).entries]
+        self.assertEqual(titles[-1], 'Temple festival draws crowds')
+        self.assertEqual(len(titles), result.articles_created + 1)
@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from news_app.area_search import AutocompleteIndex, candidate_areas, rebuild_area_trigrams, trigrams
+from news_app.models import Area, AreaTrigram, URLModel
+from news_app.views import find_similar_area
+
+
+class TrigramCandidateTests(TestCase):
+    def setUp(self):
+        self.short = Area.objects.create(name='hal')
+        # Each shares more trigrams with "hall" than "hal" does, but is far less similar overall
+        for i in range(60):
+            Area.objects.create(name=f'hallmark hall {i} cross road')
+
+    def test_index_and_count_follow_renames(self):
+        self.assertEqual(self.short.trigram_count, len(trigrams('hal')))
+        self.short.name = 'hal airport'
+        self.short.save()
+        self.short.refresh_from_db()
+        self.assertEqual(self.short.trigram_count, len(trigrams('hal airport')))
+        self.assertEqual(AreaTrigram.objects.filter(area=self.short).count(), self.short.trigram_count)
+
+    def test_short_name_outranks_long_names_sharing_more_trigrams(self):
+        self.assertEqual(candidate_areas('hall', limit=3)[0], self.short)
+
+    def test_short_name_survives_the_candidate_cap(self):
+        self.assertEqual(find_similar_area('hall')['area'], self.short)
+
+    def test_rebuild_restores_counts(self):
+        Area.objects.update(trigram_count=0)
+        rebuild_area_trigrams(batch_size=100)
+        self.short.refresh_from_db()
+        self.assertEqual(self.short.trigram_count, len(trigrams('hal')))
+        self.assertEqual(candidate_areas('hall', limit=3)[0], self.short)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        for name in ['rose garden', 'garden city', 'gandhi nagar', 'rajaji nagar', 'indira nagar', 'hsr layout']:
+            Area.objects.create(name=name)
+        URLModel.objects.create(path='/area/indira-nagar/', visits=50, area=Area.objects.get(name='indira nagar'))
+        URLModel.objects.create(path='/area/rose-garden/', visits=10, area=Area.objects.get(name='rose garden'))
+        self.index = AutocompleteIndex(limit=10)
+        self.index.build()
+
+    def test_short_prefix_matches_word_starts_by_popularity(self):
+        self.assertEqual(self.index.search('gar'), ['rose garden', 'garden city'])
+
+    def test_long_prefix(self):
+        self.assertEqual(self.index.search('garden c'), ['garden city'])
+        self.assertEqual(self.index.search('layouts'), [])
+
+    def test_common_word_scan_keeps_popularity_order(self):
+        self.assertEqual(self.index.search('nagar', limit=2), ['indira nagar', 'gandhi nagar'])
+
+    def test_rebuild_doesnt_change_a_snapshot_in_use(self):
+        before = self.index._snapshot
+        Area.objects.create(name='garvebhavi palya')
+        Area.objects.filter(name='rose garden').delete()
+        self.index.build()
+
+        self.assertIsNot(self.index._snapshot, before)
+        # A search still holding the old snapshot sees the old index throughout
+        self.assertEqual([before.names[area_id] for area_id in before.top_by_prefix['gar']],
+                         ['rose garden', 'garden city'])
+        self.assertEqual(self.index.search('gar'), ['garden city', 'garvebhavi palya'])
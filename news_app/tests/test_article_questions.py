@@ -0,0 +1,65 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from news_app.article_questions import generate_questions, without_questions
+from news_app.models import Area, Article, questions
+
+
+class Generator:
+    """Stand-in for the batched Gemini call: two questions per article, optionally failing some batches."""
+
+    def __init__(self, fail_for=()):
+        self.batches = []
+        self.fail_for = set(fail_for)
+
+    def __call__(self, articles, limiter=None):
+        self.batches.append([article.pk for article in articles])
+        if self.fail_for & {article.pk for article in articles}:
+            raise RuntimeError('LLM unavailable')
+        return {article.pk: [f'What do you think of {article.title}?', 'Were you there?'] for article in articles}
+
+
+class GenerateQuestionsTests(TestCase):
+    def setUp(self):
+        area = Area.objects.create(name='malleshwaram')
+        self.articles = [Article.objects.create(title=f'Story {i}', content='Text.', area=area) for i in range(5)]
+
+    def test_articles_are_batched(self):
+        generate = Generator()
+        self.assertEqual(generate_questions(self.articles, batch_size=2, generate=generate), 5)
+        self.assertEqual([len(batch) for batch in generate.batches], [2, 2, 1])
+        self.assertEqual(questions.objects.count(), 10)
+        self.assertFalse(without_questions().exists())
+
+    def test_articles_that_already_have_questions_are_left_alone(self):
+        questions.objects.create(article=self.articles[0], question='Already asked?')
+        self.assertEqual(generate_questions(self.articles, batch_size=5, generate=Generator()), 4)
+        self.assertEqual(list(self.articles[0].questions_set.values_list('question', flat=True)), ['Already asked?'])
+
+    def test_failed_batch_does_not_stop_the_others(self):
+        generate = Generator(fail_for={self.articles[0].pk})
+        with self.assertLogs('news_app.article_questions', 'ERROR'):
+            self.assertEqual(generate_questions(self.articles, batch_size=2, generate=generate), 3)
+        self.assertEqual(set(without_questions().values_list('pk', flat=True)),
+                         {self.articles[0].pk, self.articles[1].pk})
+
+    def test_backfill_command(self):
+        questions.objects.create(article=self.articles[0], question='Already asked?')
+        generate = Generator()
+        out = StringIO()
+        with mock.patch('news_app.views.generate_article_qs', generate):
+            call_command('generate_article_questions', '--batch-size', '3', stdout=out)
+        self.assertEqual(len(generate.batches), 2)
+        self.assertIn('Done: 4 of 4 articles got questions.', out.getvalue())
+
+    def test_detail_view_only_reads_stored_questions(self):
+        article = self.articles[0]
+        questions.objects.create(article=article, question='Were you there?')
+        with mock.patch('news_app.views.generate_article_qs') as generate:
+            response = self.client.get(f'/malleshwaram/{article.slug}/')
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q.question for q in response.context['questions']], ['Were you there?'])
@@ -0,0 +1,61 @@
+from django.test import TestCase
+
+from news_app.article_search import decode_cursor, encode_cursor, search_articles, to_fts_query
+from news_app.models import Area, Article
+
+
+class ArticleSearchTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='malleshwaram')
+        self.other_area = Area.objects.create(name='basavanagudi')
+        self.articles = [
+            Article.objects.create(title=f'Festival day {i}', content='Stalls and music along the road.', area=self.area)
+            for i in range(7)
+        ]
+        Article.objects.create(title='Water supply cut', content='No festival here.', area=self.other_area)
+        Article.objects.create(title='Road repairs', content='Potholes filled.', area=self.area)
+
+    def _all_pages(self, text, limit, **kwargs):
+        ids, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = search_articles(text, limit=limit, cursor=cursor, **kwargs)
+            ids.extend(row['id'] for row in rows)
+            pages += 1
+            if cursor is None:
+                return ids, pages
+
+    def test_keyset_pages_cover_every_match_once(self):
+        ids, pages = self._all_pages('festival', limit=3)
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        self.assertEqual(pages, 3)
+
+    def test_pages_are_in_rank_order(self):
+        rows, _ = search_articles('festival', limit=20)
+        ranks = [(row['rank'], row['id']) for row in rows]
+        self.assertEqual(ranks, sorted(ranks))
+        # Title matches weigh more than the content-only match
+        self.assertEqual(rows[-1]['title'], 'Water supply cut')
+
+    def test_area_filter(self):
+        ids, _ = self._all_pages('festival', limit=2, area_id=self.area.pk)
+        self.assertEqual(sorted(ids), sorted(article.pk for article in self.articles))
+
+    def test_prefix_match_and_snippet(self):
+        rows, cursor = search_articles('festiv', limit=1)
+        self.assertEqual(len(rows), 1)
+        self.assertIsNotNone(cursor)
+        self.assertIn('<mark>', search_articles('stalls', limit=1)[0][0]['snippet'])
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(-1.25, 42)), (-1.25, 42))
+
+    def test_malformed_cursor_starts_over(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        first_page, _ = search_articles('festival', limit=3)
+        rows, _ = search_articles('festival', limit=3, cursor='not a cursor')
+        self.assertEqual([row['id'] for row in rows], [row['id'] for row in first_page])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(to_fts_query('festival OR "road'), '"festival" "or" "road"*')
+        self.assertEqual(search_articles('!!!'), ([], None))
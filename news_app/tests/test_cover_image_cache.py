@@ -0,0 +1,71 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from news_app import cover_image_cache
+from news_app.models import CoverImageCacheEntry
+
+
+@override_settings(COVER_IMAGE_NEGATIVE_TTL_HOURS=6)
+class CoverImageCacheTests(TestCase):
+    def setUp(self):
+        cover_image_cache.memory.clear()
+        cover_image_cache.failures.clear()
+        self.addCleanup(cover_image_cache.memory.clear)
+
+    def test_unknown_query_is_a_miss(self):
+        self.assertEqual(cover_image_cache.lookup('Temple Festival'), (False, None))
+
+    def test_stored_search_is_shared_through_the_database(self):
+        cover_image_cache.store('Temple  Festival', 'https://images.example.com/temple.jpg')
+        entry = CoverImageCacheEntry.objects.get()
+        self.assertEqual(entry.query, 'temple festival')
+        self.assertEqual(entry.size_bytes, len('temple festival') + len('https://images.example.com/temple.jpg'))
+
+        # Another worker has an empty LRU
+        cover_image_cache.memory.clear()
+        self.assertEqual(cover_image_cache.lookup('temple festival'),
+                         (True, 'https://images.example.com/temple.jpg'))
+        self.assertEqual(CoverImageCacheEntry.objects.get().hits, 1)
+
+    def test_no_image_is_remembered_until_the_negative_ttl(self):
+        cover_image_cache.store('bus depot', None)
+        cover_image_cache.memory.clear()
+        self.assertEqual(cover_image_cache.lookup('bus depot'), (True, None))
+
+        CoverImageCacheEntry.objects.update(searched_at=timezone.now() - timedelta(hours=7))
+        cover_image_cache.memory.clear()
+        self.assertEqual(cover_image_cache.lookup('bus depot'), (False, None))
+
+    def test_failures_are_only_remembered_in_this_process(self):
+        cover_image_cache.remember_failure('bus depot')
+        self.assertEqual(cover_image_cache.lookup('bus depot'), (True, None))
+        self.assertFalse(CoverImageCacheEntry.objects.exists())
+
+    def _entries(self, count):
+        now = timezone.now()
+        for i in range(count):
+            cover_image_cache.store(f'query {i}', f'https://images.example.com/{i}.jpg')
+            CoverImageCacheEntry.objects.filter(query=f'query {i}').update(last_used_at=now - timedelta(hours=count - i))
+
+    def test_prune_drops_idle_then_least_recently_used(self):
+        self._entries(4)
+        CoverImageCacheEntry.objects.filter(query='query 3').update(last_used_at=timezone.now() - timedelta(days=100))
+        self.assertEqual(cover_image_cache.prune(idle_days=90, max_entries=2), 2)
+        self.assertEqual(sorted(CoverImageCacheEntry.objects.values_list('query', flat=True)), ['query 1', 'query 2'])
+
+    def test_prune_keeps_within_the_byte_budget(self):
+        self._entries(4)
+        size = CoverImageCacheEntry.objects.get(query='query 0').size_bytes
+        self.assertEqual(cover_image_cache.prune(max_entries=100, max_bytes=size * 3), 1)
+        self.assertFalse(CoverImageCacheEntry.objects.filter(query='query 0').exists())
+
+    @override_settings(COVER_IMAGE_CACHE_MAX_ENTRIES=3, COVER_IMAGE_CACHE_MAX_BYTES=10 * 1024)
+    @mock.patch.object(cover_image_cache, 'PRUNE_EVERY', 2)
+    def test_stores_prune_as_they_go(self):
+        for i in range(10):
+            cover_image_cache.store(f'query {i}', f'https://images.example.com/{i}.jpg')
+        self.assertLessEqual(CoverImageCacheEntry.objects.count(), 4)
+        self.assertTrue(CoverImageCacheEntry.objects.filter(query='query 9').exists())
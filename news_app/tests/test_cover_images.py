@@ -0,0 +1,91 @@
+import time
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+
+from news_app import cover_image_cache
+from news_app.fake_services import FakeUnsplashServer
+from news_app.generation import CoverImages
+from news_app.models import Area, Article, CoverImageCacheEntry
+
+
+class CoverImagesTests(TransactionTestCase):
+    # The searches run in pool threads with their own connections, so the rows have to be committed
+
+    def setUp(self):
+        cover_image_cache.memory.clear()
+        cover_image_cache.failures.clear()
+        self.area = Area.objects.create(name='rajajinagar')
+
+    def _articles(self, count):
+        return [Article.objects.create(title=f'Rajajinagar story {i}', content='Text.', area=self.area)
+                for i in range(count)]
+
+    def test_articles_sharing_a_query_share_one_search(self):
+        articles = self._articles(3)
+        with FakeUnsplashServer() as server, override_settings(UNSPLASH_SEARCH_URL=server.url):
+            covers = CoverImages(concurrency=2)
+            covers.add(articles[0], 'Temple festival lights', 'events')
+            covers.add(articles[1], 'temple festival, lights!', 'events')
+            covers.add(articles[2], 'Bus depot', 'news')
+            self.assertEqual(covers.finish(timeout=10), 3)
+
+        self.assertEqual(server.requests, 2)
+        covers_by_id = dict(Article.objects.values_list('id', 'cover_image'))
+        self.assertEqual(covers_by_id[articles[0].pk], covers_by_id[articles[1].pk])
+        self.assertNotEqual(covers_by_id[articles[0].pk], covers_by_id[articles[2].pk])
+        self.assertEqual(CoverImageCacheEntry.objects.count(), 2)
+
+    def test_cached_queries_skip_the_search(self):
+        article, = self._articles(1)
+        cover_image_cache.store('bus depot', 'https://images.example.com/cached.jpg')
+        with FakeUnsplashServer() as server, override_settings(UNSPLASH_SEARCH_URL=server.url):
+            covers = CoverImages()
+            covers.add(article, 'Bus depot', 'news')
+            covers.finish(timeout=10)
+        self.assertEqual(server.requests, 0)
+        article.refresh_from_db()
+        self.assertEqual(article.cover_image, 'https://images.example.com/cached.jpg')
+
+    def test_searches_past_the_deadline_save_their_cover_later(self):
+        articles = self._articles(2)
+        with FakeUnsplashServer(latency=0.5) as server, override_settings(UNSPLASH_SEARCH_URL=server.url):
+            covers = CoverImages(concurrency=2)
+            covers.add(articles[0], 'Metro station', 'news')
+            covers.add(articles[1], 'Flower market', 'news')
+            with self.assertLogs('news_app.generation', 'WARNING'):
+                self.assertEqual(covers.finish(timeout=0.1), 0)
+            self.assertFalse(Article.objects.filter(cover_image__isnull=False).exists())
+
+            deadline = time.monotonic() + 5
+            while Article.objects.filter(cover_image__isnull=True).exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertFalse(Article.objects.filter(cover_image__isnull=True).exists())
+
+    def test_session_is_closed_once_the_late_searches_finish(self):
+        articles = self._articles(2)
+        with FakeUnsplashServer(latency=0.5) as server, override_settings(UNSPLASH_SEARCH_URL=server.url):
+            covers = CoverImages(concurrency=2)
+            covers.add(articles[0], 'Metro station', 'news')
+            covers.add(articles[1], 'Flower market', 'news')
+            with mock.patch.object(covers._session, 'close', wraps=covers._session.close) as close:
+                with self.assertLogs('news_app.generation', 'WARNING'):
+                    covers.finish(timeout=0.1)
+                close.assert_not_called()
+
+                deadline = time.monotonic() + 5
+                while not close.called and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                close.assert_called_once()
+
+    def test_failed_search_leaves_the_cover_empty(self):
+        article, = self._articles(1)
+        with FakeUnsplashServer(fail_rate=1.0) as server, override_settings(UNSPLASH_SEARCH_URL=server.url):
+            covers = CoverImages()
+            covers.add(article, 'Bus depot', 'news')
+            with self.assertLogs('news_app.views', 'ERROR'):
+                self.assertEqual(covers.finish(timeout=10), 0)
+        article.refresh_from_db()
+        self.assertIsNone(article.cover_image)
+        # Failures aren't stored, so a later run searches again
+        self.assertFalse(CoverImageCacheEntry.objects.exists())
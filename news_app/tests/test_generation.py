@@ -0,0 +1,90 @@
+import threading
+
+from django.test import TestCase, override_settings
+
+from news_app.generation import GenerationError, estimate_tokens, generate_articles, iter_chunks
+from news_app.models import Area, Post
+
+
+class Recorder:
+    """Stand-in summarize/write_articles that records what it was given."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text, area_name):
+        with self._lock:
+            self.texts.append(text)
+        return self.answer(text)
+
+
+class IterChunksTests(TestCase):
+    def test_chunks_stay_within_the_budget(self):
+        items = [f'"post number {i} about the bus depot"' for i in range(50)]
+        chunks = list(iter_chunks(items, token_budget=40))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(estimate_tokens(chunk) <= 40 + len(items) for chunk in chunks))
+        self.assertEqual(" ".join(chunks), " ".join(items))
+
+    def test_huge_item_is_cut_to_the_budget(self):
+        chunks = list(iter_chunks(['x' * 1000, 'short'], token_budget=10))
+        self.assertEqual(chunks, ['x' * 40, 'short'])
+
+
+@override_settings(GENERATION_MAX_SUMMARY_ROUNDS=3)
+class GenerateArticlesTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='rajajinagar')
+        self.write = Recorder(lambda text: [{'title': 'Story', 'content': text}])
+
+    def _posts(self, count):
+        Post.objects.bulk_create(Post(area=self.area, content=f'Post {i} about the flooded underpass.')
+                                 for i in range(count))
+        return self.area.area_posts.all()
+
+    def _generate(self, posts, summarize, token_budget=100):
+        return list(generate_articles(posts, self.area.name, write_articles=self.write, summarize=summarize,
+                                      token_budget=token_budget, concurrency=2))
+
+    def test_small_backlog_is_one_prompt(self):
+        summarize = Recorder(lambda text: ['note'])
+        self._generate(self._posts(3), summarize)
+        self.assertEqual(summarize.texts, [])
+        self.assertEqual(len(self.write.texts), 1)
+        self.assertIn('Post 2 about', self.write.texts[0])
+
+    def test_no_posts_no_articles(self):
+        self.assertEqual(self._generate(self._posts(0), Recorder(lambda text: ['note'])), [])
+        self.assertEqual(self.write.texts, [])
+
+    def test_large_backlog_is_summarized_in_chunk_order(self):
+        # Each chunk's note is the number of its first post
+        summarize = Recorder(lambda text: [text.split()[1]])
+        self._generate(self._posts(60), summarize)
+        self.assertGreater(len(summarize.texts), 1)
+        self.assertEqual(len(self.write.texts), 1)
+        notes = [int(note.strip('"')) for note in self.write.texts[0].split()]
+        self.assertEqual(notes, sorted(notes))
+        self.assertEqual(len(notes), len(summarize.texts))
+
+    def test_notes_over_budget_are_summarized_again(self):
+        summarize = Recorder(lambda text: ['long note ' + 'x' * 100] if 'Post' in text else ['short note'])
+        self._generate(self._posts(60), summarize, token_budget=60)
+        second_round = [text for text in summarize.texts if 'Post' not in text]
+        self.assertTrue(second_round)
+        self.assertIn('"short note"', self.write.texts[0])
+        self.assertNotIn('long note', self.write.texts[0])
+
+    def test_summaries_that_never_shrink_stop_after_the_round_cap(self):
+        summarize = Recorder(lambda text: [text, text])
+        with self.assertRaisesMessage(GenerationError, 'after 3 rounds'):
+            self._generate(self._posts(60), summarize)
+        self.assertEqual(self.write.texts, [])
+
+    def test_failed_chunk_fails_the_generation(self):
+        summarize = Recorder(lambda text: [] if 'Post 30 ' in text else ['note'])
+        with self.assertRaises(GenerationError):
+            self._generate(self._posts(60), summarize)
+        self.assertEqual(self.write.texts, [])
@@ -0,0 +1,140 @@
+import json
+import random
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from news_app.geo import AreaPointIndex, cell_ranges, geo_cell, haversine, nearest_areas
+from news_app.models import Area
+
+# (name, lat, lon) around Bengaluru, plus one far away
+AREAS = [
+    ('koramangala', 12.9352, 77.6245),
+    ('indiranagar', 12.9784, 77.6408),
+    ('jayanagar', 12.9250, 77.5938),
+    ('whitefield', 12.9698, 77.7500),
+    ('yelahanka', 13.1007, 77.5963),
+    ('mysuru', 12.2958, 76.6394),
+]
+
+
+class GridTests(TestCase):
+    def _covered(self, cell, ranges):
+        return any(low <= cell <= high for low, high in ranges)
+
+    def test_cell_ranges_cover_the_circle(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            lat, lon = rng.uniform(-85, 85), rng.uniform(-180, 180)
+            radius = rng.choice([1, 5, 50, 500])
+            ranges = cell_ranges(lat, lon, radius)
+            self.assertEqual(ranges, sorted(ranges))
+            for _ in range(20):
+                # Random point inside the circle's bounding box; only those within the radius must be covered
+                point = (lat + rng.uniform(-1, 1) * radius / 111, lon + rng.uniform(-1, 1) * radius / 20)
+                if abs(point[0]) < 90 and haversine(lat, lon, *point) < radius:
+                    self.assertTrue(self._covered(geo_cell(*point), ranges), (lat, lon, radius, point))
+
+    def test_cell_ranges_wrap_around_the_antimeridian(self):
+        ranges = cell_ranges(0.0, 179.99, 20)
+        self.assertTrue(self._covered(geo_cell(0.0, 179.95), ranges))
+        self.assertTrue(self._covered(geo_cell(0.0, -179.95), ranges))
+        self.assertFalse(self._covered(geo_cell(0.0, 0.0), ranges))
+
+    def test_circle_over_a_pole_spans_every_longitude(self):
+        ranges = cell_ranges(89.9, 0.0, 50)
+        for lon in (-179.9, -90.0, 0.0, 90.0, 179.9):
+            self.assertTrue(self._covered(geo_cell(89.95, lon), ranges))
+
+    def test_save_keeps_geo_cell_in_step(self):
+        area = Area.objects.create(name='koramangala', latitude=12.9352, longitude=77.6245)
+        self.assertEqual(area.geo_cell, geo_cell(12.9352, 77.6245))
+        area.latitude, area.longitude = 12.2958, 76.6394
+        area.save(update_fields=['latitude', 'longitude'])
+        area.refresh_from_db()
+        self.assertEqual(area.geo_cell, geo_cell(12.2958, 76.6394))
+
+    def test_nearest_areas_matches_a_full_scan(self):
+        rng = random.Random(11)
+        areas = [Area(name=f'area {i}', latitude=12.9 + rng.uniform(-0.5, 0.5), longitude=77.6 + rng.uniform(-0.5, 0.5))
+                 for i in range(300)]
+        for area in areas:
+            area.geo_cell = geo_cell(area.latitude, area.longitude)
+        Area.objects.bulk_create(areas)
+        for lat, lon in [(12.9, 77.6), (13.35, 78.05), (12.5, 77.2)]:
+            scan = sorted((haversine(lat, lon, a.latitude, a.longitude), a.name) for a in areas)
+            expected = [item for item in scan if item[0] < 30][:5]
+            self.assertEqual(nearest_areas(lat, lon, limit=5, radius_km=30), expected)
+
+    def test_search_widens_until_enough_areas_turn_up(self):
+        for name, lat, lon in AREAS:
+            Area.objects.create(name=name, latitude=lat, longitude=lon)
+        # Only koramangala is within the first 5km; the rest need wider searches
+        names = [name for _, name in nearest_areas(12.9352, 77.6245, limit=4, radius_km=50)]
+        self.assertEqual(names, ['koramangala', 'jayanagar', 'indiranagar', 'whitefield'])
+        self.assertEqual(len(nearest_areas(12.9352, 77.6245, limit=10, radius_km=50)), 5)
+
+
+class AreaPointIndexTests(TestCase):
+    def setUp(self):
+        for name, lat, lon in AREAS:
+            Area.objects.create(name=name, latitude=lat, longitude=lon)
+        self.index = AreaPointIndex()
+        self.index.build()
+
+    def test_batch_matches_the_grid(self):
+        points = [(12.93, 77.62), (13.0, 77.6), (12.3, 76.64)]
+        for point, found in zip(points, self.index.nearest_many(points, limit=3, radius_km=50)):
+            grid = nearest_areas(*point, limit=3, radius_km=50)
+            self.assertEqual([name for _, name in found], [name for _, name in grid])
+            for (distance, _), (grid_distance, _) in zip(found, grid):
+                self.assertAlmostEqual(distance, grid_distance, places=6)
+
+    def test_radius_is_strict(self):
+        self.assertEqual([name for _, name in self.index.nearest(12.2958, 76.6394, limit=5, radius_km=10)], ['mysuru'])
+
+    def test_no_areas(self):
+        Area.objects.all().delete()
+        self.index.build()
+        self.assertEqual(self.index.nearest_many([(12.9, 77.6), (13.0, 77.6)]), [[], []])
+
+
+class NearbyEndpointTests(TestCase):
+    def setUp(self):
+        for name, lat, lon in AREAS:
+            Area.objects.create(name=name, latitude=lat, longitude=lon)
+
+    def test_single_point_uses_the_grid(self):
+        with mock.patch('news_app.views.area_points') as area_points:
+            data = self.client.get('/api/nearby-areas/', {'lat': 12.93, 'lon': 77.62}).json()
+        area_points.nearest_many.assert_not_called()
+        self.assertEqual(data['areas'][0]['name'], 'koramangala')
+        self.assertNotIn('mysuru', [area['name'] for area in data['areas']])
+
+    def _batch(self, body):
+        return self.client.post('/api/nearby-areas/batch/', json.dumps(body), content_type='application/json')
+
+    def test_batch(self):
+        response = self._batch({'points': [[12.93, 77.62], [12.3, 76.64]], 'limit': 2})
+        results = response.json()['results']
+        self.assertEqual([area['name'] for area in results[0]], ['koramangala', 'jayanagar'])
+        self.assertEqual([area['name'] for area in results[1]], ['mysuru'])
+
+    @override_settings(NEARBY_BATCH_MAX_LIMIT=3, NEARBY_BATCH_MAX_RADIUS_KM=20)
+    def test_batch_limit_and_radius_are_capped(self):
+        results = self._batch({'points': [[12.93, 77.62]], 'limit': 100, 'radius_km': 1000}).json()['results']
+        self.assertEqual(len(results[0]), 3)
+        self.assertTrue(all(area['distance'] < 20 for area in results[0]))
+
+    @override_settings(NEARBY_BATCH_MAX_POINTS=2)
+    def test_batch_rejects_bad_requests(self):
+        for body in [
+            {'points': []},
+            {'points': [[12.9, 77.6]] * 3},
+            {'points': [[91, 77.6]]},
+            {'points': [['north', 77.6]]},
+            {'points': [[12.9, 77.6]], 'radius_km': 'nan'},
+            {'points': [[12.9, 77.6]], 'limit': 0},
+        ]:
+            with self.subTest(body=body):
+                self.assertEqual(self._batch(body).status_code, 400)
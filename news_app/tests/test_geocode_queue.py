@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from news_app.fake_services import FakeNominatimServer
+from news_app.geocode_queue import due_areas, process_pending_geocodes
+from news_app.models import Area
+from news_app.ratelimit import SharedRateLimiter
+
+
+@override_settings(GEOCODE_ALLOW_NETWORK=True, GEOCODE_MAX_ATTEMPTS=2)
+class GeocodeQueueTests(TestCase):
+    def _process(self, server):
+        with override_settings(NOMINATIM_URL=server.url):
+            return process_pending_geocodes()
+
+    def test_pending_areas_are_geocoded_and_misses_recorded(self):
+        Area.objects.create(name='koramangala')
+        Area.objects.create(name='atlantis')
+        with FakeNominatimServer(places={'koramangala': (12.9352, 77.6245)}) as server, \
+                self.assertLogs('news_app.geocoding', 'WARNING'):
+            self.assertEqual(self._process(server), 2)
+
+        found = Area.objects.get(name='koramangala')
+        self.assertEqual((found.geocode_status, found.latitude, found.longitude),
+                         (Area.GEOCODE_DONE, 12.9352, 77.6245))
+        self.assertEqual(Area.objects.get(name='atlantis').geocode_status, Area.GEOCODE_NOT_FOUND)
+        self.assertFalse(due_areas().exists())
+
+    def test_areas_with_the_same_name_share_one_lookup(self):
+        Area.objects.create(name='Koramangala')
+        Area.objects.create(name='koramangala ')
+        with FakeNominatimServer(places={'koramangala': (12.9352, 77.6245)}) as server:
+            self._process(server)
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(Area.objects.filter(geocode_status=Area.GEOCODE_DONE).count(), 2)
+
+    def test_errors_back_off_then_give_up(self):
+        area = Area.objects.create(name='koramangala')
+        with FakeNominatimServer(fail_rate=1.0) as server:
+            with self.assertLogs('news_app.geocode_queue', 'WARNING'):
+                self._process(server)
+            area.refresh_from_db()
+            self.assertEqual((area.geocode_status, area.geocode_attempts), (Area.GEOCODE_PENDING, 1))
+            self.assertGreater(area.geocode_next_attempt_at, timezone.now())
+
+            # Not due yet, so nothing is processed
+            self.assertEqual(self._process(server), 0)
+
+            Area.objects.filter(pk=area.pk).update(geocode_next_attempt_at=timezone.now() - timedelta(seconds=1))
+            with self.assertLogs('news_app.geocode_queue', 'ERROR'):
+                self._process(server)
+        area.refresh_from_db()
+        self.assertEqual((area.geocode_status, area.geocode_attempts), (Area.GEOCODE_FAILED, 2))
+        self.assertIsNone(area.geocode_next_attempt_at)
+
+    def test_new_area_from_the_entry_page_is_queued(self):
+        with FakeNominatimServer() as server, override_settings(NOMINATIM_URL=server.url):
+            self.client.post('/', {'area': 'Koramangala', 'skip_correction': 'true'})
+        self.assertEqual(server.requests, 0)
+        self.assertEqual(Area.objects.get(name='koramangala').geocode_status, Area.GEOCODE_PENDING)
+
+
+class SharedRateLimiterTests(TestCase):
+    def test_limiters_with_the_same_name_share_slots(self):
+        first = SharedRateLimiter('test', rate=1)
+        second = SharedRateLimiter('test', rate=1)
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+        self.assertFalse(second.acquire(timeout=0.5))
+        self.assertTrue(SharedRateLimiter('other', rate=1).try_acquire())
+
+    def test_acquire_waits_for_its_slot(self):
+        limiter = SharedRateLimiter('test', rate=20)
+        started = timezone.now()
+        for _ in range(3):
+            self.assertTrue(limiter.acquire())
+        self.assertGreaterEqual((timezone.now() - started).total_seconds(), 0.09)
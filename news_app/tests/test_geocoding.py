@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from news_app.fake_services import FakeNominatimServer
+from news_app.geocoding import NOT_FOUND, GeocodingError, geocode, nominatim_geocode, remember_geocode
+from news_app.models import Area, GazetteerEntry, GeocodeCacheEntry
+
+
+class MalformedNominatimServer(FakeNominatimServer):
+    """Answers 200 with whatever `payload` is instead of a list of places."""
+
+    def __init__(self, payload, **kwargs):
+        super().__init__(**kwargs)
+        self.payload = payload
+
+    def answer(self, params):
+        return self.payload
+
+
+class GeocodeTests(TestCase):
+    def setUp(self):
+        self.server = FakeNominatimServer(places={'koramangala': (12.9352, 77.6245)}).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(NOMINATIM_URL=self.server.url, GEOCODE_ALLOW_NETWORK=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_cache_hit_skips_gazetteer_and_network(self):
+        remember_geocode('koramangala', 1.0, 2.0, source=GeocodeCacheEntry.MANUAL)
+        GazetteerEntry.objects.create(name='koramangala', latitude=3.0, longitude=4.0)
+
+        self.assertEqual(geocode('Koramangala'), (1.0, 2.0))
+        self.assertEqual(self.server.requests, 0)
+
+    def test_cached_miss_is_not_asked_again(self):
+        remember_geocode('atlantis', None, None, source=GeocodeCacheEntry.NOMINATIM)
+
+        self.assertEqual(geocode('atlantis'), NOT_FOUND)
+        self.assertEqual(self.server.requests, 0)
+
+    def test_gazetteer_hit_prefers_most_populous_and_is_cached(self):
+        GazetteerEntry.objects.create(name='springfield', latitude=1.0, longitude=1.0, population=100)
+        GazetteerEntry.objects.create(name='springfield', latitude=2.0, longitude=2.0, population=5000)
+
+        self.assertEqual(geocode('Springfield'), (2.0, 2.0))
+        self.assertEqual(self.server.requests, 0)
+        entry = GeocodeCacheEntry.objects.get(query='springfield')
+        self.assertEqual(entry.source, GeocodeCacheEntry.GAZETTEER)
+
+    def test_nominatim_hit_is_cached(self):
+        self.assertEqual(geocode('Koramangala'), (12.9352, 77.6245))
+        self.assertEqual(self.server.queries, ['koramangala'])
+        self.assertEqual(GeocodeCacheEntry.objects.get(query='koramangala').source, GeocodeCacheEntry.NOMINATIM)
+
+        geocode('koramangala')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_nominatim_miss_is_cached_as_not_found(self):
+        with self.assertLogs('news_app.geocoding', 'WARNING'):
+            self.assertEqual(geocode('nowhere town'), NOT_FOUND)
+        entry = GeocodeCacheEntry.objects.get(query='nowhere town')
+        self.assertIsNone(entry.latitude)
+
+        geocode('nowhere town')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_no_network_skips_nominatim(self):
+        self.assertEqual(geocode('koramangala', allow_network=False), NOT_FOUND)
+        self.assertEqual(self.server.requests, 0)
+
+    def _assert_provider_error_not_cached(self, server):
+        with server, override_settings(NOMINATIM_URL=server.url):
+            with self.assertRaises(GeocodingError):
+                geocode('koramangala', raise_errors=True)
+            # Without raise_errors the error reads as "not found" for now...
+            with self.assertLogs('news_app.geocoding', 'ERROR'):
+                self.assertEqual(geocode('koramangala'), NOT_FOUND)
+        # ...but nothing is cached, so the next lookup tries again
+        self.assertFalse(GeocodeCacheEntry.objects.filter(query='koramangala').exists())
+
+    def test_rate_limited_answer_is_a_provider_error(self):
+        server = FakeNominatimServer(places={'koramangala': (12.9, 77.6)}, max_per_second=0)
+        self._assert_provider_error_not_cached(server)
+        self.assertEqual(server.rejected, 2)
+
+    def test_unavailable_answer_is_a_provider_error(self):
+        server = FakeNominatimServer(places={'koramangala': (12.9, 77.6)}, fail_rate=1.0)
+        self._assert_provider_error_not_cached(server)
+        self.assertEqual(server.rejected, 2)
+
+    def test_malformed_payloads_are_provider_errors(self):
+        payloads = [
+            {'error': 'Unable to geocode'},
+            [{'display_name': 'koramangala'}],
+            [{'lat': 'north', 'lon': '77.6'}],
+            ['koramangala'],
+            [{'lat': '123.0', 'lon': '77.6'}],
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self._assert_provider_error_not_cached(MalformedNominatimServer(payload))
+
+    def test_nominatim_geocode_returns_floats(self):
+        self.assertEqual(nominatim_geocode('koramangala', base_url=self.server.url), (12.9352, 77.6245))
+        self.assertEqual(nominatim_geocode('atlantis', base_url=self.server.url), NOT_FOUND)
+
+
+class GeocodeAreasCommandTests(TestCase):
+    def _run(self, server, *args):
+        out = StringIO()
+        call_command('geocode_areas', '--provider', server.url, '--workers', '2', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_geocodes_and_reports_progress(self):
+        Area.objects.create(name='koramangala')
+        Area.objects.create(name='nowhere town')
+        with FakeNominatimServer(places={'koramangala': (12.9352, 77.6245)}) as server:
+            output = self._run(server)
+        self.assertIn('1 geocoded, 1 not found, 0 errors', output)
+        self.assertNotIn('hit errors', output)
+        self.assertEqual(Area.objects.get(name='koramangala').geocode_status, Area.GEOCODE_DONE)
+        self.assertEqual(Area.objects.get(name='nowhere town').geocode_status, Area.GEOCODE_NOT_FOUND)
+
+    def test_error_summary_only_counts_pending_areas_as_queued(self):
+        Area.objects.create(name='koramangala')
+        Area.objects.create(name='jayanagar')
+        Area.objects.create(name='atlantis', geocode_status=Area.GEOCODE_FAILED)
+        Area.objects.create(name='indiranagar', latitude=12.97, longitude=77.64)
+        with FakeNominatimServer(fail_rate=1.0) as server:
+            output = self._run(server)
+        self.assertIn('4 errors', output)
+        self.assertIn(
+            "4 areas hit errors in this run: 2 left pending for the geocode worker to retry, "
+            "1 already failed and won't be retried by the worker, 1 kept their earlier coordinates.",
+            output,
+        )
+        self.assertEqual(Area.objects.get(name='atlantis').geocode_status, Area.GEOCODE_FAILED)
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from news_app import jobs
+from news_app.generation import GenerationError, GenerationResult
+from news_app.models import Area, GenerationEvent, GenerationJob
+
+
+@override_settings(GENERATION_HEARTBEAT_TIMEOUT=120, GENERATION_MAX_ATTEMPTS=2)
+class GenerationJobQueueTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='whitefield')
+        self.other_area = Area.objects.create(name='hebbal')
+
+    def test_enqueue_coalesces_per_area(self):
+        job, created = jobs.enqueue_generation(self.area)
+        again, created_again = jobs.enqueue_generation(self.area)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+
+    def test_claim_takes_the_oldest_queued_job_once(self):
+        first, _ = jobs.enqueue_generation(self.area)
+        second, _ = jobs.enqueue_generation(self.other_area)
+
+        claimed = jobs.claim_next_job('worker-1')
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, GenerationJob.RUNNING)
+        self.assertEqual(claimed.worker, 'worker-1')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+        self.assertEqual(jobs.claim_next_job('worker-2').pk, second.pk)
+        self.assertIsNone(jobs.claim_next_job('worker-3'))
+
+    def _running_job(self, heartbeat_age, attempts=1, started_age=timedelta(hours=1)):
+        now = timezone.now()
+        return GenerationJob.objects.create(
+            area=self.area, status=GenerationJob.RUNNING, attempts=attempts,
+            started_at=now - started_age, heartbeat_at=now - heartbeat_age if heartbeat_age is not None else None,
+        )
+
+    def test_missed_heartbeat_requeues(self):
+        job = self._running_job(heartbeat_age=timedelta(minutes=5))
+        with self.assertLogs('news_app.jobs', 'WARNING'):
+            jobs.requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.QUEUED)
+
+    def test_long_job_with_recent_heartbeat_keeps_running(self):
+        job = self._running_job(heartbeat_age=timedelta(seconds=10))
+        jobs.requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.RUNNING)
+
+    def test_job_without_heartbeat_falls_back_to_start_time(self):
+        job = self._running_job(heartbeat_age=None)
+        with self.assertLogs('news_app.jobs', 'WARNING'):
+            jobs.requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.QUEUED)
+
+    def test_stale_job_out_of_attempts_fails(self):
+        job = self._running_job(heartbeat_age=timedelta(minutes=5), attempts=2)
+        with self.assertLogs('news_app.jobs', 'WARNING'):
+            jobs.requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_run_pending_jobs_records_outcome_and_events(self):
+        done_job, _ = jobs.enqueue_generation(self.area)
+        failed_job, _ = jobs.enqueue_generation(self.other_area)
+
+        def generate(area, on_article=None):
+            if area == self.other_area:
+                raise GenerationError('Nothing to write about.')
+            return GenerationResult(2, 'Generated 2 articles.')
+
+        with mock.patch('news_app.jobs.generate_news_for_area', side_effect=generate):
+            self.assertEqual(jobs.run_pending_jobs('worker-1'), 2)
+
+        done_job.refresh_from_db()
+        failed_job.refresh_from_db()
+        self.assertEqual((done_job.status, done_job.articles_created), (GenerationJob.DONE, 2))
+        self.assertEqual((failed_job.status, failed_job.message), (GenerationJob.FAILED, 'Nothing to write about.'))
+        self.assertEqual(list(done_job.events.values_list('kind', flat=True)),
+                         [GenerationEvent.STARTED, GenerationEvent.DONE])
+
+    def test_old_events_are_pruned(self):
+        job, _ = jobs.enqueue_generation(self.area)
+        old = jobs.publish_event(job, GenerationEvent.STARTED)
+        GenerationEvent.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        recent = jobs.publish_event(job, GenerationEvent.DONE)
+
+        self.assertEqual(jobs.prune_events(retention_days=7), 1)
+        self.assertEqual(list(GenerationEvent.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_status_endpoint_returns_events_after_last_seen(self):
+        job, _ = jobs.enqueue_generation(self.area)
+        first = jobs.publish_event(job, GenerationEvent.STARTED)
+        second = jobs.publish_event(job, GenerationEvent.ARTICLE, title='Whitefield metro opens')
+
+        data = self.client.get(f'/api/generation-jobs/{job.pk}/', {'last_event_id': first.pk}).json()
+        self.assertEqual([event['id'] for event in data['events']], [second.pk])
+        self.assertEqual(data['last_event_id'], second.pk)
+
+        data = self.client.get(f'/api/generation-jobs/{job.pk}/', {'last_event_id': second.pk}).json()
+        self.assertEqual((data['events'], data['last_event_id']), ([], second.pk))
+
+    def test_stale_run_does_not_overwrite_a_newer_claim(self):
+        job, _ = jobs.enqueue_generation(self.area)
+        claimed = jobs.claim_next_job('worker-1')
+
+        def generate(area, on_article=None):
+            # Meanwhile the heartbeat lapsed, the job was requeued and worker-2 took it over
+            GenerationJob.objects.filter(pk=job.pk).update(status=GenerationJob.QUEUED)
+            jobs.claim_next_job('worker-2')
+            return GenerationResult(2, 'Generated 2 articles.')
+
+        with mock.patch('news_app.jobs.generate_news_for_area', side_effect=generate):
+            with self.assertLogs('news_app.jobs', 'WARNING'):
+                result = jobs.run_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.attempts, job.finished_at), (GenerationJob.RUNNING, 'worker-2', 2, None))
+        self.assertEqual(result.status, GenerationJob.RUNNING)
+        self.assertFalse(job.events.filter(kind=GenerationEvent.DONE).exists())
@@ -0,0 +1,174 @@
+import json
+from unittest import mock
+
+from django.test import TestCase
+
+from news_app import llm
+from news_app.fake_services import FakeGemini
+from news_app.llm import CircuitBreaker, JSONArrayItemParser
+
+ARTICLES = [
+    {'title': 'Curly {braces} and [brackets]', 'content': 'She said "hi" \\ waved', 'tags': ['a', {'b': [1, 2]}]},
+    {'title': 'Second', 'content': 'Ends with a quote "', 'tags': []},
+    {'title': 'Third', 'content': 'Unicode: ಬೆಂಗಳೂರು', 'tags': None},
+]
+
+
+class JSONArrayItemParserTests(TestCase):
+    def test_whole_document_at_once(self):
+        parser = JSONArrayItemParser()
+        self.assertEqual(parser.feed(json.dumps({'articles': ARTICLES})), ARTICLES)
+        self.assertTrue(parser.complete)
+
+    def test_items_come_out_as_soon_as_they_close(self):
+        text = json.dumps({'articles': ARTICLES}, indent=2)
+        parser = JSONArrayItemParser()
+        seen = []
+        for end, char in enumerate(text, start=1):
+            for item in parser.feed(char):
+                seen.append(item)
+                # Nothing past the item's closing brace has been fed yet
+                self.assertEqual(json.loads(text[:end] + ']}')['articles'][-1], item)
+        self.assertEqual(seen, ARTICLES)
+        self.assertTrue(parser.complete)
+
+    def test_chunks_split_inside_strings_and_escapes(self):
+        text = json.dumps({'articles': ARTICLES})
+        for size in (1, 2, 3, 7, 50):
+            with self.subTest(size=size):
+                parser = JSONArrayItemParser()
+                items = []
+                for start in range(0, len(text), size):
+                    items.extend(parser.feed(text[start:start + size]))
+                self.assertEqual(items, ARTICLES)
+
+    def test_truncated_stream_is_not_complete(self):
+        text = json.dumps({'articles': ARTICLES})
+        parser = JSONArrayItemParser()
+        items = parser.feed(text[:text.index('"Third"')])
+        self.assertEqual(items, ARTICLES[:2])
+        self.assertFalse(parser.complete)
+
+    def test_empty_array(self):
+        parser = JSONArrayItemParser()
+        self.assertEqual(parser.feed('{"articles": []}'), [])
+        self.assertTrue(parser.complete)
+
+
+class StreamJsonItemsTests(TestCase):
+    def setUp(self):
+        previous = llm.set_model_factory(FakeGemini(seed=1, stream_chunks=5))
+        self.addCleanup(llm.set_model_factory, previous)
+
+    def test_streams_schema_items_from_the_model(self):
+        from news_app.views import ARTICLES_SCHEMA
+
+        prompt = "Based on the diverse comments collected from individuals in the area of btm layout, please write."
+        items = list(llm.stream_json_items(prompt, ARTICLES_SCHEMA, name='test'))
+        self.assertEqual(len(items), 3)
+        self.assertTrue(all(item['title'].startswith('Btm Layout') for item in items))
+
+    def test_prompt_over_the_context_limit_is_rejected_without_retries(self):
+        fake = FakeGemini(context_limit=10)
+        llm.set_model_factory(fake)
+        with self.assertRaises(llm.LLMError):
+            llm.generate_json('x' * 100, {'type': 'object'}, name='test', max_attempts=3)
+        self.assertEqual((fake.calls, fake.rejected, fake.max_prompt_tokens), (1, 1, 26))
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('news_app.llm.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    def _fail(self, times):
+        for _ in range(times):
+            self.breaker.record_failure()
+
+    def test_opens_after_the_threshold(self):
+        self._fail(2)
+        self.assertTrue(self.breaker.allow())
+        with self.assertLogs('news_app.llm', 'ERROR'):
+            self._fail(1)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_count(self):
+        self._fail(2)
+        self.breaker.record_success()
+        self._fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        with self.assertLogs('news_app.llm', 'ERROR'):
+            self._fail(3)
+        self.now += 61
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_opens_it_again(self):
+        with self.assertLogs('news_app.llm', 'ERROR'):
+            self._fail(3)
+        self.now += 61
+        self.assertTrue(self.breaker.allow())
+        with self.assertLogs('news_app.llm', 'ERROR'):
+            self._fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+
+class FlakyGemini(FakeGemini):
+    """Fails its first `failures` calls with an upstream error, then answers."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def generate(self, generation_config, prompt, stream=False):
+        if self.calls < self.failures:
+            self.calls += 1
+            raise RuntimeError('503 The model is overloaded.')
+        return super().generate(generation_config, prompt, stream)
+
+
+class GenerateJsonRetryTests(TestCase):
+    def setUp(self):
+        for patcher in (mock.patch.object(llm, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=60)),
+                        mock.patch('news_app.llm.time.sleep')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        llm.reset_metrics()
+        self.addCleanup(llm.reset_metrics)
+
+    def _use(self, fake):
+        previous = llm.set_model_factory(fake)
+        self.addCleanup(llm.set_model_factory, previous)
+        return fake
+
+    def test_transient_error_is_retried_with_backoff(self):
+        fake = self._use(FlakyGemini(failures=1))
+        with mock.patch('news_app.llm.backoff_delay', return_value=0.25) as backoff_delay, \
+                self.assertLogs('news_app.llm', 'WARNING'):
+            llm.generate_json('hello', {'type': 'object'}, name='test', max_attempts=3)
+        self.assertEqual(fake.calls, 2)
+        backoff_delay.assert_called_once_with(1)
+        llm.time.sleep.assert_any_call(0.25)
+        stats = llm.metrics()['test']
+        self.assertEqual((stats['calls'], stats['failures'], stats['retries']), (2, 1, 1))
+
+    def test_open_circuit_fails_fast(self):
+        fake = self._use(FlakyGemini(failures=100))
+        with self.assertLogs('news_app.llm', 'WARNING'):
+            with self.assertRaises(llm.LLMError):
+                llm.generate_json('hello', {'type': 'object'}, name='test', max_attempts=5)
+        # The breaker opened on the second failure, so there was no third attempt
+        self.assertEqual(fake.calls, 2)
+        with self.assertRaises(llm.CircuitOpenError):
+            llm.generate_json('hello', {'type': 'object'}, name='test')
+        self.assertEqual(fake.calls, 2)
+        self.assertEqual(llm.metrics()['test']['rejected_by_circuit'], 1)
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from news_app import llm_cache
+from news_app.models import LLMResponseCache
+
+
+class CacheKeyTests(TestCase):
+    def test_whitespace_and_area_case_dont_matter(self):
+        self.assertEqual(
+            llm_cache.cache_key('gemini', '1', 'HSR Layout', 'a  post\n about   parks'),
+            llm_cache.cache_key('gemini', '1', 'hsr layout', 'a post about parks '),
+        )
+
+    def test_model_version_area_and_text_all_matter(self):
+        base = llm_cache.cache_key('gemini', '1', 'hsr layout', 'a post')
+        self.assertNotEqual(base, llm_cache.cache_key('gemini-pro', '1', 'hsr layout', 'a post'))
+        self.assertNotEqual(base, llm_cache.cache_key('gemini', '2', 'hsr layout', 'a post'))
+        self.assertNotEqual(base, llm_cache.cache_key('gemini', '1', 'btm layout', 'a post'))
+        self.assertNotEqual(base, llm_cache.cache_key('gemini', '1', 'hsr layout', 'another post'))
+
+
+@override_settings(LLM_CACHE_ENABLED=True, LLM_CACHE_TTL_DAYS=30)
+class CachedResponseTests(TestCase):
+    def setUp(self):
+        self.key = llm_cache.cache_key('gemini', '1', 'hsr layout', 'a post')
+
+    def test_store_then_hit(self):
+        self.assertIsNone(llm_cache.get_cached_response(self.key))
+        llm_cache.store_response(self.key, [{'title': 'Parks'}], 'gemini', '1', 'hsr layout', generation_seconds=2.5)
+
+        self.assertEqual(llm_cache.get_cached_response(self.key), [{'title': 'Parks'}])
+        self.assertEqual(LLMResponseCache.objects.get(key=self.key).hits, 1)
+
+    def test_expired_entry_is_a_miss(self):
+        llm_cache.store_response(self.key, ['note'], 'gemini', '1')
+        LLMResponseCache.objects.update(created_at=timezone.now() - timedelta(days=31))
+        self.assertIsNone(llm_cache.get_cached_response(self.key))
+
+    def test_storing_again_refreshes_the_entry(self):
+        llm_cache.store_response(self.key, ['old'], 'gemini', '1')
+        LLMResponseCache.objects.update(created_at=timezone.now() - timedelta(days=31))
+        llm_cache.store_response(self.key, ['new'], 'gemini', '1')
+        self.assertEqual(llm_cache.get_cached_response(self.key), ['new'])
+
+    @override_settings(LLM_CACHE_ENABLED=False)
+    def test_disabled_cache_stores_and_serves_nothing(self):
+        llm_cache.store_response(self.key, ['note'], 'gemini', '1')
+        self.assertFalse(LLMResponseCache.objects.exists())
+        self.assertIsNone(llm_cache.get_cached_response(self.key))
+
+    def test_prune_drops_expired_then_least_recently_used(self):
+        now = timezone.now()
+        for i in range(4):
+            llm_cache.store_response(f'key-{i}', [i], 'gemini', '1')
+            LLMResponseCache.objects.filter(key=f'key-{i}').update(last_used_at=now - timedelta(hours=10 - i))
+        LLMResponseCache.objects.filter(key='key-3').update(created_at=now - timedelta(days=31))
+
+        self.assertEqual(llm_cache.prune(max_entries=2), 2)
+        self.assertEqual(sorted(LLMResponseCache.objects.values_list('key', flat=True)), ['key-1', 'key-2'])
+
+    def test_prune_evicts_least_recently_used_until_under_the_byte_budget(self):
+        now = timezone.now()
+        for i in range(4):
+            llm_cache.store_response(f'key-{i}', ['x' * 1000], 'gemini', '1')
+            LLMResponseCache.objects.filter(key=f'key-{i}').update(last_used_at=now - timedelta(hours=10 - i))
+        size = LLMResponseCache.objects.get(key='key-0').size_bytes
+
+        self.assertEqual(llm_cache.prune(max_entries=10, max_bytes=size * 2 + 1), 2)
+        self.assertEqual(sorted(LLMResponseCache.objects.values_list('key', flat=True)), ['key-2', 'key-3'])
+
+    @override_settings(LLM_CACHE_MAX_ENTRIES=100, LLM_CACHE_MAX_BYTES=3000)
+    @mock.patch.object(llm_cache, 'PRUNE_EVERY', 1)
+    def test_writes_keep_the_cache_within_its_byte_budget(self):
+        for i in range(10):
+            llm_cache.store_response(f'key-{i}', ['x' * 1000], 'gemini', '1')
+        self.assertLessEqual(sum(LLMResponseCache.objects.values_list('size_bytes', flat=True)), 3000)
+        self.assertTrue(LLMResponseCache.objects.filter(key='key-9').exists())
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from news_app import near_duplicates
+from news_app.generation import save_articles
+from news_app.models import Area, Article, ArticleLSHBucket
+
+STORY = ("The new flyover on Outer Ring Road opened to traffic on Monday morning after three years of work. "
+         "Commuters said the drive from Silk Board to Marathahalli now takes twenty minutes less, though the "
+         "service road below is still dug up and buses stop in the middle of the junction.")
+OTHER_STORY = ("A group of residents cleaned up the lake behind the temple on Sunday and planted sixty saplings "
+               "along the walking path. The ward office has promised fencing and a security guard by next month.")
+
+
+class MinHashTests(TestCase):
+    def test_signature_is_stable(self):
+        self.assertEqual(near_duplicates.signature('Flyover opens', STORY),
+                         near_duplicates.signature('Flyover opens', STORY))
+        self.assertEqual(len(near_duplicates.signature('Flyover opens', STORY)), near_duplicates.NUM_PERM)
+        self.assertIsNone(near_duplicates.signature('', '...'))
+
+    def test_similarity_tracks_overlap(self):
+        original = near_duplicates.signature('Flyover opens', STORY)
+        reworded = near_duplicates.signature('Flyover opens', STORY.replace('Monday', 'Tuesday'))
+        unrelated = near_duplicates.signature('Lake clean-up', OTHER_STORY)
+        self.assertGreaterEqual(near_duplicates.similarity(original, reworded), 0.8)
+        self.assertLess(near_duplicates.similarity(original, unrelated), 0.2)
+
+
+class FindDuplicateTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='bellandur')
+        self.article = Article.objects.create(
+            title='Flyover opens', content=STORY, area=self.area,
+            minhash=near_duplicates.signature('Flyover opens', STORY),
+        )
+        near_duplicates.index_article(self.article)
+
+    def test_index_writes_one_bucket_per_band(self):
+        self.assertEqual(ArticleLSHBucket.objects.filter(article=self.article).count(), near_duplicates.BANDS)
+
+    def test_near_copy_in_same_area_is_found(self):
+        sig = near_duplicates.signature('Flyover opens', STORY.replace('Monday', 'Tuesday'))
+        article_id, score = near_duplicates.find_duplicate(self.area, sig, threshold=0.8)
+        self.assertEqual(article_id, self.article.pk)
+        self.assertGreaterEqual(score, 0.8)
+
+    def test_other_area_and_other_story_are_not_duplicates(self):
+        other_area = Area.objects.create(name='sarjapur')
+        self.assertIsNone(near_duplicates.find_duplicate(other_area, self.article.minhash, threshold=0.8))
+        sig = near_duplicates.signature('Lake clean-up', OTHER_STORY)
+        self.assertIsNone(near_duplicates.find_duplicate(self.area, sig, threshold=0.8))
+
+    def test_articles_outside_the_window_are_ignored(self):
+        ArticleLSHBucket.objects.update(created_at=timezone.now() - timedelta(days=40))
+        self.assertIsNone(near_duplicates.find_duplicate(self.area, self.article.minhash, threshold=0.8, window_days=30))
+
+    @mock.patch('news_app.generation.generate_questions')
+    @mock.patch('news_app.generation.CoverImages')
+    def test_save_articles_drops_near_duplicates(self, cover_images, generate_questions):
+        saved = save_articles(self.area, [
+            {'title': 'Flyover opens', 'content': STORY.replace('Monday', 'Tuesday')},
+            {'title': 'Lake clean-up', 'content': OTHER_STORY},
+            {'title': 'Lake clean-up', 'content': OTHER_STORY + ' More to come.'},
+        ])
+        self.assertEqual((saved.created, saved.duplicates, saved.partial), (1, 2, False))
+        self.assertEqual(Article.objects.filter(area=self.area).count(), 2)
+        cover_images.return_value.finish.assert_called_once()
+
+
+class SlugTests(TestCase):
+    def test_same_title_gets_a_different_slug(self):
+        area = Area.objects.create(name='koramangala')
+        first = Article.objects.create(title='Weekly market', content='Vegetables.', area=area)
+        second = Article.objects.create(title='Weekly market', content='Fruit.', area=area)
+        self.assertNotEqual(first.slug, second.slug)
+        self.assertTrue(second.slug.startswith('weekly-market-'))
+
+    def test_existing_slug_is_kept(self):
+        article = Article.objects.create(title='Weekly market', content='Vegetables.')
+        slug = article.slug
+        article.title = 'Weekly market, renamed'
+        article.save()
+        article.refresh_from_db()
+        self.assertEqual(article.slug, slug)
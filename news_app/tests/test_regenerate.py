@@ -0,0 +1,82 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from news_app.generation import SavedArticles
+from news_app.management.commands.regenerate_all_articles import Command
+from news_app.models import Area, Post, RegenerationAreaResult, RegenerationRun
+
+COMMAND = 'news_app.management.commands.regenerate_all_articles'
+
+
+def fake_generate(posts, area_name, limiter=None):
+    if area_name == 'broken':
+        raise RuntimeError('LLM exploded')
+    return [{'title': f'{area_name} story'}]
+
+
+def fake_save(area, articles_data, limiter=None):
+    return SavedArticles(created=len(list(articles_data)), duplicates=0)
+
+
+@mock.patch(f'{COMMAND}.save_articles', side_effect=fake_save)
+@mock.patch(f'{COMMAND}.generate_articles', side_effect=fake_generate)
+class RegenerateAllArticlesTests(TransactionTestCase):
+    # Areas are generated in pool threads with their own connections, so the rows have to be committed
+
+    def setUp(self):
+        for name in ('koramangala', 'broken', 'jayanagar'):
+            area = Area.objects.create(name=name)
+            Post.objects.create(area=area, content=f'Something happened in {name}.')
+        Area.objects.create(name='quiet')
+
+    def _run(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('regenerate_all_articles', '--max-concurrency', '2', '--rpm', '6000', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def _statuses(self, run):
+        return dict(run.results.values_list('area__name', 'status'))
+
+    def test_a_failing_area_does_not_stop_the_others(self, generate, save):
+        out, err = self._run()
+        run = RegenerationRun.objects.get()
+        self.assertEqual(self._statuses(run), {
+            'koramangala': RegenerationAreaResult.DONE,
+            'jayanagar': RegenerationAreaResult.DONE,
+            'broken': RegenerationAreaResult.FAILED,
+            'quiet': RegenerationAreaResult.NO_POSTS,
+        })
+        self.assertEqual(run.results.get(area__name='broken').message, 'LLM exploded')
+        self.assertIsNotNone(run.finished_at)
+        self.assertIn('2 generated, 0 skipped, 1 without posts, 1 failed', out)
+        self.assertIn('articles/min', out)
+        self.assertIn('LLM exploded', err)
+
+    def test_resume_only_retries_what_did_not_finish(self, generate, save):
+        self._run()
+        run = RegenerationRun.objects.get()
+        Area.objects.filter(name='broken').update(name='fixed')
+        generate.reset_mock()
+
+        out, _ = self._run('--resume')
+        self.assertEqual([call.args[1] for call in generate.call_args_list], ['fixed'])
+        self.assertEqual(self._statuses(run)['fixed'], RegenerationAreaResult.DONE)
+        self.assertEqual(RegenerationRun.objects.count(), 1)
+        self.assertIn(f'Resuming run {run.pk}', out)
+
+    def test_nothing_to_resume(self, generate, save):
+        with self.assertRaisesMessage(CommandError, 'no interrupted or failed run'):
+            self._run('--resume')
+
+    def test_area_deleted_mid_run_is_skipped_without_a_record(self, generate, save):
+        run = RegenerationRun.objects.create()
+        command = Command()
+        command.skip_existing = True
+        command.limiter = None
+        result = command._regenerate_area(run, area_id=10_000)
+        self.assertEqual(result.status, RegenerationAreaResult.SKIPPED)
+        self.assertEqual(result.message, 'The area was deleted.')
+        self.assertFalse(run.results.exists())
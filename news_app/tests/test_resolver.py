@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from news_app import resolver
+from news_app.models import Area, Article
+from news_app.resolver import LRUCache, resolve_area_id, resolve_area_ids, resolve_article_id
+
+
+class LRUCacheTests(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = LRUCache(10, ttl=60)
+        with mock.patch('news_app.resolver.time.monotonic', return_value=1000):
+            cache.set('a', 1)
+        with mock.patch('news_app.resolver.time.monotonic', return_value=1059):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('news_app.resolver.time.monotonic', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class ResolverTests(TestCase):
+    def setUp(self):
+        resolver.clear_route_cache()
+        self.addCleanup(resolver.clear_route_cache)
+        self.area = Area.objects.create(name='koramangala')
+        self.article = Article.objects.create(title='Metro line opens', content='Text.', area=self.area)
+
+    def test_area_is_looked_up_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_area_id('  Koramangala '), self.area.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_area_id('koramangala'), self.area.pk)
+
+    def test_unknown_names_are_left_out(self):
+        self.assertIsNone(resolve_area_id('atlantis'))
+        self.assertEqual(resolve_area_ids(['Koramangala', 'atlantis']), {'koramangala': self.area.pk})
+
+    def test_article_is_looked_up_once(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(resolve_article_id('koramangala', self.article.slug), self.article.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_article_id('koramangala', self.article.slug), self.article.pk)
+
+    def test_slug_must_belong_to_the_area(self):
+        Area.objects.create(name='jayanagar')
+        self.assertIsNone(resolve_article_id('jayanagar', self.article.slug))
+
+    def test_renamed_area_is_evicted(self):
+        resolve_area_id('koramangala')
+        self.area.name = 'koramangala east'
+        self.area.save()
+        self.assertIsNone(resolve_area_id('koramangala'))
+        self.assertEqual(resolve_area_id('koramangala east'), self.area.pk)
+
+    def test_deleted_article_is_evicted(self):
+        resolve_article_id('koramangala', self.article.slug)
+        self.article.delete()
+        self.assertIsNone(resolve_article_id('koramangala', self.article.slug))
+
+    def test_deleted_area_evicts_its_articles(self):
+        area_id = self.area.pk
+        resolve_article_id('koramangala', self.article.slug)
+        self.area.delete()
+        self.assertIsNone(resolve_area_id('koramangala'))
+        self.assertFalse(any(key[0] == area_id for key in resolver.article_ids._data))
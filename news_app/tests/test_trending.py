@@ -0,0 +1,190 @@
+import math
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from news_app import trending
+from news_app.models import Area, Article, TrendingEpoch, VisitRollup
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=24)
+class DecayScoreTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.epoch = self.now - timedelta(days=3)
+        TrendingEpoch.objects.create(epoch=self.epoch)
+        self.area = Area.objects.create(name='jayanagar')
+
+    def _article(self, title):
+        return Article.objects.create(title=title, content='Something happened.', area=self.area)
+
+    def test_weight_doubles_every_half_life(self):
+        weight = trending.decay_weight(self.now, epoch=self.epoch)
+        self.assertAlmostEqual(weight, 8.0)
+        later = trending.decay_weight(self.now + timedelta(hours=24), epoch=self.epoch)
+        self.assertAlmostEqual(later / weight, 2.0)
+
+    def test_old_hits_count_for_less(self):
+        old, new = self._article('Old story'), self._article('New story')
+        trending.add_trending_hits({old.pk: 10}, {}, when=self.now - timedelta(hours=48))
+        trending.add_trending_hits({new.pk: 10}, {}, when=self.now)
+        old.refresh_from_db()
+        new.refresh_from_db()
+
+        self.assertAlmostEqual(new.trending_score / old.trending_score, 4.0)
+        self.assertAlmostEqual(trending.decayed_score(new.trending_score, at=self.now), 10.0)
+        self.assertAlmostEqual(trending.decayed_score(old.trending_score, at=self.now), 2.5)
+
+    def test_area_hits(self):
+        trending.add_trending_hits({}, {self.area.pk: 3}, when=self.now)
+        self.area.refresh_from_db()
+        self.assertAlmostEqual(trending.decayed_score(self.area.trending_score, at=self.now), 3.0)
+
+    def test_epoch_is_rebased_before_weights_overflow(self):
+        TrendingEpoch.objects.update(epoch=self.now - timedelta(days=trending.REBASE_EXPONENT + 10))
+        first, second = self._article('First'), self._article('Second')
+        Article.objects.filter(pk=first.pk).update(trending_score=2.0 ** 70)
+        Article.objects.filter(pk=second.pk).update(trending_score=2.0 ** 72)
+
+        epoch = trending.current_epoch(self.now)
+
+        self.assertEqual(epoch, self.now)
+        self.assertEqual(TrendingEpoch.objects.get().epoch, self.now)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertAlmostEqual(second.trending_score / first.trending_score, 4.0)
+        self.assertTrue(math.isfinite(trending.decay_weight(self.now)))
+        # Decayed counts are unchanged by the rebase
+        self.assertAlmostEqual(first.trending_score, 2.0 ** 70 / 2.0 ** (trending.REBASE_EXPONENT + 10))
+
+    def test_epoch_stays_put_below_the_limit(self):
+        self.assertEqual(trending.current_epoch(self.now), self.epoch)
+
+    def test_full_save_keeps_concurrent_score(self):
+        article = self._article('Stale copy')
+        trending.add_trending_hits({article.pk: 5}, {}, when=self.now)
+        article.title = 'Edited title'
+        article.save()  # This copy still has trending_score=0
+
+        article.refresh_from_db()
+        self.assertEqual(article.title, 'Edited title')
+        self.assertAlmostEqual(trending.decayed_score(article.trending_score, at=self.now), 5.0)
+
+
+class SaveKeepsTrendingScoreTests(TestCase):
+    def setUp(self):
+        self.area = Area.objects.create(name='hsr layout')
+        self.article = Article.objects.create(title='Park reopens', content='The park is open.', area=self.area)
+        trending.add_trending_hits({self.article.pk: 4}, {self.area.pk: 4})
+        self.score = Article.objects.get(pk=self.article.pk).trending_score
+
+    def test_update_fields_can_still_write_the_score(self):
+        self.article.trending_score = 0
+        self.article.save(update_fields=['trending_score'])
+        self.assertEqual(Article.objects.get(pk=self.article.pk).trending_score, 0)
+
+    def test_save_of_a_deleted_row_inserts_it_again(self):
+        Article.objects.filter(pk=self.article.pk).delete()
+        self.article.title = 'Park reopens again'
+        self.article.save()
+        self.assertEqual(Article.objects.get(pk=self.article.pk).title, 'Park reopens again')
+
+    def test_deferred_fields_are_not_loaded_or_written(self):
+        article = Article.objects.defer('content').get(pk=self.article.pk)
+        Article.objects.filter(pk=self.article.pk).update(content='Changed elsewhere.', trending_score=self.score * 2)
+        article.title = 'Park reopens'
+        with self.assertNumQueries(1):
+            article.save()
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertEqual((article.content, article.trending_score), ('Changed elsewhere.', self.score * 2))
+
+    def test_area_coordinate_update(self):
+        area = Area.objects.only('name', 'latitude', 'longitude').get(pk=self.area.pk)
+        area.latitude, area.longitude = 12.91, 77.64
+        area.save()
+        area = Area.objects.get(pk=self.area.pk)
+        self.assertIsNotNone(area.geo_cell)
+        self.assertGreater(area.trending_score, 0)
+
+
+class ConcurrentTrendingSaveTests(TransactionTestCase):
+    # The hits are added from another thread, on its own connection, while this one saves
+
+    def test_saves_racing_hits_lose_none_of_them(self):
+        area = Area.objects.create(name='domlur')
+        article = Article.objects.create(title='Flyover closed', content='Closed.', area=area)
+        when = timezone.now()
+        weight = trending.decay_weight(when)
+
+        def add_hits():
+            try:
+                for _ in range(50):
+                    trending.add_trending_hits({article.pk: 1}, {area.pk: 1}, when=when)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=add_hits)
+        thread.start()
+        stale_article, stale_area = Article.objects.get(pk=article.pk), Area.objects.get(pk=area.pk)
+        for i in range(50):
+            stale_article.title = f'Flyover closed ({i})'
+            stale_article.save()
+            stale_area.save()
+        thread.join()
+
+        article.refresh_from_db()
+        area.refresh_from_db()
+        self.assertEqual(article.title, 'Flyover closed (49)')
+        self.assertAlmostEqual(article.trending_score / weight, 50)
+        self.assertAlmostEqual(area.trending_score / weight, 50)
+
+
+class WindowedTrendingTests(TestCase):
+    def setUp(self):
+        cache.delete(trending.SNAPSHOT_CACHE_KEY)
+        self.addCleanup(cache.delete, trending.SNAPSHOT_CACHE_KEY)
+        now = timezone.now()
+        self.area = Area.objects.create(name='btm layout')
+        self.recent = Article.objects.create(title='Lake walk', content='Walk.', area=self.area)
+        self.older = Article.objects.create(title='Bus stop moved', content='Bus.', area=self.area)
+        VisitRollup.objects.create(article=self.recent, bucket=now, visits=2)
+        VisitRollup.objects.create(article=self.older, bucket=now - timedelta(days=3), visits=40)
+        VisitRollup.objects.create(area=self.area, bucket=now, visits=7)
+
+    def test_windows_are_in_the_snapshot(self):
+        windows = trending.refresh_trending_snapshot()['windows']
+        self.assertEqual(set(windows), set(trending.WINDOWS))
+        self.assertEqual([article['title'] for article in windows['24h']['articles']], ['Lake walk'])
+        self.assertEqual([article['title'] for article in windows['7d']['articles']], ['Bus stop moved', 'Lake walk'])
+        self.assertEqual(windows['7d']['articles'][0]['total_visits'], 40)
+        self.assertEqual(windows['1h']['areas'], [{'path': 'btm layout', 'visits': 7, 'name': 'Btm Layout'}])
+
+    def test_trending_api_window(self):
+        trending.refresh_trending_snapshot()
+        data = self.client.get('/api/trending-articles/', {'window': '7d'}).json()
+        self.assertEqual([article['title'] for article in data['articles']], ['Bus stop moved', 'Lake walk'])
+        self.assertEqual(self.client.get('/api/trending-articles/', {'window': '2w'}).status_code, 400)
+
+    def test_snapshot_without_windows_still_reads(self):
+        payload = trending.refresh_trending_snapshot()
+        del payload['windows']
+        cache.set(trending.SNAPSHOT_CACHE_KEY, payload)
+        self.assertEqual(trending.get_trending_snapshot()['windows'], {})
+        self.assertEqual(self.client.get('/api/trending-articles/', {'window': '1h'}).json(), {'articles': []})
+
+
+class TrendingSettingsCheckTests(TestCase):
+    def test_valid_settings(self):
+        self.assertEqual(trending.check_trending_settings(None), [])
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=0)
+    def test_half_life_must_be_positive(self):
+        self.assertEqual([error.id for error in trending.check_trending_settings(None)], ['news_app.E001'])
+
+    @override_settings(TRENDING_SCORE_EPOCH='2026-01-01T00:00:00')
+    def test_epoch_needs_an_offset(self):
+        self.assertEqual([error.id for error in trending.check_trending_settings(None)], ['news_app.E002'])
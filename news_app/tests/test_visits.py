@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase
+
+from news_app.models import Area, Article, URLModel, VisitRollup
+from news_app.resolver import clear_route_cache
+from news_app.visits import VisitBuffer, write_visits
+
+
+@mock.patch.object(VisitBuffer, '_ensure_worker', lambda self: None)  # Flushed by hand, not by the thread
+class VisitBufferTests(TestCase):
+    def setUp(self):
+        clear_route_cache()
+        self.area = Area.objects.create(name='indiranagar')
+        self.article = Article.objects.create(title='Indiranagar market reopens', content='The market is back.',
+                                              area=self.area)
+        self.buffer = VisitBuffer(flush_interval=3600, max_paths=1000)
+
+    def test_flush_aggregates_hits_per_path(self):
+        for _ in range(3):
+            self.buffer.record(f'indiranagar/{self.article.slug}')
+        self.buffer.record('indiranagar')
+        self.assertEqual(self.buffer.pending(), 4)
+
+        self.assertEqual(self.buffer.flush(), 4)
+
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(URLModel.objects.get(path=f'indiranagar/{self.article.slug}').visits, 3)
+        self.assertEqual(URLModel.objects.get(path='indiranagar').visits, 1)
+        self.assertEqual(VisitRollup.objects.get(article=self.article).visits, 3)
+        self.article.refresh_from_db()
+        self.area.refresh_from_db()
+        self.assertGreater(self.article.trending_score, 0)
+        self.assertGreater(self.area.trending_score, 0)
+
+    def test_second_flush_adds_to_existing_rows(self):
+        self.buffer.record('indiranagar')
+        self.buffer.flush()
+        self.buffer.record('indiranagar')
+        self.buffer.record('indiranagar')
+        self.buffer.flush()
+
+        self.assertEqual(URLModel.objects.get(path='indiranagar').visits, 3)
+        self.assertEqual(VisitRollup.objects.get(area=self.area, article__isnull=True).visits, 3)
+
+    def test_unknown_paths_are_dropped(self):
+        self.buffer.record('nowhere')
+        self.buffer.record('indiranagar/no-such-article')
+
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertFalse(URLModel.objects.exists())
+
+    def test_failed_flush_keeps_hits_for_the_next_one(self):
+        self.buffer.record('indiranagar')
+        self.buffer.record('indiranagar')
+        with mock.patch('news_app.visits.write_visits', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('news_app.visits', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(), 2)
+
+        # Hits recorded in between are merged with the ones put back
+        self.buffer.record('indiranagar')
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(URLModel.objects.get(path='indiranagar').visits, 3)
+
+    def test_empty_flush_writes_nothing(self):
+        with mock.patch('news_app.visits.write_visits', wraps=write_visits) as write:
+            self.assertEqual(self.buffer.flush(), 0)
+        write.assert_not_called()
@@ -0,0 +1,313 @@
+"""
+Trending areas and articles.
+
+The main leaderboards rank by `trending_score`, an exponentially decayed visit count
+kept on Article and Area. It uses forward decay: a hit at time t adds
+decay_weight(t) = 2 ** ((t - epoch) / half_life) to the stored score, so the
+score is updated in O(1) with a single F() increment when visits are
+flushed, and because every row is scaled by the same factor at read time
+the stored value orders rows exactly like the decayed one. "Top N" is then
+an indexed scan on trending_score.
+
+Windowed leaderboards ("most visited in the last hour / day / week", see
+WINDOWS) run over the VisitRollup table: unlike URLModel.visits, which are
+lifetime totals, rollup buckets answer them with an indexed range scan on
+the bucket column. They are part of the snapshot below, under `windows`,
+and served by /api/trending-articles/?window=.
+
+The weights double every half-life and would overflow a float after about
+1000 half-lives, so the epoch moves: once new hits would weigh more than
+2 ** REBASE_EXPONENT, current_epoch() sets it to now and multiplies every
+stored score by the same 2 ** -exponent, which keeps the ordering. The
+epoch lives in the TrendingEpoch row (TRENDING_SCORE_EPOCH is only the
+starting point) and is read in the same transaction as the increments.
+
+The landing page doesn't run these queries itself. A snapshot of the
+leaderboards is rebuilt on a fixed cadence (see the refresh_trending command)
+and stored in the cache and the TrendingSnapshot table; views only read it.
+"""
+import logging
+import math
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import Truncator
+
+from .models import Area, Article, TrendingEpoch, TrendingSnapshot, URLModel, VisitRollup
+from .utils import run_in_background
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_KEY = 'trending_snapshot'
+SNAPSHOTS_TO_KEEP = 24
+# Scores are rebased once a new hit weighs more than 2 ** REBASE_EXPONENT (~1.8e19),
+# far from the float limit of 2 ** 1024
+REBASE_EXPONENT = 64
+
+
+def _half_life_seconds():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24) * 3600
+
+
+def _initial_epoch():
+    return parse_datetime(getattr(settings, 'TRENDING_SCORE_EPOCH', '2026-01-01T00:00:00+00:00'))
+
+
+@checks.register()
+def check_trending_settings(app_configs, **kwargs):
+    errors = []
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+    if isinstance(half_life, bool) or not isinstance(half_life, (int, float)) or not half_life > 0:
+        errors.append(checks.Error(
+            f"TRENDING_HALF_LIFE_HOURS must be a positive number of hours, not {half_life!r}.",
+            id='news_app.E001',
+        ))
+    try:
+        epoch = _initial_epoch()
+    except (TypeError, ValueError):
+        epoch = None
+    if epoch is None or epoch.tzinfo is None:
+        errors.append(checks.Error(
+            "TRENDING_SCORE_EPOCH must be an ISO 8601 datetime with a UTC offset.",
+            id='news_app.E002',
+        ))
+    return errors
+
+
+def current_epoch(now=None):
+    """
+    The epoch stored scores are relative to. If new hits would weigh more
+    than 2 ** REBASE_EXPONENT, it is moved to `now` first and every score is
+    rescaled to match. Call it inside the transaction that adds hits.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        row = TrendingEpoch.objects.select_for_update().first()
+        if row is None:
+            row = TrendingEpoch.objects.create(epoch=_initial_epoch())
+        exponent = (now - row.epoch).total_seconds() / _half_life_seconds()
+        if exponent <= REBASE_EXPONENT:
+            return row.epoch
+        # Underflows to 0 after ~1075 half-lives, which is what those scores have decayed to anyway
+        factor = math.pow(2, -exponent)
+        articles = Article.objects.filter(trending_score__gt=0).update(trending_score=F('trending_score') * factor)
+        areas = Area.objects.filter(trending_score__gt=0).update(trending_score=F('trending_score') * factor)
+        row.epoch = now
+        row.save(update_fields=['epoch', 'updated_at'])
+    logger.info(f"Moved the trending score epoch to {now} ({articles} articles and {areas} areas rescaled)")
+    return now
+
+
+def decay_weight(when=None, epoch=None):
+    """Weight of a single hit at `when` (default: now) in stored trending scores."""
+    when = when or timezone.now()
+    epoch = epoch or current_epoch()
+    return math.pow(2, (when - epoch).total_seconds() / _half_life_seconds())
+
+
+def decayed_score(stored_score, at=None):
+    """Convert a stored trending_score to the decayed visit count as of `at`."""
+    return stored_score / decay_weight(at)
+
+
+def add_trending_hits(article_hits, area_hits, when=None):
+    """
+    Add hits to the decayed scores. `article_hits` and `area_hits` map ids to
+    hit counts; each row gets a single `score + hits * weight` update.
+    """
+    when = when or timezone.now()
+    with transaction.atomic():
+        # Read under the epoch row's lock, so a concurrent rebase can't rescale in between
+        weight = decay_weight(when, epoch=current_epoch(when))
+        for article_id, hits in article_hits.items():
+            Article.objects.filter(pk=article_id).update(trending_score=F('trending_score') + hits * weight)
+        for area_id, hits in area_hits.items():
+            Area.objects.filter(pk=area_id).update(trending_score=F('trending_score') + hits * weight)
+
+
+WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+
+def window_start(window):
+    """
+    Start of the window ending now, aligned to the hour so that the oldest
+    hourly bucket is counted in full.
+    """
+    if isinstance(window, str):
+        window = WINDOWS[window]
+    start = timezone.now() - window
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
+def top_areas(window, limit=8):
+    """
+    Areas ordered by area page visits within `window`, as a list of Area
+    objects annotated with `total_visits`.
+    """
+    rows = VisitRollup.objects.filter(
+        bucket__gte=window_start(window),
+        area__isnull=False,
+        article__isnull=True,  # Only count visits for area pages, not articles
+    ).values('area_id').annotate(
+        total=Sum('visits')
+    ).order_by('-total')[:limit]
+    return _with_totals(Area.objects.all(), rows, 'area_id')
+
+
+def top_articles(window, limit=6):
+    """
+    Articles ordered by visits within `window` (most recent first on ties),
+    as a list of Article objects annotated with `total_visits`.
+    """
+    rows = VisitRollup.objects.filter(
+        bucket__gte=window_start(window),
+        article__isnull=False,
+    ).values('article_id').annotate(
+        total=Sum('visits')
+    ).order_by('-total', '-article__created_at')[:limit]
+    return _with_totals(Article.objects.select_related('area'), rows, 'article_id')
+
+
+def _with_totals(queryset, rows, key):
+    rows = list(rows)
+    objects = queryset.in_bulk([row[key] for row in rows])
+    ranked = []
+    for row in rows:
+        obj = objects.get(row[key])
+        if obj is not None:
+            obj.total_visits = row['total']
+            ranked.append(obj)
+    return ranked
+
+
+def compute_trending(area_limit=8, article_limit=6):
+    """Run the leaderboard queries and return a JSON-serializable snapshot payload."""
+    # Top areas and articles by decayed score, each a single indexed scan
+    areas = list(Area.objects.filter(trending_score__gt=0).order_by('-trending_score')[:area_limit])
+    articles = list(
+        Article.objects.select_related('area').filter(trending_score__gt=0).order_by('-trending_score')[:article_limit]
+    )
+
+    # If no articles have been visited yet, use the most recent articles
+    if not articles:
+        articles = list(Article.objects.select_related('area').order_by('-created_at')[:article_limit])
+
+    # Lifetime visit counts are only needed for display, so fetch them for the winners alone
+    area_visits = dict(
+        URLModel.objects.filter(area__in=areas, article__isnull=True).values('area_id').annotate(
+            total=Sum('visits')
+        ).values_list('area_id', 'total')
+    )
+    article_visits = dict(
+        URLModel.objects.filter(article__in=articles).values('article_id').annotate(
+            total=Sum('visits')
+        ).values_list('article_id', 'total')
+    )
+    for article in articles:
+        article.total_visits = article_visits.get(article.pk, 0)
+    for area in areas:
+        area.total_visits = area_visits.get(area.pk, 0)
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'areas': [_area_payload(area) for area in areas],
+        'articles': [_article_payload(article) for article in articles],
+        # Visits within each window, from the hourly rollups
+        'windows': {
+            window: {
+                'areas': [_area_payload(area) for area in top_areas(window, limit=area_limit)],
+                'articles': [_article_payload(article) for article in top_articles(window, limit=article_limit)],
+            }
+            for window in WINDOWS
+        },
+    }
+
+
+def _area_payload(area):
+    return {'path': area.name, 'visits': area.total_visits or 0, 'name': area.name.title()}
+
+
+def _article_payload(article):
+    return {
+        'id': article.pk,
+        'title': article.title,
+        'slug': article.slug,
+        'category': article.category,
+        'cover_image': article.cover_image,
+        'content': Truncator(article.content).words(30),
+        'created_at': article.created_at.isoformat(),
+        'likes': article.likes,
+        'total_visits': getattr(article, 'total_visits', 0) or 0,
+        'area': {'name': article.area.name} if article.area else None,
+    }
+
+
+def refresh_trending_snapshot():
+    """Rebuild the leaderboards, store them in the database and the cache, and return them."""
+    # Keeps the epoch moving on quiet sites too, where visits don't flush often
+    current_epoch()
+    payload = compute_trending()
+    TrendingSnapshot.objects.create(payload=payload)
+    stale_ids = TrendingSnapshot.objects.values_list('id', flat=True)[SNAPSHOTS_TO_KEEP:]
+    TrendingSnapshot.objects.filter(id__in=list(stale_ids)).delete()
+    cache.set(SNAPSHOT_CACHE_KEY, payload, timeout=None)
+    logger.debug(f"Trending snapshot refreshed: {len(payload['areas'])} areas, {len(payload['articles'])} articles")
+    return payload
+
+
+_refresh_lock = threading.Lock()
+
+
+def _refresh_in_background():
+    """Stale-while-revalidate: rebuild the snapshot without holding up the request."""
+    run_in_background(_refresh_lock, refresh_trending_snapshot, 'trending-refresh')
+
+
+def get_trending_snapshot():
+    """
+    Return the latest trending snapshot with `created_at` values parsed back
+    to datetimes. Reads the cache first, then the most recent TrendingSnapshot
+    row; only builds one synchronously if none exists yet. A snapshot older
+    than TRENDING_STALE_AFTER seconds is still served, while a fresh one is
+    built in the background.
+    """
+    payload = cache.get(SNAPSHOT_CACHE_KEY)
+    if payload is None:
+        snapshot = TrendingSnapshot.objects.first()
+        if snapshot is not None:
+            payload = snapshot.payload
+            cache.set(SNAPSHOT_CACHE_KEY, payload, timeout=None)
+        else:
+            payload = refresh_trending_snapshot()
+
+    generated_at = parse_datetime(payload['generated_at'])
+    stale_after = getattr(settings, 'TRENDING_STALE_AFTER', 600)
+    if timezone.now() - generated_at > timedelta(seconds=stale_after):
+        logger.info(f"Trending snapshot from {generated_at} is stale, refreshing in the background")
+        _refresh_in_background()
+
+    return {
+        'generated_at': generated_at,
+        'areas': payload['areas'],
+        'articles': _parse_articles(payload['articles']),
+        # Snapshots written before windows were added have none until the next refresh
+        'windows': {
+            window: {'areas': board['areas'], 'articles': _parse_articles(board['articles'])}
+            for window, board in payload.get('windows', {}).items()
+        },
+    }
+
+
+def _parse_articles(articles):
+    return [{**article, 'created_at': parse_datetime(article['created_at'])} for article in articles]
@@ -6,10 +6,13 @@ urlpatterns = [
     path('post/new/', views.post_create, name='post-create'),
     path('advertisement/new/', views.advertisement_create, name='advertisement-create'),
     path('generate-news/', views.generate_news, name='generate_news'), # type: ignore
+    path('api/generation-jobs/<int:job_id>/', views.generation_job_status, name='generation_job_status'),
     path('autocomplete/area/', views.autocomplete_area, name='autocomplete_area'),
     path('all-articles/', views.all_articles_view, name='all-articles-view'),
     path('api/trending-articles/', views.trending_articles, name='trending_articles'),
+    path('api/search/', views.search_articles_api, name='search_articles'),
     path('api/nearby-areas/', views.nearby_areas, name='nearby_areas'),
+    path('api/nearby-areas/batch/', views.nearby_areas_batch, name='nearby_areas_batch'),
     path('api/article/<int:article_id>/like/', views.like_article, name='like_article'),
     path('api/notifications/subscribe/', views.subscribe_notifications, name='subscribe_notifications'),
     path('api/notifications/unsubscribe/', views.unsubscribe_notifications, name='unsubscribe_notifications'),
@@ -0,0 +1,64 @@
+import logging
+import re
+import threading
+
+from django.db import close_old_connections
+from django.db.models import Count, Sum
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_area_name(name: str | None) -> str:
+    """Converts to lowercase, strips whitespace, and collapses internal spaces."""
+    if not name:
+        return ""
+    name = name.lower().strip()
+    name = re.sub(r'\s+', ' ', name) # Replace multiple spaces with single space
+    return name
+
+
+def run_in_background(lock, fn, name):
+    """
+    Run fn() in a daemon thread named `name`, unless `lock` is held because
+    a run is already going. The thread releases the lock and its database
+    connections when done. Returns whether a run was started.
+    """
+    if not lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            logger.exception(f"Background {name} failed: {e}")
+        finally:
+            close_old_connections()
+            lock.release()
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return True
+
+
+def evict_least_recently_used(queryset, max_entries=None, max_bytes=None, batch_size=500):
+    """
+    Delete rows of a cache table (with `last_used_at` and `size_bytes`
+    columns), least recently used first, until at most `max_entries` remain
+    and their sizes add up to at most `max_bytes`. A limit of None isn't
+    enforced. Returns how many rows were deleted.
+    """
+    totals = queryset.aggregate(entries=Count('pk'), size=Sum('size_bytes'))
+    excess_entries = totals['entries'] - max_entries if max_entries is not None else 0
+    excess_bytes = (totals['size'] or 0) - max_bytes if max_bytes is not None else 0
+    victims = []
+    coldest = queryset.order_by('last_used_at', 'pk').values_list('pk', 'size_bytes')
+    for pk, size_bytes in coldest.iterator(chunk_size=batch_size):
+        if excess_entries <= 0 and excess_bytes <= 0:
+            break
+        victims.append(pk)
+        excess_entries -= 1
+        excess_bytes -= size_bytes
+    deleted = 0
+    for start in range(0, len(victims), batch_size):
+        count, _ = queryset.model.objects.filter(pk__in=victims[start:start + batch_size]).delete()
+        deleted += count
+    return deleted
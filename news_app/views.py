@@ -1,15 +1,25 @@
+import math
 import time
 from unicodedata import category
 from .forms import PostForm, AdvertisementForm
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
 from django.core.files.storage import default_storage
-from .models import Article, Post, questions, URLModel, Area, Advertisement, NotificationSubscription
+from .models import Article, Post, URLModel, Area, Advertisement, NotificationSubscription, GenerationJob, GenerationEvent
+from .area_search import area_autocomplete, candidate_areas
+from .trending import WINDOWS, get_trending_snapshot
+from .utils import normalize_area_name
+from .resolver import resolve_area_id, resolve_article_id
+from .article_search import search_articles
+from .geo import area_points, nearest_areas
+from .geocode_queue import enqueue_geocode
+from .jobs import enqueue_generation
+from . import cover_image_cache, llm, llm_cache
 from django.conf import settings
 import google.generativeai as genai
 import requests
 import json
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.db.models import Count, Q, Sum, F
 from django.urls import resolve
 from django.utils import timezone
@@ -26,6 +36,7 @@ from django.core.cache import cache # Import Django's cache
 import logging
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_cache_control
 import json
 from dotenv import load_dotenv
 
@@ -42,39 +53,6 @@ STOP_WORDS = set([
     "they", "this", "to", "was", "will", "with", "over", "post-oc" # Added 'over' and 'post-oc' based on example
 ])
 
-def geocode_area(area_name):
-    """
-    Geocodes an area name using the Nominatim API.
-    """
-    if not area_name:
-        return None, None
-
-    logger.info(f"Geocoding area: {area_name}")
-    url = f"https://nominatim.openstreetmap.org/search?q={urllib.parse.quote(area_name)}&format=json&limit=1"
-    try:
-        response = requests.get(url, headers={'User-Agent': 'Gemini-CLI-Agent/1.0'})
-        response.raise_for_status()
-        data = response.json()
-        if data:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            logger.info(f"Successfully geocoded {area_name}: ({lat}, {lon})")
-            return lat, lon
-        else:
-            logger.warning(f"Could not find coordinates for {area_name}")
-            return None, None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error geocoding {area_name}: {e}")
-        return None, None
-
-def normalize_area_name(name: str | None) -> str:
-    """Converts to lowercase, strips whitespace, and collapses internal spaces."""
-    if not name:
-        return ""
-    name = name.lower().strip()
-    name = re.sub(r'\s+', ' ', name) # Replace multiple spaces with single space
-    return name
-
 def find_similar_area(input_name: str | None) -> dict | None:
     """Find the most similar area name in the database using string similarity."""
     if not input_name:
@@ -86,14 +64,14 @@ def find_similar_area(input_name: str | None) -> dict | None:
         return None  # No correction needed if exact match
     except Area.DoesNotExist:
         pass
-    # If no exact match, find similar areas
-    all_areas = Area.objects.all()
+    # If no exact match, score only the areas that share trigrams with the input
+    candidates = candidate_areas(normalized_input)
     best_match = None
     highest_ratio = 0.0
     # Lower similarity thresholds
     high_confidence_threshold = 0.7
     suggestion_threshold = 0.4
-    for area in all_areas:
+    for area in candidates:
         similarity_ratio = SequenceMatcher(None, normalized_input, area.name).ratio()
         if similarity_ratio > highest_ratio and similarity_ratio >= suggestion_threshold:
             highest_ratio = similarity_ratio
@@ -108,79 +86,162 @@ def find_similar_area(input_name: str | None) -> dict | None:
         # No good match found
         return None
 
-def run_gemini(text, area_name, max_retries=3, retry_delay=2):
+GEMINI_MODEL = llm.DEFAULT_MODEL
+# Bump when the article prompt or schema changes, so cached responses to the old one aren't reused
+ARTICLE_PROMPT_VERSION = '2'
+
+ARTICLES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "articles": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "content": {"type": "string"},
+                    "category": {"type": "string"},
+                    "image_keywords": {"type": "string"},
+                    "reporter_name": {"type": "string"}
+                },
+                "required": ["title", "content"]
+            }
+        }
+    },
+    "required": ["articles"]
+}
+
+
+def run_gemini(text, area_name, max_retries=3, limiter=None, digest=''):
     """
     Generate articles using Gemini API with retry logic for error recovery.
+    Returns the list of articles ([] on failure, or the ones that came in
+    before the stream broke); see stream_articles.
     """
-    attempt = 0
-    while attempt < max_retries:
-        try:
-            schema = {
+    articles = []
+    try:
+        for article in stream_articles(text, area_name, max_retries=max_retries, limiter=limiter, digest=digest):
+            articles.append(article)
+    except llm.LLMError:
+        pass  # Already logged; keep what arrived
+    return articles
+
+
+def stream_articles(text, area_name, max_retries=3, limiter=None, digest=''):
+    """
+    Generate articles with Gemini, yielding each one as soon as the streamed
+    response has it. Responses are cached by model, prompt version, area,
+    digest and comments text, so retries and reruns over the same comments
+    don't call Gemini again. limiter: a ratelimit.TokenBucket to take a
+    token from before each request. digest: the area's already published
+    stories (area_digest.prompt_text), so they aren't written again.
+
+    If nothing could be generated this yields nothing. If the stream breaks
+    after some articles were yielded, llm.LLMError is raised so the caller
+    knows the answer is partial (and it isn't cached).
+    """
+    key = llm_cache.cache_key(GEMINI_MODEL, ARTICLE_PROMPT_VERSION, area_name, f"{digest}\n{text}" if digest else text)
+    cached = llm_cache.get_cached_response(key)
+    if cached is not None:
+        logger.info(f"Using cached Gemini response for {area_name} ({len(cached)} articles)")
+        yield from cached
+        return
+
+    started = time.monotonic()
+    prompt = f"Based on the diverse comments collected from individuals in the area of {area_name}, please create a series of long engaging news articles. For each article, provide a title, content, category, image_keywords, and a reporter_name. The reporter_name should be credited to the individual if their name is provided, or use a general credit like 'A Community Report' if names are mixed or anonymous. Ensure article titles prominently feature the area name: '{area_name}'. Here are the comments: {text}"
+    if digest:
+        prompt += f"\n\nThese stories have already been published for {area_name}. Don't write them again; only cover something from them if the comments add new facts, and then say what's new:\n{digest}"
+    articles = []
+    try:
+        for article in llm.stream_json_items(prompt, ARTICLES_SCHEMA, GEMINI_MODEL, max_attempts=max_retries,
+                                             limiter=limiter, name='run_gemini'):
+            articles.append(article)
+            yield article
+    except llm.LLMError as e:
+        if articles:
+            logger.error(f"run_gemini broke off after {len(articles)} articles: {e}")
+            raise
+        logger.error(f"run_gemini failed: {e}")
+        return
+    if articles:
+        # Empty answers aren't cached, so a retry gets a fresh attempt
+        llm_cache.store_response(key, articles, GEMINI_MODEL, ARTICLE_PROMPT_VERSION, area_name,
+                                 generation_seconds=time.monotonic() - started)
+
+# Bump when the summary prompt or schema changes
+SUMMARY_PROMPT_VERSION = '1'
+
+NOTES_SCHEMA = {
+    "type": "object",
+    "properties": {"notes": {"type": "array", "items": {"type": "string"}}},
+    "required": ["notes"]
+}
+
+
+def summarize_comments(text, area_name, max_retries=3, limiter=None):
+    """
+    Condense one chunk of comments into short factual notes, the map step
+    of generation.generate_articles for big backlogs. Returns a list of
+    note strings ([] on failure). Cached like run_gemini.
+    """
+    key = llm_cache.cache_key(GEMINI_MODEL, f"summary-{SUMMARY_PROMPT_VERSION}", area_name, text)
+    cached = llm_cache.get_cached_response(key)
+    if cached is not None:
+        return cached
+
+    started = time.monotonic()
+    prompt = f"The following comments were posted by people in {area_name}. Summarize them as a list of short factual notes, one per distinct event, issue or opinion, keeping names, places, numbers and dates. Where a comment credits a person, end its note with ' - ' and their name. Here are the comments: {text}"
+    try:
+        parsed_data = llm.generate_json(prompt, NOTES_SCHEMA, GEMINI_MODEL, max_attempts=max_retries,
+                                        limiter=limiter, name='summarize_comments')
+    except llm.LLMError as e:
+        logger.error(f"summarize_comments failed: {e}")
+        return []
+    notes = parsed_data.get('notes') or []
+    if notes:
+        llm_cache.store_response(key, notes, GEMINI_MODEL, f"summary-{SUMMARY_PROMPT_VERSION}", area_name,
+                                 generation_seconds=time.monotonic() - started)
+    return notes
+
+QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "articles": {
+            "type": "array",
+            "items": {
                 "type": "object",
                 "properties": {
-                    "articles": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "title": {"type": "string"},
-                                "content": {"type": "string"},
-                                "category": {"type": "string"},
-                                "image_keywords": {"type": "string"},
-                                "reporter_name": {"type": "string"}
-                            },
-                            "required": ["title", "content"]
-                        }
-                    }
+                    "id": {"type": "integer"},
+                    "questions": {"type": "array", "items": {"type": "string"}}
                 },
-                "required": ["articles"]
+                "required": ["id", "questions"]
             }
-
-            model = genai.GenerativeModel( # type: ignore
-                'gemini-2.5-flash',
-                generation_config={"response_mime_type": "application/json",
-                                   "response_schema": schema}
-            )
-
-            prompt = f"Based on the diverse comments collected from individuals in the area of {area_name}, please create a series of long engaging news articles. For each article, provide a title, content, category, image_keywords, and a reporter_name. The reporter_name should be credited to the individual if their name is provided, or use a general credit like 'A Community Report' if names are mixed or anonymous. Ensure article titles prominently feature the area name: '{area_name}'. Here are the comments: {text}"
-            response = model.generate_content(prompt)
-            parsed_data = json.loads(response.text)
-            return parsed_data['articles']
-        except Exception as e:
-            logger.exception(f"Error in run_gemini (attempt {attempt+1}/{max_retries}): {e}")
-            attempt += 1
-            if attempt < max_retries:
-                time.sleep(retry_delay)
-    logger.error(f"run_gemini failed after {max_retries} attempts.")
-    return []
-
-def generate_article_qs(article):
-    try:
-        schema = {
-            "type": "object",
-            "properties": {
-                "questions": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    }
-                }
-            },
-            "required": ["questions"]
         }
+    },
+    "required": ["articles"]
+}
 
-        model = genai.GenerativeModel( # type: ignore
-            'gemini-2.5-flash',
-            generation_config={"response_mime_type": "application/json",
-                               "response_schema": schema}
-        )
 
-        response = model.generate_content(f"As an AI tasked with enhancing community engagement, please generate 3  insightful very short questions ( under 10 words) based on the following article. These questions should encourage readers to share their own experiences or provide additional comments that could enrich the article: Title: {article.title}. Content: {article.content}")
-        parsed_data = json.loads(response.text)
-        return parsed_data['questions']
-    except Exception as e:
-        logger.exception(f"Error in generate_article_qs: {e}")
-        return []
+def generate_article_qs(articles, limiter=None, max_retries=2):
+    """
+    Generate engagement questions for several articles in one Gemini call.
+    Returns {article id: [question, ...]}; articles the model skipped are
+    missing from it, and it is empty if every attempt failed.
+    """
+    # Long articles are cut short; the opening is enough to ask about
+    listing = "\n\n".join(f"Article {article.pk}: Title: {article.title}. Content: {article.content[:2000]}" for article in articles)
+    prompt = f"As an AI tasked with enhancing community engagement, please generate 3  insightful very short questions ( under 10 words) for each of the following articles. These questions should encourage readers to share their own experiences or provide additional comments that could enrich the article. Answer with the article's number as its id.\n\n{listing}"
+    try:
+        parsed_data = llm.generate_json(prompt, QUESTIONS_SCHEMA, GEMINI_MODEL, max_attempts=max_retries,
+                                        limiter=limiter, name='generate_article_qs')
+    except llm.LLMError as e:
+        logger.error(f"generate_article_qs failed: {e}")
+        return {}
+    wanted = {article.pk for article in articles}
+    return {
+        item['id']: [question for question in item.get('questions', []) if question][:3]
+        for item in parsed_data.get('articles', []) if item.get('id') in wanted
+    }
 
 def fetch_cover_image(query, category=None):
     """
@@ -188,6 +249,17 @@ def fetch_cover_image(query, category=None):
     Filters stop words from the query for better relevance.
     Uses caching to avoid repeated API calls for the same query.
     """
+    simplified_query = cover_image_query(query, category)
+    if not simplified_query:
+        return None
+    return search_cover_image(simplified_query)
+
+def cover_image_query(query, category=None):
+    """
+    The Unsplash search for an article's image keywords (or title) and
+    category: up to five non-stop-words plus the category. None for an
+    empty query.
+    """
     if not query:
         logger.error("Error: Empty query passed to fetch_cover_image.")
         return None
@@ -214,18 +286,23 @@ def fetch_cover_image(query, category=None):
     else:
         simplified_query = " ".join(keywords)
         logger.info(f"Original query: '{query}', Category: '{category}', Keywords for search: '{simplified_query}'")
+    return simplified_query
 
-    # Create a cache key based on the simplified query
-    cache_key = f"cover_image_cache_{urllib.parse.quote(simplified_query)}"
-    cached_image_url = cache.get(cache_key)
-
-    if cached_image_url:
+def search_cover_image(simplified_query, session=None):
+    """
+    Search Unsplash for `simplified_query` (see cover_image_query) and
+    return the first image's URL, or None. session: a requests.Session to
+    reuse connections across many searches.
+    """
+    # Shared by all workers and kept across restarts, see cover_image_cache
+    cached, cached_image_url = cover_image_cache.lookup(simplified_query)
+    if cached:
         logger.info(f"  Returning cached image for '{simplified_query}': {cached_image_url}")
         return cached_image_url
 
     logger.info(f"  No cache hit for '{simplified_query}'. Fetching from API.")
     try:
-        url = f"https://api.unsplash.com/search/photos"
+        url = getattr(settings, 'UNSPLASH_SEARCH_URL', "https://api.unsplash.com/search/photos")
         client_id = os.environ.get("UNSPLASH_ACCESS_KEY", "LSOUqV2JJVVQMYMapOqQdsMKkC1_Nrmu0w45m5NHpQc") # Use your actual key or env var
         params = {
             "query": simplified_query, # Use the keyword-based query
@@ -233,27 +310,28 @@ def fetch_cover_image(query, category=None):
             "per_page": 1,
             "orientation": "landscape"
         }
-        response = requests.get(url, params=params)
+        response = (session or requests).get(url, params=params, timeout=getattr(settings, 'UNSPLASH_TIMEOUT', 10))
         response.raise_for_status()
         data = response.json()
+        image_url = None
         if data.get("results"):
             image_url = data["results"][0].get("urls", {}).get("regular")
             if image_url:
                 logger.info(f"  Successfully fetched image: {image_url}")
-                # Cache the result for 24 hours (86400 seconds)
-                cache.set(cache_key, image_url, timeout=86400)
-                return image_url
             else:
                 logger.info("  No regular URL found in the first image result.")
         else:
             logger.info(f"  No image results found for query: '{simplified_query}'")
+        # "Nothing found" is cached too, for COVER_IMAGE_NEGATIVE_TTL_HOURS
+        cover_image_cache.store(simplified_query, image_url)
+        return image_url
     except requests.exceptions.RequestException as e:
         logger.error(f"  Error fetching image from Unsplash: {e}")
     except Exception as e:
         logger.exception(f"  An unexpected error occurred: {e}")
 
-    # Cache a None result for a shorter period (e.g., 1 hour) to avoid hammering API for non-existent images
-    cache.set(cache_key, None, timeout=3600)
+    # Failures aren't stored, but this process leaves the query alone for a few minutes to avoid hammering the API
+    cover_image_cache.remember_failure(simplified_query)
     return None # Return None if anything goes wrong or no image is found
 
 def init_view(request):
@@ -272,10 +350,7 @@ def init_view(request):
         if skip_correction:
             area, created = Area.objects.get_or_create(name=area_name)
             if created:
-                lat, lon = geocode_area(area_name)
-                area.latitude = lat
-                area.longitude = lon
-                area.save()
+                enqueue_geocode(area) # Geocoded in the background, see geocode_queue
             logger.info(f"Skip correction. Area: '{area.name}', Created: {created}")
             # Clear any correction session variables if user explicitly searched
             request.session.pop('auto_corrected', None)
@@ -314,21 +389,14 @@ def init_view(request):
                     # This ensures the user lands on the page they typed, with a suggestion.
                     area, created = Area.objects.get_or_create(name=area_name) 
                     if created:
-                        lat, lon = geocode_area(area_name)
-                        area.latitude = lat
-                        area.longitude = lon
-                        area.save()
+                        enqueue_geocode(area) # Geocoded in the background, see geocode_queue
                     logger.info(f"Low confidence. User searched for '{area_name}' (created: {created}), suggesting '{similar_area_obj.name}'.")
                     return redirect(f'/{area_name}/')
             else:
                 # No exact match, no similar area found. Create the new area.
-                lat, lon = geocode_area(area_name)
-                area = Area.objects.create(
-                    name=area_name,
-                    latitude=lat,
-                    longitude=lon,
-                )
-                logger.info(f"No match, no suggestion. Creating new area: '{area.name}' with coordinates: ({lat}, {lon})")
+                area = Area.objects.create(name=area_name)
+                enqueue_geocode(area) # Geocoded in the background, see geocode_queue
+                logger.info(f"No match, no suggestion. Creating new area: '{area.name}', queued for geocoding")
                 # Clear any correction session variables
                 request.session.pop('auto_corrected', None)
                 request.session.pop('suggestion_only', None)
@@ -336,76 +404,14 @@ def init_view(request):
                 request.session.pop('corrected_query', None)
                 return redirect(f'/{area_name}/')
    
-    # Get the top areas based on the SUM of visits of their associated non-article URLModels
-    top_areas = Area.objects.annotate(
-        total_visits=Sum(
-            'urlmodel__visits', 
-            filter=Q(urlmodel__article__isnull=True) # Only count visits for area pages, not articles
-        )
-    ).filter(
-        total_visits__isnull=False # Ensure the area has associated page visits
-    ).order_by('-total_visits')[:8] # Get top 8 areas by summed visits
-    
-    trending_pages_data = []
-    for area_obj in top_areas:
-        trending_pages_data.append({
-            'path': area_obj.name,
-            'visits': area_obj.total_visits, # type: ignore
-            'name': area_obj.name.title()
-        })
-    
-    # Debug print (can be removed or kept for monitoring)
-    logger.info(f"Found {len(trending_pages_data)} trending areas (aggregated)")
-    for p in trending_pages_data:
-        logger.info(f"Area: {p['name']}, Path: {p['path']}, Total Visits: {p['visits']}")
-    
-    # Get trending articles based on views, prioritizing recent articles
-    one_week_ago = timezone.now() - timedelta(days=7)
-    
-    # First, try to get trending articles from the last week
-    recent_trending = Article.objects.filter(
-        created_at__gte=one_week_ago
-    ).annotate(
-        total_visits=Sum('urlmodel__visits')
-    ).filter(
-        total_visits__isnull=False,
-        total_visits__gt=0
-    ).order_by('-total_visits', '-created_at')[:6]
-    
-    # If we don't have enough recent trending articles, get the most viewed articles overall
-    if len(recent_trending) < 6:
-        # Get all articles with visits, excluding the ones we already have
-        recent_trending_ids = [article.pk for article in recent_trending]
-        
-        additional_articles = Article.objects.annotate(
-            total_visits=Sum('urlmodel__visits')
-        ).filter(
-            total_visits__isnull=False,
-            total_visits__gt=0
-        ).exclude(
-            pk__in=recent_trending_ids
-        ).order_by('-total_visits', '-created_at')[:6-len(recent_trending)]
-        
-        # Combine the lists
-        trending_articles = list(recent_trending) + list(additional_articles)
-    else:
-        trending_articles = list(recent_trending)
-    
-    # If still no articles with visits, get the most recent articles
-    if not trending_articles:
-        trending_articles = list(Article.objects.all().order_by('-created_at')[:6])
-    
-    # Debug logging for trending articles
-    logger.info(f"Found {len(trending_articles)} trending articles from the last week")
-    for i, article in enumerate(trending_articles[:5], 1):  # Log first 5
-        visits = getattr(article, 'total_visits', 0) or 0
-        logger.info(f"  {i}. '{article.title[:50]}...' - {visits} visits")
-    
+    # Trending areas and articles come from the precomputed snapshot
+    trending = get_trending_snapshot()
+
     recently_visited = request.session.get('recently_visited', [])
 
     context = {
-        'trending_pages': trending_pages_data,
-        'trending_articles': trending_articles,
+        'trending_pages': trending['areas'],
+        'trending_articles': trending['articles'],
         'recently_visited': recently_visited,
     }
     return render(request, 'init.html', context)
@@ -416,10 +422,11 @@ def autocomplete_area(request):
     if 'term' in request.GET:
         # Normalize the search term
         term = normalize_area_name(request.GET.get('term'))
-        qs = Area.objects.filter(name__icontains=term)
-        # Keep capitalization for display purposes if needed, but filtering is case-insensitive now
-        area_names = list(set(area.name.title() for area in qs)) # Use title() for display
-        return JsonResponse(area_names, safe=False)
+        # Served from the in-memory prefix index, capped and ranked by popularity
+        area_names = [name.title() for name in area_autocomplete.search(term)] # Use title() for display
+        response = JsonResponse(area_names, safe=False)
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'AUTOCOMPLETE_CACHE_SECONDS', 300))
+        return response
     return JsonResponse([], safe=False)
 
 def all_articles_view(request):
@@ -430,33 +437,37 @@ def all_articles_view(request):
     }
     return render(request, 'all_articles.html', context)
 
+def get_area_or_404(area_name):
+    """Look up an area by (normalized) name through the shared route cache."""
+    area_id = resolve_area_id(area_name)
+    if area_id is None:
+        raise Http404(f"Area '{area_name}' not found.")
+    return get_object_or_404(Area, pk=area_id)
+
 def article_detail_by_slug(request, area_name, article_slug):
     # Normalize area name from URL
     normalized_area_name = normalize_area_name(area_name)
-    area = get_object_or_404(Area, name=normalized_area_name)
-    # Use the original area_name (or normalized) for context/display if needed
-    # Keeping original for potential display differences, but using normalized for lookup
-    article = get_object_or_404(Article, slug=article_slug, area=area)
-    
-    # Check if questions already exist for the article
-    if not questions.objects.filter(article=article).exists():
-        questions_data = generate_article_qs(article)
-        for question in questions_data:
-            questions.objects.create(
-                question=question,
-                article=article
-            )
+    # The route cache maps (area, slug) straight to the article id, and the
+    # area comes along with the article in a single query
+    article_id = resolve_article_id(normalized_area_name, article_slug)
+    if article_id is None:
+        raise Http404("Article not found.")
+    # Questions are generated along with the article (see article_questions), never here
+    article = get_object_or_404(
+        Article.objects.select_related('area').prefetch_related('questions_set'), pk=article_id
+    )
+    area = article.area
 
     context = {
         'article': article,
         'area': area,
-        'questions': questions.objects.filter(article=article),
+        'questions': article.questions_set.all(), # type: ignore
     }
     return render(request, 'article_detail.html', context)
 
 # Keep the old view for backwards compatibility if needed
 def article_detail(request, article_id):
-    article = get_object_or_404(Article, pk=article_id)
+    article = get_object_or_404(Article.objects.prefetch_related('questions_set'), pk=article_id)
     # Find the area associated with this article using the ForeignKey
     # The relationship is now direct: article.area
     area = article.area
@@ -466,17 +477,9 @@ def article_detail(request, article_id):
         return redirect('article_detail_by_slug', area_name=area.name, article_slug=article.slug)
     
     # If no area is found, fall back to the original view
-    if not questions.objects.filter(article=article).exists():
-        questions_data = generate_article_qs(article)
-        for question in questions_data:
-            questions.objects.create(
-                question=question,
-                article=article
-            )
-
     context = {
         'article': article,
-        'questions': questions.objects.filter(article=article),
+        'questions': article.questions_set.all(), # type: ignore
     }
     return render(request, 'article_detail.html', context)
 
@@ -503,10 +506,7 @@ def post_create(request):
             # Just proceed with creating/getting the area
             area, created = Area.objects.get_or_create(name=area_name)
             if created:
-                lat, lon = geocode_area(area_name)
-                area.latitude = lat
-                area.longitude = lon
-                area.save()
+                enqueue_geocode(area) # Geocoded in the background, see geocode_queue
             # Manually create post if content is valid
             if content:
                 # Assign the Area object directly to the ForeignKey
@@ -527,10 +527,7 @@ def post_create(request):
             # Get the Area object
             area, created = Area.objects.get_or_create(name=area_name)
             if created:
-                lat, lon = geocode_area(area_name)
-                area.latitude = lat
-                area.longitude = lon
-                area.save()
+                enqueue_geocode(area) # Geocoded in the background, see geocode_queue
             # Assign the Area object directly to the ForeignKey
             post.area = area
             post.save() # Save the post with the associated area
@@ -550,38 +547,27 @@ def post_create(request):
 
     return render(request, 'post_form.html', {'form': form})
 
-def categorize_advertisement(content, max_retries=3, retry_delay=2):
+CATEGORY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string"}
+    },
+    "required": ["category"]
+}
+
+
+def categorize_advertisement(content, max_retries=3):
     """
     Categorize advertisement using Gemini API with retry logic.
     """
-    attempt = 0
-    while attempt < max_retries:
-        try:
-            schema = {
-                "type": "object",
-                "properties": {
-                    "category": {"type": "string"}
-                },
-                "required": ["category"]
-            }
-
-            model = genai.GenerativeModel(
-                'gemini-2.0-flash',
-                generation_config={"response_mime_type": "application/json",
-                                   "response_schema": schema}
-            )
-
-            prompt = f"Categorize this advertisement into the most appropriate single category. Advertisement content: {content}"
-            response = model.generate_content(prompt)
-            parsed_data = json.loads(response.text)
-            return parsed_data['category']
-        except Exception as e:
-            logger.exception(f"Error in categorize_advertisement (attempt {attempt+1}/{max_retries}): {e}")
-            attempt += 1
-            if attempt < max_retries:
-                time.sleep(retry_delay)
-    logger.error(f"categorize_advertisement failed after {max_retries} attempts.")
-    return "general"
+    prompt = f"Categorize this advertisement into the most appropriate single category. Advertisement content: {content}"
+    try:
+        parsed_data = llm.generate_json(prompt, CATEGORY_SCHEMA, 'gemini-2.0-flash', max_attempts=max_retries,
+                                        name='categorize_advertisement')
+    except llm.LLMError as e:
+        logger.error(f"categorize_advertisement failed: {e}")
+        return "general"
+    return parsed_data.get('category') or "general"
 
 def advertisement_create(request):
     if request.method == 'POST':
@@ -637,7 +623,7 @@ def advertisement_create(request):
 
 def advertisements_by_category(request, area_name, category):
     normalized_area_name = normalize_area_name(area_name)
-    area = get_object_or_404(Area, name=normalized_area_name)
+    area = get_area_or_404(normalized_area_name)
     advertisements = Advertisement.objects.filter(area=area, category=category).order_by('-created_at')
     
     context = {
@@ -705,94 +691,64 @@ def generate_news(request):
             area = Area.objects.get(name=area_name)
         except Area.DoesNotExist:
              messages.error(request, f"Area '{request.POST.get('area')}' not found.") # Show original input in message
-             # Optionally create it here if desired:
-             # area, _ = Area.objects.get_or_create(name=area_name)
              return redirect(request.META.get('HTTP_REFERER', '/'))
 
-        logger.info(f"Generating news for area: {area_name}")
-        last_gen_time = area.last_generated_at
-        logger.info(f"Last generation time for {area_name}: {last_gen_time}")
-
-        # Get content of NEW posts since the last generation
-        new_posts = get_posts_content_by_area(area_name, since=last_gen_time)
-
-        if not new_posts:
-            logger.info(f"No new comments found for {area_name} since {last_gen_time}. No articles generated.")
-            messages.info(request, f"No new comments found for '{area.name.title()}'. News is up to date.")
-            return redirect(f'/{area_name}/') # Redirect to the area page
-
-        # Construct comments string including reporter names
-        comments_list = []
-        for post in new_posts:
-            if post.reporter_name:
-                comments_list.append(f'"{post.content}" - {post.reporter_name}')
-            else:
-                comments_list.append(f'"{post.content}"')
-        
-        new_comments_text = " ".join(comments_list)
-
-
-        logger.info(f"Found new comments for {area_name}. Sending to LLM...")
-        # Generate articles ONLY from the new comments
-        # Consider adjusting the run_gemini prompt if you want it to be aware
-        # that these are *new* comments, e.g., ask it to generate updates or new topics.
-        articles_data = run_gemini(new_comments_text, area_name)
-
-        logger.info(f"LLM generated {len(articles_data)} new articles")
-
-        if not articles_data:
-             logger.warning("LLM did not return any articles after retries.")
-             messages.warning(request, "Could not generate new articles from the latest comments. Please try again later.")
-             # Do NOT update last_generated_at here, so the user can retry
-             return redirect(f'/{area_name}/')
-
-        newly_created_count = 0
-        for article_data in articles_data:
-            title = article_data.get('title')
-            content = article_data.get('content')
-            reporter_name = article_data.get('reporter_name')
-
-            if not title or not content:
-                logger.warning("Skipping article data with missing title or content.")
-                continue
-
-            # Fetch cover image using image keywords if available, otherwise use title
-            category = article_data.get('category', 'news')
-            image_keywords = article_data.get('image_keywords')
-            # Use image keywords if available, otherwise fall back to title
-            search_query = image_keywords if image_keywords else title
-            logger.info(f"Using image search query: '{search_query}' (from keywords: {image_keywords is not None}) for article: '{title}'")
-            cover_image_url = fetch_cover_image(search_query, category)
-
-            try:
-                article = Article.objects.create(
-                    title=title,
-                    content=content,
-                    category=category,
-                    cover_image=cover_image_url,
-                    reporter_name=reporter_name,
-                    # Assign the Area object directly during creation
-                    area=area
-                )
-                # No longer need area.articles.add(article)
-                newly_created_count += 1
-                # Use article.pk instead of article.id to satisfy linter
-                logger.info(f"Created article: {article.title} (PK: {article.pk}) for Area: {area.name}")
-            except Exception as e:
-                 logger.exception(f"Error creating article '{title}': {e}")
+        # Generation runs in the background; the area page polls the job status
+        job, created = enqueue_generation(area)
+        logger.info(f"Generation job {job.pk} for {area_name} ({'queued' if created else 'already ' + job.status})")
 
-        if newly_created_count > 0:
-            # Update the last generated timestamp for the area AFTER processing
-            area.last_generated_at = timezone.now()
-            area.save(update_fields=['last_generated_at'])
-            logger.info(f"Updated last_generated_at for {area_name} to {area.last_generated_at}")
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse(generation_job_data(job), status=202)
 
-        messages.success(request, f"Successfully generated {newly_created_count} new articles for '{area.name.title()}'.")
+        messages.info(request, f"Generating fresh news for '{area.name.title()}'. This page will update when it's ready.")
         return redirect(f'/{area_name}/')
 
     # Handle GET request (optional, maybe redirect or show a form)
     return redirect('/') # Or wherever appropriate for a GET request
 
+def generation_job_data(job):
+    return {
+        'id': job.pk,
+        'area': job.area.name,
+        'status': job.status,
+        'articles_created': job.articles_created,
+        'message': job.message,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'first_article_at': job.first_article_at.isoformat() if job.first_article_at else None,
+        'time_to_first_article': (
+            (job.first_article_at - job.started_at).total_seconds()
+            if job.first_article_at and job.started_at else None
+        ),
+        'status_url': f"/api/generation-jobs/{job.pk}/",
+    }
+
+def generation_job_status(request, job_id):
+    """
+    API endpoint the area page polls while news is being generated.
+    Pass ?last_event_id= to get the job's progress events (started, one per
+    saved article, done/failed) newer than that one; answer's
+    last_event_id is what to send next time.
+    """
+    job = get_object_or_404(GenerationJob.objects.select_related('area'), pk=job_id)
+    try:
+        last_event_id = max(0, int(request.GET.get('last_event_id') or 0))
+    except ValueError:
+        return JsonResponse({'error': 'last_event_id must be an integer'}, status=400)
+    data = generation_job_data(job)
+    if job.status == GenerationJob.QUEUED:
+        data['queue_position'] = GenerationJob.objects.filter(
+            status=GenerationJob.QUEUED, created_at__lt=job.created_at
+        ).count() + 1
+    page_size = getattr(settings, 'GENERATION_EVENTS_PAGE_SIZE', 100)
+    events = GenerationEvent.objects.filter(job=job, id__gt=last_event_id).values('id', 'kind', 'data')[:page_size]
+    data['events'] = list(events)
+    data['last_event_id'] = data['events'][-1]['id'] if data['events'] else last_event_id
+    response = JsonResponse(data)
+    patch_cache_control(response, no_cache=True, no_store=True)
+    return response
+
 def fetch_external_news_via_rss(area_name, max_results=10):
     """Get news from Google News RSS feed directly, with caching."""
     # Normalize area_name for cache key consistency
@@ -887,7 +843,7 @@ def get_google_news_for_area(area_name, max_results=10):
 def articles_by_area(request, area_name):
     # Normalize area name from URL
     normalized_area_name = normalize_area_name(area_name)
-    area = get_object_or_404(Area, name=normalized_area_name)
+    area = get_area_or_404(normalized_area_name)
 
     # Add the visited area to the session
     if 'recently_visited' not in request.session:
@@ -935,9 +891,13 @@ def articles_by_area(request, area_name):
         # If there's no articles relation, consider it has no articles
         has_local_articles = False
     
+    # Show progress if a "Refresh News" run is queued or in progress
+    generation_job = GenerationJob.objects.filter(area=area, status__in=GenerationJob.ACTIVE_STATUSES).first()
+
     context = {
         'area': area,
         'articles': articles,
+        'generation_job': generation_job,
         'ad_categories': ad_categories,
         'ad_categories_list': ad_categories_list,
         'auto_corrected': auto_corrected,
@@ -960,34 +920,82 @@ def article_detail_view(request, article_id):
 
 def trending_articles(request):
     """
-    API endpoint to return trending articles for the post form sidebar
+    API endpoint to return trending articles for the post form sidebar.
+    ?window=1h|24h|7d ranks by visits within that window instead of the
+    decayed trending score.
     """
-    # Get recent articles, limited to 5
-    articles = Article.objects.all().order_by('-created_at')[:5]
+    window = request.GET.get('window')
+    if window is not None and window not in WINDOWS:
+        return JsonResponse({'error': f"window must be one of {', '.join(WINDOWS)}."}, status=400)
+    # Read the top 5 from the precomputed trending snapshot
+    snapshot = get_trending_snapshot()
+    if window is None:
+        articles = snapshot['articles'][:5]
+    else:
+        articles = snapshot['windows'].get(window, {}).get('articles', [])[:5]
     
     # Format the articles as JSON
     articles_data = []
     for article in articles:
         article_data = {
-            'title': article.title,
-            'category': article.category,
-            'created_at': article.created_at.isoformat(),
-            'url': f'/article/{article.pk}/' if article.pk else '#',
-            'cover_image': article.cover_image,
+            'title': article['title'],
+            'category': article['category'],
+            'created_at': article['created_at'].isoformat(),
+            'url': f"/article/{article['id']}/",
+            'cover_image': article['cover_image'],
         }
-        if article.slug and article.area:
-            article_data['url'] = f'/{article.area.name}/{article.slug}/'
+        if article['slug'] and article['area']:
+            article_data['url'] = f"/{article['area']['name']}/{article['slug']}/"
         
         articles_data.append(article_data)
     
     return JsonResponse({'articles': articles_data})
 
+def search_articles_api(request):
+    """
+    API endpoint for full-text article search.
+    Query params: q (required), area (optional area name), cursor (from the
+    previous page's next_cursor) and limit (max 50).
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Missing search query'}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 50)
+    except ValueError:
+        limit = 20
+
+    area_id = None
+    area_name = request.GET.get('area')
+    if area_name:
+        area_id = resolve_area_id(area_name)
+        if area_id is None:
+            return JsonResponse({'results': [], 'next_cursor': None})
+
+    results, next_cursor = search_articles(query, area_id=area_id, limit=limit, cursor=request.GET.get('cursor'))
+
+    results_data = []
+    for result in results:
+        url = f"/article/{result['id']}/"
+        if result['slug'] and result['area_name']:
+            url = f"/{result['area_name']}/{result['slug']}/"
+        results_data.append({
+            'title': result['title'],
+            'snippet': result['snippet'],
+            'category': result['category'],
+            'cover_image': result['cover_image'],
+            'created_at': result['created_at'].isoformat() if result['created_at'] else None,
+            'area': result['area_name'],
+            'url': url,
+        })
+
+    return JsonResponse({'results': results_data, 'next_cursor': next_cursor})
+
 # --------------------
 # AJAX Like Endpoint
 # --------------------
 
-from math import radians, sin, cos, sqrt, atan2
-
 @require_POST
 def like_article(request, article_id):
     """Increment the like count for an article (AJAX)."""
@@ -998,20 +1006,6 @@ def like_article(request, article_id):
     article.refresh_from_db(fields=['likes'])
     return JsonResponse({'success': True, 'likes': article.likes})
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius of Earth in kilometers
-
-    dLat = radians(lat2 - lat1)
-    dLon = radians(lon2 - lon1)
-    lat1 = radians(lat1)
-    lat2 = radians(lat2)
-
-    a = sin(dLat / 2)**2 + cos(lat1) * cos(lat2) * sin(dLon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-    distance = R * c
-    return distance
-
 def nearby_areas(request):
     lat_str = request.GET.get('lat')
     lon_str = request.GET.get('lon')
@@ -1026,17 +1020,55 @@ def nearby_areas(request):
         return JsonResponse({'error': 'Invalid latitude or longitude.'}, status=400)
 
 
-    areas = Area.objects.filter(latitude__isnull=False, longitude__isnull=False)
-    nearby = []
-    for area in areas:
-        if area.latitude is not None and area.longitude is not None:
-            distance = haversine(lat, lon, area.latitude, area.longitude)
-            if distance < 50: # Only show areas within 50km
-                nearby.append({'name': area.name, 'distance': distance})
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return JsonResponse({'error': 'Invalid latitude or longitude.'}, status=400)
+
+    # Only show areas within 50km
+    areas = [
+        {'name': name, 'distance': distance}
+        for distance, name in nearest_areas(lat, lon, limit=5, radius_km=50)
+    ]
+
+    return JsonResponse({'areas': areas}) # Return the 5 closest areas
+
+@csrf_exempt
+@require_POST
+def nearby_areas_batch(request):
+    """
+    API endpoint for nearby areas of many points at once (e.g. map markers).
+    Body: {"points": [[lat, lon], ...], "radius_km": 50, "limit": 5}.
+    radius_km is capped at NEARBY_BATCH_MAX_RADIUS_KM and limit at
+    NEARBY_BATCH_MAX_LIMIT, so one request can't return every area for
+    every point.
+    """
+    try:
+        data = json.loads(request.body)
+        points = [(float(lat), float(lon)) for lat, lon in data.get('points', [])]
+        radius_km = float(data.get('radius_km', 50))
+        limit = int(data.get('limit', 5))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Invalid request body.'}, status=400)
+    if not math.isfinite(radius_km) or radius_km <= 0 or limit < 1:
+        return JsonResponse({'error': 'radius_km and limit must be positive numbers.'}, status=400)
+    radius_km = min(radius_km, getattr(settings, 'NEARBY_BATCH_MAX_RADIUS_KM', 200))
+    limit = min(limit, getattr(settings, 'NEARBY_BATCH_MAX_LIMIT', 50))
+
+    max_points = getattr(settings, 'NEARBY_BATCH_MAX_POINTS', 500)
+    if not points or len(points) > max_points:
+        return JsonResponse({'error': f'Send between 1 and {max_points} points.'}, status=400)
+    if any(not (-90 <= lat <= 90 and -180 <= lon <= 180) for lat, lon in points):
+        return JsonResponse({'error': 'Invalid latitude or longitude.'}, status=400)
+    if not area_points.available:
+        return JsonResponse({'error': 'Batch lookups are not available on this server.'}, status=503)
 
-    nearby.sort(key=lambda x: x['distance'])
+    results = area_points.nearest_many(points, limit=limit, radius_km=radius_km)
 
-    return JsonResponse({'areas': nearby[:5]}) # Return the 5 closest areas
+    return JsonResponse({
+        'results': [
+            [{'name': name, 'distance': distance} for distance, name in found]
+            for found in results
+        ]
+    })
 
 @csrf_exempt
 @require_POST
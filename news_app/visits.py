@@ -0,0 +1,185 @@
+"""
+Buffered page view counting.
+
+PageViewMiddleware used to resolve the area/article and save a URLModel row
+on every GET. Hits are now aggregated per path in memory and written by a
+background thread in one transaction, so rendering a page never waits on an
+analytics write.
+
+Each flush also adds the hits to hourly VisitRollup buckets, which back the
+windowed trending queries in trending.py, and to the decayed trending
+scores of the articles and areas involved.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Article, URLModel, VisitRollup
+from .resolver import clear_route_cache, resolve_area_ids, resolve_article_ids
+from .trending import add_trending_hits
+from .utils import normalize_area_name
+
+logger = logging.getLogger(__name__)
+
+
+class VisitBuffer:
+    """
+    Collects page hits per (path, hour) and flushes them every `flush_interval`
+    seconds, as soon as `max_paths` distinct paths are pending, and once more
+    when the process exits.
+    """
+
+    def __init__(self, flush_interval=None, max_paths=None):
+        self.flush_interval = flush_interval or getattr(settings, 'PAGE_VIEW_FLUSH_INTERVAL', 10)
+        self.max_paths = max_paths or getattr(settings, 'PAGE_VIEW_BUFFER_MAX_PATHS', 1000)
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, path):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            self._counts[(path, hour)] += 1
+            full = len(self._counts) >= self.max_paths
+        self._ensure_worker()
+        if full:
+            # Let the worker flush early instead of writing on the request thread
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='visit-buffer-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all pending hits to the database. Returns the number of hits written."""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+            if not counts:
+                return 0
+            try:
+                written = write_visits(counts)
+            except Exception as e:
+                logger.exception(f"Error flushing {sum(counts.values())} buffered page views: {e}")
+                # Keep the hits for the next flush rather than dropping them, and
+                # re-resolve routes in case a cached id went stale in another worker
+                clear_route_cache()
+                with self._lock:
+                    self._counts.update(counts)
+                return 0
+            logger.debug(f"Flushed {written} page views from {len(counts)} buffered entries")
+            return written
+
+
+def _resolve_paths(paths):
+    """
+    Map each tracked path to its (area_id, article_id) using the shared route
+    cache. Paths that don't point at a known area page with articles, or at
+    an existing article, are left out.
+    """
+    split_paths = {path: path.split('/') for path in paths}
+    area_ids = resolve_area_ids({parts[0] for parts in split_paths.values()})
+    if not area_ids:
+        return {}
+
+    areas_with_articles = set(
+        Article.objects.filter(area_id__in=area_ids.values()).values_list('area_id', flat=True).distinct()
+    )
+    article_ids = resolve_article_ids({
+        (area_ids[normalize_area_name(parts[0])], parts[1])
+        for parts in split_paths.values()
+        if len(parts) == 2 and normalize_area_name(parts[0]) in area_ids
+    })
+
+    resolved = {}
+    for path, parts in split_paths.items():
+        area_id = area_ids.get(normalize_area_name(parts[0]))
+        if area_id is None:
+            continue
+        if len(parts) == 1:
+            # Only count area pages that have at least one article
+            if area_id in areas_with_articles:
+                resolved[path] = (area_id, None)
+        else:
+            article_id = article_ids.get((area_id, parts[1]))
+            if article_id is not None:
+                resolved[path] = (area_id, article_id)
+    return resolved
+
+
+def write_visits(counts):
+    """
+    Apply aggregated {(path, hour): hits} increments in a single transaction
+    and return the number of hits that matched an area or article.
+    """
+    path_hits = Counter()
+    for (path, _hour), hits in counts.items():
+        path_hits[path] += hits
+    resolved = _resolve_paths(path_hits.keys())
+
+    bucket_hits = Counter()
+    for (path, hour), hits in counts.items():
+        if path in resolved:
+            bucket_hits[(*resolved[path], hour)] += hits
+
+    with transaction.atomic():
+        for path, (area_id, article_id) in resolved.items():
+            hits = path_hits[path]
+            updated = URLModel.objects.filter(path=path).update(
+                visits=F('visits') + hits,
+                area_id=area_id,
+                article_id=article_id,
+            )
+            if not updated:
+                URLModel.objects.create(path=path, area_id=area_id, article_id=article_id, visits=hits)
+
+        for (area_id, article_id, hour), hits in bucket_hits.items():
+            add_rollup_visits(area_id, article_id, hour, hits)
+
+        article_hits = Counter()
+        area_hits = Counter()
+        for path, (area_id, article_id) in resolved.items():
+            if article_id is not None:
+                article_hits[article_id] += path_hits[path]
+            else:
+                area_hits[area_id] += path_hits[path]
+        add_trending_hits(article_hits, area_hits)
+
+    return sum(bucket_hits.values())
+
+
+def add_rollup_visits(area_id, article_id, bucket, hits, granularity=VisitRollup.HOUR):
+    updated = VisitRollup.objects.filter(
+        area_id=area_id, article_id=article_id, bucket=bucket, granularity=granularity
+    ).update(visits=F('visits') + hits)
+    if not updated:
+        VisitRollup.objects.create(
+            area_id=area_id, article_id=article_id, bucket=bucket, granularity=granularity, visits=hits
+        )
+
+
+visit_buffer = VisitBuffer()
+atexit.register(visit_buffer.flush)